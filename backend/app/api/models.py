@@ -19,6 +19,8 @@ class ServerStatsResponse(BaseModel):
 
     spam_threshold: float  # ADD THIS
     harassment_threshold: float  # ADD THIS
+    cascade_threshold: float = 0.0
+    raid_fanout: int = 0
     auto_delete: bool
     auto_timeout: bool
     timeout_duration: int  # ADD THIS
@@ -65,6 +67,8 @@ class ConfigUpdateRequest(BaseModel):
     toxicity_threshold: Optional[float] = None
     spam_threshold: Optional[float] = None  # ADD THIS
     harassment_threshold: Optional[float] = None  # ADD THIS
+    cascade_threshold: Optional[float] = None
+    raid_fanout: Optional[int] = None
     auto_delete: Optional[bool] = None
     auto_timeout: Optional[bool] = None
     timeout_duration: Optional[int] = None
@@ -86,6 +90,27 @@ class AnalysisResponse(BaseModel):
     categories: Dict[str, float]
     recommendations: List[str]
 
+class ImageUrlBatchRequest(BaseModel):
+    """Batch image analysis request (hosted images)"""
+    urls: List[str]
+
+class ImageAnalysisResult(BaseModel):
+    """Verdict for one image of a batch"""
+    index: int
+    source: str  # URL or uploaded filename
+    flagged: bool
+    score: float
+    label: str  # "nsfw", "safe", "skipped" or "error"
+    reason: Optional[str] = None
+    frames_sampled: Optional[int] = None
+    cache_hit: bool = False
+
+class ImageBatchResponse(BaseModel):
+    """Batch image analysis response; results are in input order"""
+    results: List[ImageAnalysisResult]
+    total: int
+    flagged_count: int
+
 class DashboardData(BaseModel):
     """Complete dashboard data model"""
     server_stats: ServerStatsResponse
@@ -126,6 +151,8 @@ class ServerSettingsUpdateRequest(BaseModel):
     escalation_threshold: Optional[int] = None
     learning_enabled: Optional[bool] = None
     privacy_mode: Optional[bool] = None
+    # Spam signal -> points, overriding the defaults for this server
+    spam_weights: Optional[Dict[str, float]] = None
     # NSFW Settings
     nsfw_allowed: Optional[bool] = None
     nsfw_auto_delete: Optional[bool] = None
@@ -145,6 +172,7 @@ class ServerSettingsResponse(BaseModel):
     escalation_threshold: int
     learning_enabled: bool
     privacy_mode: bool
+    spam_weights: Dict[str, float] = {}
     # NSFW Settings
     nsfw_allowed: bool
     nsfw_auto_delete: bool
@@ -1,26 +1,32 @@
 # backend/app/api/routes.py
-from fastapi import APIRouter, HTTPException, Depends, Query
+import asyncio
+from fastapi import APIRouter, HTTPException, Depends, Query, File, UploadFile
 from fastapi.responses import JSONResponse
 from typing import List, Optional
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
-from fastapi.security import HTTPBearer
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.models import (
     ServerStatsResponse, ViolationResponse, AnalyticsResponse,
     HealthScoreResponse, ConfigUpdateRequest, AnalysisRequest,
     AnalysisResponse, DashboardData, ServerListResponse, LearningInsights,
-    FeedbackRequest, ServerSettingsResponse, ServerSettingsUpdateRequest  # Added new imports
+    FeedbackRequest, ServerSettingsResponse, ServerSettingsUpdateRequest,  # Added new imports
+    ImageUrlBatchRequest, ImageAnalysisResult, ImageBatchResponse
 )
 
 
 from app.database.connection import get_db
 from app.database.models import Server, User, Violation, ServerAnalytics
 from app.ml.content_analyzer import content_analyzer
+from app.ml.image_analyzer import image_analyzer
 from app.ml.community_learner import community_learner
+from app.bot.spam_tracker import DEFAULT_SPAM_WEIGHTS, spam_tracker
 from app.utils.logger import logger
 from app.services.auth_service import auth_service
+from app.utils.config import config
+from app.utils.image_links import is_public_http_url
 
 
 
@@ -49,6 +55,18 @@ async def get_current_user(token: str = Depends(security), db: Session = Depends
         logger.error(f"❌ Authentication error: {e}")
         raise HTTPException(status_code=401, detail="Authentication failed")
 
+optional_security = HTTPBearer(auto_error=False)
+
+async def get_optional_user(token: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+                            db: Session = Depends(get_db)) -> Optional[User]:
+    """The authenticated user if a valid JWT was sent, else None (for routes that are only partly protected)"""
+    if token is None:
+        return None
+    payload = auth_service.verify_jwt_token(token.credentials)
+    if not payload:
+        return None
+    return db.query(User).filter_by(id=payload['user_id']).first()
+
 # Authentication endpoints
 @router.post("/auth/google")
 async def google_auth(request: dict, db: Session = Depends(get_db)):
@@ -244,6 +262,8 @@ async def get_server_stats(server_id: str, db: Session = Depends(get_db)):
             nsfw_threshold=server.nsfw_threshold,
             spam_threshold=getattr(server, 'spam_threshold', 0.7),  # ADD THIS
             harassment_threshold=getattr(server, 'harassment_threshold', 0.7),  # ADD THIS
+            cascade_threshold=getattr(server, 'cascade_threshold', None) or 0.0,
+            raid_fanout=server.raid_fanout if getattr(server, 'raid_fanout', None) is not None else 0,
             auto_delete=server.auto_delete,
             auto_timeout=server.auto_timeout,
             timeout_duration=server.timeout_duration,  # ADD THIS
@@ -428,6 +448,23 @@ async def update_server_config(
             server.harassment_threshold = float(config.harassment_threshold)
             changes.append(f"harassment: {old_val} → {server.harassment_threshold}")
 
+        if config.cascade_threshold is not None:
+            if not 0.0 <= config.cascade_threshold <= 1.0:
+                raise HTTPException(status_code=400, detail="Cascade threshold must be between 0.0 and 1.0")
+            old_val = getattr(server, 'cascade_threshold', 0.0)
+            server.cascade_threshold = float(config.cascade_threshold)
+            changes.append(f"cascade: {old_val} → {server.cascade_threshold}")
+
+        if config.raid_fanout is not None:
+            if config.raid_fanout != 0 and not 2 <= config.raid_fanout < spam_tracker.raid_max_users:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Raid fan-out must be 0 (off) or between 2 and {spam_tracker.raid_max_users - 1}"
+                )
+            old_val = getattr(server, 'raid_fanout', 0)
+            server.raid_fanout = int(config.raid_fanout)
+            changes.append(f"raid_fanout: {old_val} → {server.raid_fanout}")
+
         if config.warning_enabled is not None:
             old_val = getattr(server, 'warning_enabled', True)
             server.warning_enabled = bool(config.warning_enabled)
@@ -473,7 +510,7 @@ async def update_server_config(
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.post("/analyze", response_model=AnalysisResponse)
-async def analyze_content(request: AnalysisRequest):
+async def analyze_content(request: AnalysisRequest, current_user: Optional[User] = Depends(get_optional_user)):
     """Analyze content for violations"""
     try:
         if request.content_type == "text":
@@ -495,8 +532,30 @@ async def analyze_content(request: AnalysisRequest):
                 categories=analysis.get('scores', {}),
                 recommendations=recommendations
             )
+        elif request.content_type == "image":
+            # content is the image URL; fetching URLs on request is for signed-in users only
+            if current_user is None:
+                raise HTTPException(status_code=401, detail="Image analysis requires authentication")
+            _check_image_urls([request.content])
+            await _require_image_model()
+            result = await image_analyzer.analyze_link(request.content)
+            if result is None:
+                raise HTTPException(status_code=422, detail="Could not download or decode the image")
+            if result['label'] == 'skipped':
+                raise HTTPException(status_code=400, detail=f"Image skipped: {result['reason']}")
+            
+            return AnalysisResponse(
+                flagged=result['is_nsfw'],
+                confidence=result['score'],
+                violation_type='nsfw_image' if result['is_nsfw'] else None,
+                categories={'nsfw': result['score']},
+                recommendations=(
+                    ["Image appears to contain NSFW content"] if result['is_nsfw']
+                    else ["Image appears appropriate"]
+                )
+            )
         else:
-            raise HTTPException(status_code=400, detail="Image analysis not implemented in MVP")
+            raise HTTPException(status_code=400, detail=f"Unsupported content_type: {request.content_type}")
             
     except HTTPException:
         raise
@@ -504,6 +563,69 @@ async def analyze_content(request: AnalysisRequest):
         logger.error(f"Error analyzing content: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+async def _require_image_model():
+    """Wait for the NSFW model; 503 if it cannot be loaded"""
+    if not await image_analyzer.ensure_ready():
+        raise HTTPException(status_code=503, detail="Image analysis model is not available")
+
+def _check_batch_size(count: int):
+    if count == 0:
+        raise HTTPException(status_code=400, detail="No images given")
+    if count > config.ANALYZE_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {config.ANALYZE_BATCH_MAX_ITEMS} images per request")
+
+def _check_image_urls(urls: List[str]):
+    for url in urls:
+        if not is_public_http_url(url):
+            raise HTTPException(status_code=400, detail=f"Not a public http(s) URL: {url}")
+
+def _image_batch_response(sources: List[str], results: List[Optional[dict]]) -> ImageBatchResponse:
+    items = []
+    for index, (source, result) in enumerate(zip(sources, results)):
+        if result is None:
+            result = {'is_nsfw': False, 'score': 0.0, 'label': 'error', 'reason': 'download_or_decode_failed'}
+        items.append(ImageAnalysisResult(
+            index=index,
+            source=source,
+            flagged=result['is_nsfw'],
+            score=result['score'],
+            label=result['label'],
+            reason=result.get('reason'),
+            frames_sampled=result.get('frames_sampled'),
+            cache_hit=result.get('cache_hit', False)
+        ))
+    return ImageBatchResponse(results=items, total=len(items), flagged_count=sum(item.flagged for item in items))
+
+@router.post("/analyze/images", response_model=ImageBatchResponse)
+async def analyze_image_uploads(files: List[UploadFile] = File(...), current_user: User = Depends(get_current_user)):
+    """Pre-screen many uploaded images in one multipart request (results in input order)"""
+    _check_batch_size(len(files))
+    await _require_image_model()
+    
+    # Read at most one byte past the largest cap, so oversized files are skipped without buffering them
+    read_limit = max(config.IMAGE_MAX_BYTES, config.VIDEO_MAX_BYTES) + 1
+    
+    async def analyze(upload: UploadFile):
+        data = await upload.read(read_limit)
+        return await image_analyzer.analyze_image_bytes(data, content_type=upload.content_type)
+    
+    # Same model instance and micro-batcher as the bot: concurrent uploads share forward passes
+    results = await asyncio.gather(*(analyze(upload) for upload in files))
+    logger.info(f"🖼️ Analyzed {len(files)} uploaded images")
+    return _image_batch_response([upload.filename or "" for upload in files], results)
+
+@router.post("/analyze/images/urls", response_model=ImageBatchResponse)
+async def analyze_image_urls(request: ImageUrlBatchRequest, current_user: User = Depends(get_current_user)):
+    """Pre-screen many hosted images in one request (results in input order)"""
+    _check_batch_size(len(request.urls))
+    _check_image_urls(request.urls)
+    await _require_image_model()
+    
+    # Same per-URL cache as links posted in Discord
+    results = await image_analyzer.analyze_images([], links=request.urls, stop_on_nsfw=False)
+    logger.info(f"🖼️ Analyzed {len(request.urls)} image URLs")
+    return _image_batch_response(request.urls, results)
+
 @router.get("/servers/{server_id}/dashboard", response_model=DashboardData)
 async def get_dashboard_data(server_id: str, db: Session = Depends(get_db)):
     """Get complete dashboard data for a server"""
@@ -794,6 +916,18 @@ async def update_server_settings(
             old_value = server.privacy_mode
             server.privacy_mode = settings.privacy_mode
             changes.append(f"privacy_mode: {old_value} → {server.privacy_mode}")
+        
+        if settings.spam_weights is not None:
+            unknown = set(settings.spam_weights) - set(DEFAULT_SPAM_WEIGHTS)
+            if unknown:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Unknown spam signals: {', '.join(sorted(unknown))} (expected {', '.join(DEFAULT_SPAM_WEIGHTS)})"
+                )
+            if not all(0 <= points <= 100 for points in settings.spam_weights.values()):
+                raise HTTPException(status_code=400, detail="spam_weights values must be between 0 and 100")
+            server.spam_weights = json.dumps(settings.spam_weights)
+            changes.append(f"spam_weights: {server.spam_weights}")
             
         # NSFW Settings Updates
         if settings.nsfw_allowed is not None:
@@ -862,6 +996,7 @@ async def get_server_settings(server_id: str, db: Session = Depends(get_db)):
         # Safely parse JSON fields with error handling
         moderation_channels = []
         exempt_roles = []
+        spam_weights = {}
         
         try:
             if server.moderation_channels:
@@ -881,6 +1016,15 @@ async def get_server_settings(server_id: str, db: Session = Depends(get_db)):
             logger.warning(f"⚠️ Invalid JSON in exempt_roles: {server.exempt_roles}, error: {e}")
             exempt_roles = []
         
+        try:
+            if getattr(server, 'spam_weights', None):
+                spam_weights = json.loads(server.spam_weights)
+                if not isinstance(spam_weights, dict):
+                    spam_weights = {}
+        except (json.JSONDecodeError, TypeError) as e:
+            logger.warning(f"⚠️ Invalid JSON in spam_weights: {server.spam_weights}, error: {e}")
+            spam_weights = {}
+        
         # Construct response using Pydantic model
         response = ServerSettingsResponse(
             server_id=server.id,
@@ -893,6 +1037,7 @@ async def get_server_settings(server_id: str, db: Session = Depends(get_db)):
             escalation_threshold=server.escalation_threshold if server.escalation_threshold is not None else 3,
             learning_enabled=server.learning_enabled if server.learning_enabled is not None else True,
             privacy_mode=server.privacy_mode if server.privacy_mode is not None else True,
+            spam_weights=spam_weights,
             
             # NSFW Settings
             nsfw_allowed=getattr(server, 'nsfw_allowed', False),
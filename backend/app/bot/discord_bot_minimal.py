@@ -3,15 +3,18 @@ import discord
 from discord.ext import commands
 import asyncio
 import logging
-from typing import Optional, Dict, Any
+import re
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List
 from datetime import datetime, timedelta, timezone
 
 from app.utils.config import config
 from app.utils.logger import logger
+from app.utils.image_links import extract_image_links
 from app.ml.content_analyzer import content_analyzer
 from app.database.connection import get_db_session
 from app.database.models import Server, User, Violation
-from app.bot.spam_tracker import spam_tracker
+from app.bot.spam_tracker import DEFAULT_SPAM_THRESHOLD, spam_tracker
 from discord.ext import tasks
 from app.services.adaptive_learning import learning_service
 
@@ -24,6 +27,8 @@ intents.members = True
 
 IST = timezone(timedelta(hours=5, minutes=30))
 
+CUSTOM_EMOJI_PATTERN = re.compile(r"<(?P<animated>a?):(?P<name>\w+):(?P<id>\d+)>")
+
 
 class CommunityClara(commands.Bot):
     """CommunityClara Discord Bot"""
@@ -37,6 +42,9 @@ class CommunityClara(commands.Bot):
         )
         self.processed_messages = 0
         self.violations_detected = 0
+        # In-flight work per message, cancelled if the message is deleted
+        self._message_tasks: Dict[int, set] = {}
+        self._deleted_messages: "OrderedDict[int, None]" = OrderedDict()  # recent, bounded
 
     async def on_ready(self):
         """Bot startup event"""
@@ -161,8 +169,8 @@ class CommunityClara(commands.Bot):
                     pass
                 return
         
-        # Skip empty messages (unless it has an attachment)
-        if not message.content.strip() and not message.attachments:
+        # Skip empty messages (unless it has an attachment or sticker)
+        if not message.content.strip() and not message.attachments and not message.stickers:
             return
         
         # Get server configuration
@@ -193,10 +201,15 @@ class CommunityClara(commands.Bot):
             logger.info(f"🔍 Starting spam analysis for user {message.author.id}...")
             
             try:
+                guild_id = str(message.guild.id)
+                spam_tracker.configure_guild(
+                    guild_id, server_config['spam_threshold'], server_config['spam_weights'], server_config['raid_fanout']
+                )
                 spam_analysis = spam_tracker.add_message(
                     user_id=str(message.author.id),
                     content=message.content,
-                    timestamp=datetime.utcnow()
+                    timestamp=datetime.utcnow(),
+                    guild_id=guild_id
                 )
                 
                 logger.info(f"🔍 Spam analysis result:")
@@ -217,6 +230,9 @@ class CommunityClara(commands.Bot):
                         spam_analysis['toxicity_data'] = toxicity_result
                         logger.info(f"☠️ Spam also contains toxicity: {toxicity_result['violation_category']}")
                     
+                    if spam_analysis.get('raid_started'):
+                        await self._send_raid_alert(message, spam_analysis, server_config)
+                    
                     await self._handle_spam(message, spam_analysis, server_config)
                     return  # Exit early for spam
                 
@@ -227,80 +243,20 @@ class CommunityClara(commands.Bot):
                 import traceback
                 logger.error(f"Spam analysis traceback: {traceback.format_exc()}")
 
-            # IMAGE ANALYSIS ('else' block removed as 'if' returns)
-            logger.info(f"📎 Message attachments: {len(message.attachments)}")
-            if message.attachments:
-                from app.ml.image_analyzer import image_analyzer
-                for attachment in message.attachments:
-                    if attachment.content_type and attachment.content_type.startswith('image/'):
-                        logger.info(f"🖼️ Analyzing image: {attachment.filename}")
-                        img_result = await image_analyzer.analyze_image(attachment.url)
-                        
-                        if img_result and img_result['is_nsfw']:
-                            logger.info(f"🚨 NSFW IMAGE DETECTED: {img_result}")
-                            
-                            # CHECK IF NSFW IS ALLOWED
-                            if server_config.get('nsfw_allowed', False):
-                                logger.info(f"⚪ NSFW allowed in this server. Ignoring violation.")
-                                return
-
-                            # Construct violation object
-                            violation_data = {
-                                'violation_category': 'nsfw_image',
-                                'confidence': img_result['score'],
-                                'analysis': img_result
-                            }
-                            
-                            # CUSTOM ACTION HANDLING FOR NSFW
-                            # We handle this manually here because it has specific settings (Ban/Timeout)
-                            
-                            # 1. Log violation first
-                            await self._log_violation(message, violation_data, "nsfw_detected")
-
-                            # 2. Execute Actions
-                            action_taken = []
-                            
-                            # Auto-Delete
-                            if server_config.get('nsfw_auto_delete', True):
-                                try:
-                                    await message.delete()
-                                    action_taken.append("Deleted Message")
-                                    logger.info(f"🗑️ Deleted NSFW image from {message.author}")
-                                except:
-                                    pass
-
-                            # Auto-Ban (Strict)
-                            if server_config.get('nsfw_auto_ban', False):
-                                try:
-                                    await message.guild.ban(message.author, reason="NSFW content detected (Auto-Ban)")
-                                    action_taken.append("Banned User")
-                                    logger.info(f"🚫 Banned {message.author} for NSFW")
-                                except Exception as e:
-                                    logger.error(f"Failed to ban: {e}")
-                            
-                            # Auto-Kick (New)
-                            elif server_config.get('nsfw_auto_kick', False):
-                                try:
-                                    await message.guild.kick(message.author, reason="NSFW content detected (Auto-Kick)")
-                                    action_taken.append("Kicked User")
-                                    logger.info(f"👢 Kicked {message.author} for NSFW")
-                                except Exception as e:
-                                    logger.error(f"Failed to kick: {e}")
-
-                            # Auto-Timeout (if not banned/kicked)
-                            elif server_config.get('nsfw_auto_timeout', False):
-                                try:
-                                    timeout_time = discord.utils.utcnow() + timedelta(minutes=10)
-                                    await message.author.timeout(timeout_time, reason="NSFW content detected")
-                                    action_taken.append("Timed Out (10m)")
-                                    logger.info(f"⏰ Timed out {message.author} for NSFW")
-                                except:
-                                    pass
-                            
-                            # Send Alert
-                            await self._send_moderation_alert(message, violation_data, " + ".join(action_taken))
-                            
-                            return # Exit after finding bad image
+            # IMAGE ANALYSIS: attachments, pasted image links and embed images, all at once
+            logger.info(f"📎 Message attachments: {len(message.attachments)}, embeds: {len(message.embeds)}")
+            image_links = extract_image_links(
+                message.content, message.embeds,
+                limit=config.IMAGE_LINKS_PER_MESSAGE,
+                exclude=[a.url for a in message.attachments]
+            )
+            img_result = await self._scan_message_images(message, message.attachments, image_links, self._message_assets(message))
+            if message.id in self._deleted_messages:
+                logger.info(f"🗑️ Message {message.id} deleted during analysis - stopping")
+                return
+            if img_result:
+                await self._handle_nsfw_image(message, img_result, server_config)
+                return # Exit after finding bad image
 
             # Only run AI analysis if not spam
             violation_result = await self._analyze_message(message, server_config)
@@ -316,6 +272,247 @@ class CommunityClara(commands.Bot):
             import traceback
             logger.error(f"Full traceback: {traceback.format_exc()}")
 
+    async def _scan_message_images(self, message: discord.Message, attachments, links, assets=()) -> Optional[Dict[str, Any]]:
+        """Analyze image attachments, image links and stickers/emoji together; returns the first NSFW verdict.
+        
+        Downloads overlap, decoded images share one model batch and the first
+        NSFW hit cancels the rest. Links go through the per-URL cache and
+        assets through the permanent per-asset verdicts.
+        """
+        from app.ml.image_analyzer import image_analyzer
+        from app.ml.asset_scanner import asset_scanner
+        # Images, animated images and (with PyAV installed) short videos
+        images = [a for a in attachments if a.content_type and a.content_type.startswith(('image/', 'video/'))]
+        if not images and not links and not assets:
+            return None
+        
+        logger.info(f"🖼️ Analyzing {len(images)} attachment(s), {len(links)} link(s) and {len(assets)} sticker/emoji asset(s)")
+        outcome = await self._run_for_message(message.id, asyncio.gather(
+            image_analyzer.analyze_images(
+                [{'url': a.url, 'size': a.size, 'content_type': a.content_type} for a in images],
+                links=links
+            ),
+            asset_scanner.scan_many(assets)
+        ))
+        if outcome is None:
+            return None  # message deleted
+        results, asset_result = outcome
+        
+        img_result = None
+        sources = [a.filename for a in images] + list(links)
+        for source, result in zip(sources, results or []):
+            if result and result.get('label') == 'skipped':
+                logger.info(f"⏭️ Skipped image {source}: {result['reason']}")
+            if result and result['is_nsfw']:
+                img_result = {**result, 'source': source}
+        if any(r and r.get('label') == 'not_ready' for r in results or []):
+            logger.warning(f"⏳ NSFW image model not ready ({image_analyzer.model_status()['state']}) - images not checked")
+        return img_result or asset_result
+
+    async def _handle_nsfw_image(self, message: discord.Message, img_result: Dict[str, Any], server_config: Dict):
+        """Log, act on and report an NSFW image (attachment, link or embed)"""
+        logger.info(f"🚨 NSFW IMAGE DETECTED: {img_result}")
+        
+        # CHECK IF NSFW IS ALLOWED
+        if server_config.get('nsfw_allowed', False):
+            logger.info(f"⚪ NSFW allowed in this server. Ignoring violation.")
+            return
+
+        # Construct violation object
+        violation_data = {
+            'violation_category': 'nsfw_image',
+            'confidence': img_result['score'],
+            'analysis': img_result
+        }
+        
+        # CUSTOM ACTION HANDLING FOR NSFW
+        # We handle this manually here because it has specific settings (Ban/Timeout)
+        
+        # 1. Log violation first
+        await self._log_violation(message, violation_data, "nsfw_detected")
+
+        # 2. Execute Actions
+        action_taken = []
+        
+        # Auto-Delete
+        if server_config.get('nsfw_auto_delete', True):
+            try:
+                await message.delete()
+                action_taken.append("Deleted Message")
+                logger.info(f"🗑️ Deleted NSFW image from {message.author}")
+            except:
+                pass
+
+        # Ban / Kick / Timeout
+        action_taken += await self._apply_nsfw_member_actions(message.author, server_config)
+        
+        # Send Alert
+        await self._send_moderation_alert(message, violation_data, " + ".join(action_taken))
+
+    async def _apply_nsfw_member_actions(self, member: discord.Member, server_config: Dict) -> List[str]:
+        """Ban, kick or time out a member per the server's NSFW settings; returns the actions taken"""
+        action_taken = []
+        
+        # Auto-Ban (Strict)
+        if server_config.get('nsfw_auto_ban', False):
+            try:
+                await member.guild.ban(member, reason="NSFW content detected (Auto-Ban)")
+                action_taken.append("Banned User")
+                logger.info(f"🚫 Banned {member} for NSFW")
+            except Exception as e:
+                logger.error(f"Failed to ban: {e}")
+        
+        # Auto-Kick (New)
+        elif server_config.get('nsfw_auto_kick', False):
+            try:
+                await member.guild.kick(member, reason="NSFW content detected (Auto-Kick)")
+                action_taken.append("Kicked User")
+                logger.info(f"👢 Kicked {member} for NSFW")
+            except Exception as e:
+                logger.error(f"Failed to kick: {e}")
+
+        # Auto-Timeout (if not banned/kicked)
+        elif server_config.get('nsfw_auto_timeout', False):
+            try:
+                timeout_time = discord.utils.utcnow() + timedelta(minutes=10)
+                await member.timeout(timeout_time, reason="NSFW content detected")
+                action_taken.append("Timed Out (10m)")
+                logger.info(f"⏰ Timed out {member} for NSFW")
+            except:
+                pass
+        
+        return action_taken
+
+    def _message_assets(self, message: discord.Message) -> list:
+        """Stickers and custom emoji used in a message, as asset references"""
+        from app.ml.asset_scanner import AssetRef, STICKER, EMOJI
+        assets = {}
+        for sticker in message.stickers:
+            if sticker.format == discord.StickerFormatType.lottie:
+                continue  # vector JSON animation, not an image
+            assets[(STICKER, sticker.id)] = AssetRef(STICKER, str(sticker.id), '', sticker.url)
+        for match in CUSTOM_EMOJI_PATTERN.finditer(message.content):
+            emoji = discord.PartialEmoji(name=match['name'], animated=bool(match['animated']), id=int(match['id']))
+            assets[(EMOJI, emoji.id)] = AssetRef(EMOJI, str(emoji.id), '', emoji.url)
+        return list(assets.values())[:config.ASSETS_PER_MESSAGE]
+
+    async def _scan_member_avatar(self, member: discord.Member, server_config: Dict):
+        """Check a member's avatar; verdicts are memoized per avatar hash.
+
+        Joins fire once, so this waits for the image model instead of skipping
+        members who join while it is still loading.
+        """
+        from app.ml.asset_scanner import asset_scanner, AssetRef, AVATAR
+        if member.bot or (member.avatar is None and member.guild_avatar is None):
+            return  # default avatars are Discord's own
+        if await self._is_user_exempt(member, server_config):
+            return
+        
+        avatar = member.display_avatar
+        verdict = await asset_scanner.scan(
+            AssetRef(AVATAR, str(member.id), avatar.key, avatar.with_size(256).url), wait_for_model=True
+        )
+        if not verdict or not verdict['is_nsfw']:
+            return
+        
+        logger.info(f"🚨 NSFW AVATAR DETECTED: {member} ({verdict['score']:.2f})")
+        if server_config.get('nsfw_allowed', False):
+            logger.info(f"⚪ NSFW allowed in this server. Ignoring avatar.")
+            return
+        
+        action_taken = await self._apply_nsfw_member_actions(member, server_config)
+        
+        try:
+            with get_db_session() as session:
+                if not session.query(User).filter_by(id=str(member.id)).first():
+                    session.add(User(id=str(member.id), username=member.display_name or str(member)))
+                session.add(Violation(
+                    server_id=str(member.guild.id),
+                    user_id=str(member.id),
+                    channel_id='',
+                    violation_type='nsfw_avatar',
+                    confidence_score=verdict['score'],
+                    action_taken=" + ".join(action_taken) or "flagged",
+                    created_at=datetime.now(IST),
+                    message_content=f"Avatar: {avatar.url}",
+                    channel_name="(avatar)"
+                ))
+        except Exception as e:
+            logger.error(f"Error logging avatar violation: {e}")
+        
+        alert_channel = await self._get_log_channel(member.guild, server_config)
+        if alert_channel:
+            embed = discord.Embed(title="🚨 NSFW Avatar Detected", color=0xFF0000, timestamp=datetime.utcnow())
+            embed.add_field(name="User", value=f"{member.mention} ({member})", inline=True)
+            embed.add_field(name="Confidence", value=f"{verdict['score']:.1%}", inline=True)
+            embed.add_field(name="Action", value=" + ".join(action_taken) or "None", inline=True)
+            embed.set_thumbnail(url=avatar.url)
+            embed.set_footer(text="CommunityClara AI • Moderation System")
+            try:
+                await alert_channel.send(embed=embed)
+            except Exception as e:
+                logger.error(f"Error sending avatar alert: {e}")
+
+    async def _run_for_message(self, message_id: int, coro):
+        """Run work for a message so that deleting the message cancels it (returns None then)"""
+        task = asyncio.ensure_future(coro)
+        self._message_tasks.setdefault(message_id, set()).add(task)
+        try:
+            return await task
+        except asyncio.CancelledError:
+            if message_id in self._deleted_messages and task.cancelled():
+                return None
+            raise
+        finally:
+            tasks = self._message_tasks.get(message_id)
+            if tasks is not None:
+                tasks.discard(task)
+                if not tasks:
+                    del self._message_tasks[message_id]
+
+    async def on_guild_remove(self, guild: discord.Guild):
+        """Drop the guild's spam state when the bot leaves or is removed"""
+        if spam_tracker.evict_guild(str(guild.id)):
+            logger.info(f"🧹 Evicted spam state for guild {guild.name} ({guild.id})")
+
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        """Stop downloading/analyzing attachments of a message that no longer exists"""
+        tasks = self._message_tasks.get(payload.message_id)
+        if not tasks:
+            return
+        self._deleted_messages[payload.message_id] = None
+        while len(self._deleted_messages) > 1024:
+            self._deleted_messages.popitem(last=False)
+        for task in list(tasks):
+            task.cancel()
+        logger.info(f"🛑 Cancelled {len(tasks)} analysis task(s) for deleted message {payload.message_id}")
+
+    async def on_message_edit(self, before: discord.Message, after: discord.Message):
+        """Link previews usually arrive as an edit after the message is posted; scan their images"""
+        if after.author.bot or not after.guild:
+            return
+        previous = extract_image_links(before.content, before.embeds, limit=config.IMAGE_LINKS_PER_MESSAGE)
+        links = extract_image_links(
+            after.content, after.embeds,
+            limit=config.IMAGE_LINKS_PER_MESSAGE,
+            exclude=previous + [a.url for a in after.attachments]
+        )
+        if not links:
+            return
+        
+        server_config = await self._get_server_config(after.guild.id)
+        if not server_config or await self._is_user_exempt(after.author, server_config):
+            return
+        if not await self._should_moderate_channel(after.channel, server_config):
+            return
+        
+        try:
+            img_result = await self._scan_message_images(after, [], links)
+            if img_result and after.id not in self._deleted_messages:
+                await self._handle_nsfw_image(after, img_result, server_config)
+        except Exception as e:
+            logger.error(f"❌ Error scanning edited message images: {e}")
+
     async def test_spam_tracker(self, message):
         """Test spam tracker directly - for debugging"""
         try:
@@ -326,7 +523,8 @@ class CommunityClara(commands.Bot):
                 test_analysis = spam_tracker.add_message(
                     user_id="test_user_123",
                     content="test message",
-                    timestamp=datetime.utcnow()
+                    timestamp=datetime.utcnow(),
+                    guild_id=str(message.guild.id) if message.guild else ""
                 )
                 logger.info(f"🧪 Test message {i+1}: score={test_analysis.get('spam_score', 'ERROR')}, is_spam={test_analysis.get('is_spam', 'ERROR')}")
                 
@@ -451,6 +649,32 @@ class CommunityClara(commands.Bot):
         except Exception as e:
             logger.error(f"Error handling spam: {e}")
 
+    async def _send_raid_alert(self, message: discord.Message, spam_analysis: Dict, server_config: Dict):
+        """Tell moderators which users are posting the same message (once per raid; later copies are just deleted)"""
+        raid_users = spam_analysis.get('raid_users', [])
+        logger.warning(f"🚨 RAID in {message.guild.name}: {len(raid_users)} users posted '{message.content[:50]}'")
+        try:
+            alert_channel = await self._get_log_channel(message.guild, server_config) or message.channel
+            
+            embed = discord.Embed(
+                title="🚨 Raid Detected",
+                description=f"{len(raid_users)} different users posted the same message in {message.channel.mention}. "
+                            f"Further copies are deleted as spam; earlier ones may still be up.",
+                color=0xFF0000,
+                timestamp=datetime.utcnow()
+            )
+            embed.add_field(name="Message", value=f"```{message.content[:500]}```", inline=False)
+            
+            mentions = " ".join(f"<@{user_id}>" for user_id in raid_users[:40])
+            if len(raid_users) > 40:
+                mentions += f" (+{len(raid_users) - 40} more)"
+            embed.add_field(name="Users", value=mentions, inline=False)
+            embed.set_footer(text="CommunityClara AI • Anti-Raid Protection")
+            
+            await alert_channel.send(embed=embed)
+        except Exception as e:
+            logger.error(f"Could not send raid alert: {e}")
+
     async def _log_spam_violation(self, message: discord.Message, spam_analysis: Dict):
         """Log spam violation to database with message content"""
         try:
@@ -589,6 +813,17 @@ class CommunityClara(commands.Bot):
             
             # Import and use the content analyzer
             from app.ml.content_analyzer import content_analyzer
+            from app.ml.cascade import cascade_screen
+            
+            # Cascade: clearly clean messages skip the transformer
+            cascade_threshold = server_config.get('cascade_threshold', 0.0)
+            if cascade_threshold > 0:
+                escalate, screen_score = await cascade_screen.should_escalate(
+                    message.content, content_analyzer, cascade_threshold
+                )
+                if not escalate:
+                    logger.info(f"⏩ CASCADE SKIP: screen {screen_score:.3f} < {cascade_threshold:.3f}")
+                    return None
             
             # Run the AI analysis (this was missing!)
             text_analysis = await content_analyzer.analyze_text(message.content)
@@ -952,6 +1187,7 @@ class CommunityClara(commands.Bot):
                 # Parse JSON fields safely
                 moderation_channels = []
                 exempt_roles = []
+                spam_weights = {}
                 
                 try:
                     if server.moderation_channels:
@@ -965,10 +1201,19 @@ class CommunityClara(commands.Bot):
                 except:
                     pass
                 
+                try:
+                    if getattr(server, 'spam_weights', None):
+                        spam_weights = json.loads(server.spam_weights)
+                except:
+                    pass
+                
                 config = {
                     'toxicity_threshold': float(server.toxicity_threshold),  # Should be 0.3
-                    'spam_threshold': getattr(server, 'spam_threshold', 0.7),
+                    'spam_threshold': getattr(server, 'spam_threshold', None) or DEFAULT_SPAM_THRESHOLD,
+                    'spam_weights': spam_weights if isinstance(spam_weights, dict) else {},
+                    'raid_fanout': server.raid_fanout if getattr(server, 'raid_fanout', None) is not None else 0,
                     'harassment_threshold': getattr(server, 'harassment_threshold', 0.7),
+                    'cascade_threshold': float(getattr(server, 'cascade_threshold', None) or 0.0),
                     'auto_delete': bool(server.auto_delete),
                     'auto_timeout': bool(server.auto_timeout),
                     'timeout_duration': int(server.timeout_duration),
@@ -1048,6 +1293,8 @@ class CommunityClara(commands.Bot):
             if not server_config:
                 return
             
+            await self._scan_member_avatar(member, server_config)
+            
             welcome_template = server_config.get('welcome_message', '')
             if not welcome_template:
                 return
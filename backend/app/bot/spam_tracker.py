@@ -1,20 +1,317 @@
 # backend/app/bot/spam_tracker.py
-from collections import defaultdict, deque
-from datetime import datetime, timedelta
-from typing import Dict, List, Tuple
+"""
+Per-guild, per-user message rate and repetition tracking for spam detection.
+
+State is kept per (guild, user), so activity in one server never counts
+toward another, and each guild scores with its own weights and threshold
+(``Server.spam_weights`` / ``Server.spam_threshold``; the stored default of
+0.7 is the long-standing 50-point cut-off, see ``spam_cutoff``). State per pair is
+fixed size: a 32-message rate ring and a 16-entry fingerprint ring, about
+1.8 KB including dict entries, so roughly 180 MB per 100k pairs active in the
+last 10 minutes (idle pairs are dropped by the periodic cleanup, whole guilds
+by ``evict_guild``). Measured with ``python benchmark_spam_tracker.py memory``.
+
+Each guild also keeps a raid index: recent message fingerprints and the
+distinct users who posted each one. When a server sets ``raid_fanout`` (off
+by default) and that many different users send the same message within the
+raid window, the message is scored as a raid, no matter how new or quiet each
+account is. The index is capped per guild
+(``RAID_INDEX_SIZE`` fingerprints x ``RAID_MAX_USERS`` authors) and every
+update is O(1) amortized; ``python benchmark_spam_tracker.py raid``.
+
+Fingerprints are 64-bit SimHashes (app.utils.simhash) of the message without
+punctuation and emoji, so "ok sure" and "ok sure 😀" are the same message.
+Longer messages also match near-duplicates (a random suffix, a changed
+character) within ``near_duplicate_max_distance`` bits. SimHash cannot tell
+an edit from a different short message ("i agree with you" / "... him"), so
+the tolerance scales with the number of trigrams and is 0 below
+NEAR_DUPLICATE_MIN_SHINGLES.
+"""
+from array import array
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from typing import Dict, List, Mapping, Optional, Tuple
 import asyncio
+import re
+from app.utils.config import config
+from app.utils.simhash import BITS, MAX_CHARS, SHINGLE, bands, popcount, simhash
+
+# Rate windows (seconds) scored by _analyze_spam_patterns
+RAPID_WINDOW, SHORT_WINDOW, MINUTE_WINDOW = 0, 1, 2
+WINDOW_SECONDS = (10.0, 30.0, 60.0)
+# Recent messages kept per user; counts saturate here (every threshold is far below)
+RING_SIZE = 32
+SHORT_MESSAGE_CHARS = 2
+
+# Repetition: the last 16 meaningful messages per user, counted only within 10 minutes
+REPEAT_RING_SIZE = 16
+REPEAT_WINDOW_SECONDS = 600.0
+
+# Raid index near-duplicate lookup: LSH bands per fingerprint, and band keys an entry may collect from variants
+RAID_BANDS = 4
+RAID_KEYS_PER_ENTRY = 16
+
+# Near-duplicates: exact matches only below MIN trigrams (~25 characters), the full
+# tolerance from FULL trigrams (~50 characters), scaled linearly in between
+NEAR_DUPLICATE_MIN_SHINGLES = 24
+NEAR_DUPLICATE_FULL_SHINGLES = 48
+# Stripped before fingerprinting, so appended punctuation or emoji does not make a new message
+_SYMBOLS = re.compile(r"[^\w\s]")
+
+# Points per signal; a server's spam_weights JSON overrides any of these
+DEFAULT_SPAM_WEIGHTS = {
+    "rapid_fire": 40,
+    "repeated": 60,
+    "duplicate": 25,
+    "short_spam": 35,
+    "high_frequency": 50,
+    "consistent_short": 30,
+    "raid": 100,
+}
+# Server.spam_threshold's default. It maps to SPAM_POINTS_AT_DEFAULT, so guilds that never changed
+# the setting keep flagging one strong signal ("repeated" 60, "high_frequency" 50) on its own
+DEFAULT_SPAM_THRESHOLD = 0.7
+SPAM_POINTS_AT_DEFAULT = 50
+# Distinct users posting the same message within the raid window. Off unless a server opts in:
+# a busy guild easily gets 10 "happy new year everyone!!" in a minute
+DEFAULT_RAID_FANOUT = 0
+
+class RateWindows:
+    """A user's recent messages with running totals for the 10s, 30s and 60s windows.
+    
+    Messages sit in a fixed-size ring. Each window keeps the position of its
+    oldest message plus a count, short-message count and length sum, and
+    moves that position forward as messages age out. Every message enters
+    and leaves each window once, so an update is O(1) amortized with no
+    per-message lists.
+    """
+    __slots__ = ("times", "lengths", "total", "starts", "counts", "short_counts", "length_sums", "last_seen")
+    
+    def __init__(self):
+        self.times = array("d", bytes(8 * RING_SIZE))
+        self.lengths = array("i", bytes(4 * RING_SIZE))
+        self.total = 0  # messages ever added; position of the next one
+        self.starts = [0, 0, 0]
+        self.counts = [0, 0, 0]
+        self.short_counts = [0, 0, 0]
+        self.length_sums = [0, 0, 0]
+        self.last_seen = 0.0
+    
+    def add(self, now: float, length: int):
+        # The slot about to be overwritten must have left every window
+        oldest_kept = self.total - RING_SIZE + 1
+        for window in (RAPID_WINDOW, SHORT_WINDOW, MINUTE_WINDOW):
+            self._expire(window, now - WINDOW_SECONDS[window], oldest_kept)
+        
+        slot = self.total % RING_SIZE
+        self.times[slot] = now
+        self.lengths[slot] = length
+        self.total += 1
+        self.last_seen = now
+        
+        short = length <= SHORT_MESSAGE_CHARS
+        for window in (RAPID_WINDOW, SHORT_WINDOW, MINUTE_WINDOW):
+            self.counts[window] += 1
+            self.short_counts[window] += short
+            self.length_sums[window] += length
+    
+    def _expire(self, window: int, cutoff: float, oldest_kept: int):
+        position = self.starts[window]
+        while position < self.total and (position < oldest_kept or self.times[position % RING_SIZE] < cutoff):
+            length = self.lengths[position % RING_SIZE]
+            self.counts[window] -= 1
+            self.short_counts[window] -= length <= SHORT_MESSAGE_CHARS
+            self.length_sums[window] -= length
+            position += 1
+        self.starts[window] = position
+
+class RecentFingerprints:
+    """A user's last REPEAT_RING_SIZE message SimHashes and their times.
+    
+    Fixed size, so memory per user is capped and a lookup is at most
+    REPEAT_RING_SIZE XOR/popcounts; a repeat only counts while the earlier
+    copy is inside REPEAT_WINDOW_SECONDS.
+    """
+    __slots__ = ("hashes", "times", "total")
+    
+    def __init__(self):
+        self.hashes = array("Q", bytes(8 * REPEAT_RING_SIZE))
+        self.times = array("d", bytes(8 * REPEAT_RING_SIZE))
+        self.total = 0
+    
+    def add(self, fingerprint: int, now: float, max_distance: int = 0) -> int:
+        """Record a message; returns its count (near-duplicates included) within the window, this one included"""
+        cutoff = now - REPEAT_WINDOW_SECONDS
+        count = 1
+        for seen, when in zip(self.hashes, self.times):
+            if when >= cutoff and popcount(seen ^ fingerprint) <= max_distance:
+                count += 1
+        
+        slot = self.total % REPEAT_RING_SIZE
+        self.hashes[slot] = fingerprint
+        self.times[slot] = now
+        self.total += 1
+        return count
+    
+    @property
+    def last_seen(self) -> float:
+        return self.times[(self.total - 1) % REPEAT_RING_SIZE] if self.total else 0.0
+
+class RaidEntry:
+    """Authors of one message in the raid window, plus the LSH keys pointing at it"""
+    __slots__ = ("authors", "keys")
+    
+    def __init__(self):
+        self.authors: "OrderedDict[str, float]" = OrderedDict()  # user_id -> last posted
+        self.keys: List[int] = []
+
+class RaidIndex:
+    """A guild's recent message fingerprints and the distinct users behind each.
+    
+    Fingerprints are ordered by when they were last posted and each one's
+    authors by when they posted it, so whatever is older than the window is
+    always at the front and expires in O(1) amortized. Both levels are
+    capped; past the caps the least recently posted entries go first.
+    
+    Near-duplicates join an existing entry through LSH: each fingerprint is
+    cut into RAID_BANDS bands, a post sharing any band with an entry (or with
+    a variant already merged into it) is checked with one popcount, so a
+    lookup is a handful of dict probes however big the guild is.
+    """
+    __slots__ = ("window_seconds", "max_fingerprints", "max_authors", "max_distance", "entries", "band_index")
+    
+    def __init__(self, window_seconds: float, max_fingerprints: int, max_authors: int, max_distance: int = 0):
+        self.window_seconds = window_seconds
+        self.max_fingerprints = max_fingerprints
+        self.max_authors = max_authors
+        self.max_distance = max_distance
+        # fingerprint of the first post -> RaidEntry
+        self.entries: "OrderedDict[int, RaidEntry]" = OrderedDict()
+        # band key -> entry fingerprint
+        self.band_index: Dict[int, int] = {}
+    
+    def add(self, fingerprint: int, user_id: str, now: float,
+            max_distance: Optional[int] = None) -> Tuple["OrderedDict[str, float]", bool]:
+        """Record a post; returns the message's authors in the window and whether this user is new to it.
+        
+        ``max_distance`` (at most the index's own) narrows the match for short messages.
+        """
+        cutoff = self.expire(now)
+        max_distance = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        
+        key = fingerprint
+        entry = self.entries.get(key)
+        band_keys = bands(fingerprint, RAID_BANDS) if max_distance else []
+        if entry is None:
+            for band_key in band_keys:
+                candidate = self.band_index.get(band_key)
+                if candidate is not None and popcount(candidate ^ fingerprint) <= max_distance:
+                    key, entry = candidate, self.entries[candidate]
+                    break
+        
+        if entry is None:
+            if len(self.entries) >= self.max_fingerprints:
+                self._drop(*self.entries.popitem(last=False))
+            entry = self.entries[key] = RaidEntry()
+        else:
+            self.entries.move_to_end(key)
+            while entry.authors and next(iter(entry.authors.values())) < cutoff:
+                entry.authors.popitem(last=False)
+        
+        # Index this variant's bands too, so later variants can match any of them
+        for band_key in band_keys:
+            if len(entry.keys) >= RAID_KEYS_PER_ENTRY:
+                break
+            if band_key not in self.band_index:
+                self.band_index[band_key] = key
+                entry.keys.append(band_key)
+        
+        authors = entry.authors
+        new_author = user_id not in authors
+        authors[user_id] = now
+        if new_author:
+            if len(authors) > self.max_authors:
+                authors.popitem(last=False)
+        else:
+            authors.move_to_end(user_id)
+        return authors, new_author
+    
+    def expire(self, now: float) -> float:
+        """Drop fingerprints nobody posted within the window; returns the cutoff"""
+        cutoff = now - self.window_seconds
+        entries = self.entries
+        while entries:
+            authors = next(iter(entries.values())).authors
+            if authors and next(reversed(authors.values())) >= cutoff:
+                break
+            self._drop(*entries.popitem(last=False))
+        return cutoff
+    
+    def _drop(self, key: int, entry: RaidEntry):
+        for band_key in entry.keys:
+            if self.band_index.get(band_key) == key:
+                del self.band_index[band_key]
+
+def spam_cutoff(threshold: float) -> float:
+    """Points at which a message is spam for a guild's spam_threshold (0.7 -> 50, 1.0 -> ~71)"""
+    return threshold / DEFAULT_SPAM_THRESHOLD * SPAM_POINTS_AT_DEFAULT
+
+class GuildSpamState:
+    """One guild's per-user windows and raid index plus its scoring settings"""
+    __slots__ = ("user_messages", "user_content", "raid_index", "weights", "threshold", "raid_fanout")
+    
+    def __init__(self, raid_index: RaidIndex):
+        # User message rates: user_id -> RateWindows
+        self.user_messages: Dict[str, RateWindows] = defaultdict(RateWindows)
+        # User repeated content: user_id -> RecentFingerprints
+        self.user_content: Dict[str, RecentFingerprints] = defaultdict(RecentFingerprints)
+        self.raid_index = raid_index
+        self.weights: Dict[str, float] = dict(DEFAULT_SPAM_WEIGHTS)
+        self.threshold = DEFAULT_SPAM_THRESHOLD
+        self.raid_fanout = DEFAULT_RAID_FANOUT
+    
+    def configure(self, threshold: Optional[float], weights: Optional[Mapping[str, float]],
+                  raid_fanout: Optional[int] = None):
+        if threshold is not None:
+            self.threshold = float(threshold)
+        if raid_fanout is not None:
+            self.raid_fanout = int(raid_fanout)
+        self.weights = dict(DEFAULT_SPAM_WEIGHTS)
+        for signal, points in (weights or {}).items():
+            if signal in DEFAULT_SPAM_WEIGHTS:
+                self.weights[signal] = float(points)
 
 class SpamTracker:
     """Track message frequency and patterns for spam detection"""
     
-    def __init__(self):
-        # User message history: user_id -> deque of (timestamp, message_length)
-        self.user_messages: Dict[str, deque] = defaultdict(lambda: deque(maxlen=20))
-        # User repeated content: user_id -> {content: count}
-        self.user_content: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    def __init__(self, raid_window_seconds: float = 60.0, raid_index_size: int = 10000,
+                 raid_max_users: int = 100, raid_min_chars: int = 12, near_duplicate_similarity: float = 0.875):
+        self.raid_window_seconds = raid_window_seconds
+        self.raid_index_size = raid_index_size
+        self.raid_max_users = raid_max_users
+        # Shorter messages ("gm", "lol") are posted by many people at once legitimately
+        self.raid_min_chars = raid_min_chars
+        # SimHash bits two long messages may differ in and still count as the same (0.875 -> 8 of 64)
+        self.near_duplicate_max_distance = int(round((1.0 - near_duplicate_similarity) * BITS))
+        # guild_id -> GuildSpamState ("" for messages outside a guild)
+        self.guilds: Dict[str, GuildSpamState] = defaultdict(self._new_guild_state)
         # Cleanup task
         self._cleanup_task = None
         
+    def _new_guild_state(self) -> GuildSpamState:
+        return GuildSpamState(RaidIndex(
+            self.raid_window_seconds, self.raid_index_size, self.raid_max_users, self.near_duplicate_max_distance
+        ))
+    
+    def fingerprint(self, content_lower: str) -> Tuple[int, int]:
+        """SimHash of a normalized message without punctuation/emoji, and how many bits a copy may differ by"""
+        text = " ".join(_SYMBOLS.sub(" ", content_lower).split()) or content_lower
+        shingles = min(len(text), MAX_CHARS) - SHINGLE + 1
+        if shingles < NEAR_DUPLICATE_MIN_SHINGLES:
+            return simhash(text), 0
+        scale = min(1.0, shingles / NEAR_DUPLICATE_FULL_SHINGLES)
+        return simhash(text), int(round(self.near_duplicate_max_distance * scale))
+    
     async def start_cleanup(self):
         """Start background cleanup of old data"""
         if self._cleanup_task is None:
@@ -25,100 +322,137 @@ class SpamTracker:
         while True:
             try:
                 await asyncio.sleep(300)  # 5 minutes
-                cutoff_time = datetime.now() - timedelta(minutes=10)
-                
-                # Clean old messages
-                for user_id, messages in self.user_messages.items():
-                    # Remove messages older than 10 minutes
-                    while messages and messages[0][0] < cutoff_time:
-                        messages.popleft()
+                now = datetime.utcnow().timestamp()
                 
-                # Clean empty content trackers
-                empty_users = [uid for uid, content in self.user_content.items() if not content]
-                for uid in empty_users:
-                    del self.user_content[uid]
+                for guild_id, state in list(self.guilds.items()):
+                    # Drop users idle for 10 minutes (all their windows are empty)
+                    idle_users = [uid for uid, windows in state.user_messages.items() if windows.last_seen < now - 600]
+                    for uid in idle_users:
+                        del state.user_messages[uid]
+                    
+                    # Drop fingerprints once the newest is past the repeat window
+                    stale_users = [uid for uid, recent in state.user_content.items() if recent.last_seen < now - REPEAT_WINDOW_SECONDS]
+                    for uid in stale_users:
+                        del state.user_content[uid]
+                    
+                    state.raid_index.expire(now)
+                    
+                    if not state.user_messages and not state.user_content and not state.raid_index.entries:
+                        del self.guilds[guild_id]
                     
             except Exception as e:
                 print(f"Cleanup error: {e}")
     
-    def add_message(self, user_id: str, content: str, timestamp: datetime = None) -> Dict[str, any]:
+    def configure_guild(self, guild_id: str, threshold: Optional[float] = None,
+                        weights: Optional[Mapping[str, float]] = None, raid_fanout: Optional[int] = None):
+        """Set a guild's spam threshold (0-1, fraction of 100 points), weight overrides and raid fan-out"""
+        if raid_fanout is not None:
+            # The index lists at most raid_max_users authors per message, so it must be able to exceed the fan-out
+            raid_fanout = min(int(raid_fanout), self.raid_max_users - 1)
+        self.guilds[guild_id].configure(threshold, weights, raid_fanout)
+    
+    def evict_guild(self, guild_id: str) -> bool:
+        """Forget all state for a guild (e.g. the bot left it); True if there was any"""
+        return self.guilds.pop(guild_id, None) is not None
+    
+    def add_message(self, user_id: str, content: str, timestamp: datetime = None,
+                    guild_id: str = "") -> Dict[str, any]:
         """Add message and return spam analysis"""
         if timestamp is None:
             timestamp = datetime.utcnow()
         
-        # Add to user's message history
-        messages = self.user_messages[user_id]
-        messages.append((timestamp, len(content)))
+        now = timestamp.timestamp()
+        state = self.guilds[guild_id]
+        
+        # Add to user's rate windows
+        windows = state.user_messages[user_id]
+        windows.add(now, len(content))
         
-        # Track content repetition
-        content_lower = content.lower().strip()
+        # Track content repetition (near-duplicates included), per user and across the guild
+        content_lower = " ".join(content.lower().split())
+        repeat_count = 0
+        raid_users: List[str] = []
+        raid_started = False
         if len(content_lower) > 2:  # Only track meaningful content
-            self.user_content[user_id][content_lower] += 1
+            fingerprint, max_distance = self.fingerprint(content_lower)
+            repeat_count = state.user_content[user_id].add(fingerprint, now, max_distance)
+            
+            if state.raid_fanout and len(content_lower) >= self.raid_min_chars:
+                authors, new_author = state.raid_index.add(fingerprint, user_id, now, max_distance)
+                if len(authors) >= state.raid_fanout:
+                    raid_users = list(authors)
+                    raid_started = new_author and len(authors) == state.raid_fanout
         
         # Analyze for spam patterns
-        return self._analyze_spam_patterns(user_id, content, timestamp)
+        analysis = self._analyze_spam_patterns(state, windows, content, repeat_count, len(raid_users))
+        analysis["raid_users"] = raid_users
+        analysis["raid_started"] = raid_started
+        return analysis
     
-    def _analyze_spam_patterns(self, user_id: str, content: str, timestamp: datetime) -> Dict[str, any]:
+    def _analyze_spam_patterns(self, state: GuildSpamState, windows: RateWindows, content: str,
+                               repeat_count: int, raid_authors: int = 0) -> Dict[str, any]:
         """Analyze message patterns for spam detection"""
-        messages = self.user_messages[user_id]
-        content_tracker = self.user_content[user_id]
+        weights = state.weights
+        counts = windows.counts
         
         spam_score = 0
         spam_reasons = []
         
         # 1. RAPID FIRE DETECTION (5+ messages in 10 seconds)
-        ten_seconds_ago = timestamp - timedelta(seconds=10)
-        recent_messages = [msg for msg in messages if msg[0] >= ten_seconds_ago]
-        
-        if len(recent_messages) >= 5:
-            spam_score += 40
-            spam_reasons.append(f"rapid fire: {len(recent_messages)} messages in 10s")
-        
-        # 2. CONTENT REPETITION (same message 3+ times)
-        content_lower = content.lower().strip()
-        repeat_count = content_tracker.get(content_lower, 0)
+        if counts[RAPID_WINDOW] >= 5:
+            spam_score += weights["rapid_fire"]
+            spam_reasons.append(f"rapid fire: {counts[RAPID_WINDOW]} messages in 10s")
         
+        # 2. CONTENT REPETITION (same message 3+ times within the repeat window)
         if repeat_count >= 3:
-            spam_score += 60
+            spam_score += weights["repeated"]
             spam_reasons.append(f"repeated content: '{content[:30]}...' x{repeat_count}")
         elif repeat_count >= 2:
-            spam_score += 25
+            spam_score += weights["duplicate"]
             spam_reasons.append(f"duplicate content: '{content[:30]}...' x{repeat_count}")
         
         # 3. VERY SHORT SPAM (1-2 character messages sent rapidly)
-        thirty_seconds_ago = timestamp - timedelta(seconds=30)
-        very_recent = [msg for msg in messages if msg[0] >= thirty_seconds_ago]
+        very_recent = counts[SHORT_WINDOW]
         
-        if len(very_recent) >= 3:
-            short_messages = [msg for msg in very_recent if msg[1] <= 2]
-            if len(short_messages) >= 3:
-                spam_score += 35
-                spam_reasons.append(f"short spam: {len(short_messages)} messages ≤2 chars")
+        if very_recent >= 3:
+            short_messages = windows.short_counts[SHORT_WINDOW]
+            if short_messages >= 3:
+                spam_score += weights["short_spam"]
+                spam_reasons.append(f"short spam: {short_messages} messages ≤2 chars")
         
         # 4. HIGH MESSAGE FREQUENCY ANALYSIS
-        minute_ago = timestamp - timedelta(minutes=1)
-        recent_minute = [msg for msg in messages if msg[0] >= minute_ago]
-        if len(recent_minute) >= 8:  # 8+ messages per minute
-            spam_score += 50
-            spam_reasons.append(f"high frequency: {len(recent_minute)} messages/minute")
+        if counts[MINUTE_WINDOW] >= 8:  # 8+ messages per minute
+            spam_score += weights["high_frequency"]
+            spam_reasons.append(f"high frequency: {counts[MINUTE_WINDOW]} messages/minute")
         
         # 5. CONSISTENT SHORT MESSAGES (all recent messages are very short)
-        if len(very_recent) >= 3:
-            avg_length = sum(msg[1] for msg in very_recent) / len(very_recent)
+        if very_recent >= 3:
+            avg_length = windows.length_sums[SHORT_WINDOW] / very_recent
             if avg_length <= 2:  # Average 2 chars or less
-                spam_score += 30
+                spam_score += weights["consistent_short"]
                 spam_reasons.append(f"consistent short messages: avg {avg_length:.1f} chars")
         
-        is_spam = spam_score >= 50
+        # 6. RAID (many different users posting the same message within the raid window)
+        if raid_authors:
+            spam_score += weights["raid"]
+            spam_reasons.append(f"raid: {raid_authors} users posted this within {self.raid_window_seconds:.0f}s")
+        
+        is_spam = spam_score >= spam_cutoff(state.threshold)
         
         return {
             "spam_score": spam_score,
             "reasons": spam_reasons,
             "is_spam": is_spam,
-            "message_count_10s": len(recent_messages),
+            "message_count_10s": counts[RAPID_WINDOW],
             "repeat_count": repeat_count,
-            "recent_messages": len(very_recent)
+            "recent_messages": very_recent
         }
 
 # Global spam tracker instance
-spam_tracker = SpamTracker()
\ No newline at end of file
+spam_tracker = SpamTracker(
+    raid_window_seconds=config.RAID_WINDOW_SECONDS,
+    raid_index_size=config.RAID_INDEX_SIZE,
+    raid_max_users=config.RAID_MAX_USERS,
+    raid_min_chars=config.RAID_MIN_CHARS,
+    near_duplicate_similarity=config.NEAR_DUPLICATE_SIMILARITY
+)
@@ -1,5 +1,5 @@
 # backend/app/database/connection.py
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker, Session
 from contextlib import contextmanager
 from app.utils.config import config
@@ -20,11 +20,31 @@ def create_tables():
     """Create all database tables"""
     try:
         Base.metadata.create_all(bind=engine)
+        _add_missing_columns()
         logger.info("Database tables created successfully")
     except Exception as e:
         logger.error(f"Error creating database tables: {e}")
         raise
 
+def _add_missing_columns():
+    """create_all() skips existing tables, so add columns introduced since the table was made"""
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                default = ""
+                if column.default is not None and column.default.is_scalar:
+                    value = column.default.arg
+                    default = f" DEFAULT {str(value).upper() if isinstance(value, bool) else repr(value)}"
+                connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}{default}'))
+                logger.info(f"Added column {table.name}.{column.name}")
+
 @contextmanager
 def get_db_session():
     """Get database session with automatic cleanup"""
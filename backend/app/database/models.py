@@ -20,7 +20,13 @@ class Server(Base):
     nsfw_threshold = Column(Float, default=0.7)
     toxicity_threshold = Column(Float, default=0.7)
     spam_threshold = Column(Float, default=0.7)
+    # JSON overrides of the spam signal weights (see spam_tracker.DEFAULT_SPAM_WEIGHTS)
+    spam_weights = Column(Text, default='{}')
+    # Distinct users posting the same message within RAID_WINDOW_SECONDS that counts as a raid (0 = off)
+    raid_fanout = Column(Integer, default=0)
     harassment_threshold = Column(Float, default=0.7)
+    # Messages the cascade screen scores below this skip the toxicity model (0 = always run it)
+    cascade_threshold = Column(Float, default=0.0)
     
     # Action settings
     auto_delete = Column(Boolean, default=True)
@@ -139,4 +145,20 @@ class ServerAnalytics(Base):
     engagement_score = Column(Float, default=1.0)  # 0.0 to 1.0
     
     # Relationships
-    server = relationship("Server", back_populates="analytics")
\ No newline at end of file
+    server = relationship("Server", back_populates="analytics")
+
+class AssetVerdict(Base):
+    """NSFW verdict for an immutable Discord asset (sticker, custom emoji, avatar)"""
+    __tablename__ = "asset_verdicts"
+    
+    # Sticker and emoji IDs never change content; avatars change hash instead
+    asset_type = Column(String, primary_key=True)  # sticker, emoji, avatar
+    asset_id = Column(String, primary_key=True)
+    asset_hash = Column(String, primary_key=True, default='')
+    model = Column(String, primary_key=True)  # verdicts from another model are not reused
+    
+    is_nsfw = Column(Boolean, nullable=False)
+    score = Column(Float, nullable=False)
+    label = Column(String, nullable=False)  # nsfw, safe, skipped
+    reason = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
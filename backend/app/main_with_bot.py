@@ -22,11 +22,13 @@ from app.api.contact import router as contact_router  # ADD THIS LINE
 # Import bot components
 bot_task = None
 bot_instance = None
+warmup_task = None
+image_warmup_task = None
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan with Discord bot integration"""
-    global bot_task, bot_instance
+    global bot_task, bot_instance, warmup_task, image_warmup_task
     
     logger.info("🚀 Starting ClaraBot AI with Discord Integration")
     
@@ -35,6 +37,16 @@ async def lifespan(app: FastAPI):
         create_tables()
         logger.info("✅ Database initialized")
         
+        # Load and warm up the AI model in the background so the API comes up immediately
+        from app.ml.content_analyzer import content_analyzer
+        if hasattr(content_analyzer, 'warm_up'):
+            logger.info("🔥 Warming up content analyzer in background...")
+            warmup_task = asyncio.create_task(content_analyzer.warm_up())
+        
+        # Same for the NSFW image model; images get a "not ready" result until it loads
+        from app.ml.image_analyzer import image_analyzer
+        image_warmup_task = asyncio.create_task(image_analyzer.warm_up())
+        
         # Start Discord bot if token is available
         if config.DISCORD_BOT_TOKEN:
             logger.info("🤖 Starting Discord bot...")
@@ -77,6 +89,11 @@ async def lifespan(app: FastAPI):
         # Cleanup
         logger.info("🛑 Shutting down ClaraBot AI...")
         
+        if warmup_task and not warmup_task.done():
+            warmup_task.cancel()
+        if image_warmup_task and not image_warmup_task.done():
+            image_warmup_task.cancel()
+        
         if bot_task and not bot_task.done():
             logger.info("🤖 Stopping Discord bot...")
             bot_task.cancel()
@@ -91,6 +108,22 @@ async def lifespan(app: FastAPI):
             except:
                 pass
         
+        from app.utils.http_client import http_client
+        await http_client.aclose()
+        
+        # Stop the per-model inference executors
+        from app.ml.resource_manager import resource_manager
+        resource_manager.shutdown()
+        
+        # Let inference worker processes exit instead of leaving it to garbage collection
+        from app.ml.content_analyzer import content_analyzer
+        if hasattr(content_analyzer, 'shutdown'):
+            await asyncio.to_thread(content_analyzer.shutdown)
+        
+        # Keep cached image verdicts across restarts
+        from app.ml.image_analyzer import image_analyzer
+        image_analyzer.hash_cache.save()
+        
         logger.info("✅ Shutdown complete")
 
 # Create FastAPI application
@@ -172,12 +205,39 @@ async def health_check():
         
         # Check AI analyzer
         ai_status = "operational"
+        ai_model = None
+        image_model = None
+        performance = {}
         try:
             from app.ml.content_analyzer import content_analyzer
             if hasattr(content_analyzer, 'initialized'):
                 ai_status = "operational" if content_analyzer.initialized else "loading"
             else:
                 ai_status = "fallback"
+            
+            if hasattr(content_analyzer, 'model_status'):
+                ai_model = content_analyzer.model_status()
+            
+            if hasattr(content_analyzer, 'cache'):
+                performance["verdict_cache"] = content_analyzer.stats()
+            if hasattr(content_analyzer, 'performance_stats'):
+                performance.update(content_analyzer.performance_stats())
+            
+            from app.ml.cascade import cascade_screen
+            performance["cascade"] = cascade_screen.stats()
+            
+            from app.ml.resource_manager import resource_manager
+            performance["cpu"] = resource_manager.stats()
+            
+            from app.utils.http_client import http_client
+            performance["http"] = http_client.stats()
+            
+            from app.ml.image_analyzer import image_analyzer
+            image_model = image_analyzer.model_status()
+            performance.update(image_analyzer.performance_stats())
+            
+            from app.ml.asset_scanner import asset_scanner
+            performance["asset_verdicts"] = asset_scanner.stats()
         except:
             ai_status = "error"
         
@@ -190,11 +250,14 @@ async def health_check():
                 "ai_analyzer": ai_status,
                 "content_analyzer": config.CONTENT_ANALYZER
             },
+            "ai_model": ai_model,
+            "image_model": image_model,
             "bot_info": {
                 "servers_connected": len(bot_instance.guilds) if bot_instance and not bot_instance.is_closed() else 0,
                 "messages_processed": getattr(bot_instance, 'processed_messages', 0) if bot_instance else 0,
                 "violations_detected": getattr(bot_instance, 'violations_detected', 0) if bot_instance else 0
-            }
+            },
+            "performance": performance
         }
         
     except Exception as e:
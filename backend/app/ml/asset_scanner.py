@@ -0,0 +1,144 @@
+# backend/app/ml/asset_scanner.py
+"""
+NSFW verdicts for Discord assets (stickers, custom emoji, avatars), memoized
+permanently by asset ID and hash.
+
+Sticker and emoji IDs always point at the same image, and an avatar gets a
+new hash whenever it changes, so (type, id, hash) identifies the pixels. Each
+asset is classified once; afterwards the verdict comes from memory or the
+``asset_verdicts`` table. Skipped assets (over the byte or frame budget,
+undecodable) have no verdict: they are only remembered in memory for
+ASSET_SKIP_TTL_SECONDS and then retried, so a raised budget applies to them.
+"""
+import asyncio
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Tuple
+from app.utils.config import config
+from app.utils.logger import logger
+from app.database.connection import get_db_session
+from app.database.models import AssetVerdict
+from app.ml.image_analyzer import image_analyzer, NSFW_IMAGE_MODEL
+from app.ml.verdict_cache import VerdictCache
+
+STICKER = "sticker"
+EMOJI = "emoji"
+AVATAR = "avatar"
+
+
+class AssetRef(NamedTuple):
+    asset_type: str
+    asset_id: str
+    asset_hash: str  # "" for stickers and emoji
+    url: str
+
+
+class AssetScanner:
+    """Memory cache -> database -> ImageAnalyzer, with one analysis in flight per asset"""
+
+    def __init__(self, cache_size: int, model: str):
+        self.model = model
+        self.cache = VerdictCache(max_entries=cache_size, ttl_seconds=0)  # never expires
+        self._in_flight: Dict[Tuple[str, str, str], asyncio.Future] = {}
+
+        self.db_hits = 0
+        self.analyzed = 0
+
+    async def scan(self, asset: AssetRef, wait_for_model: bool = False) -> Optional[Dict[str, Any]]:
+        """Verdict for one asset; None if it could not be fetched (not stored, retried next time).
+
+        Stickers and emoji are seen again, so by default they are skipped
+        while the model loads. ``wait_for_model`` is for one-off events
+        (a member joining) that would otherwise never be checked.
+        """
+        key = (asset.asset_type, asset.asset_id, asset.asset_hash)
+        verdict = self.cache.get(key)
+        if verdict is not None:
+            return verdict
+
+        # SQLAlchemy sessions are blocking; keep them off the event loop
+        verdict = await asyncio.to_thread(self._load, key)
+        if verdict is not None:
+            self.db_hits += 1
+            self.cache.put(key, verdict)
+            return verdict
+
+        if not image_analyzer.ready:
+            if not wait_for_model:
+                image_analyzer.start_loading()
+                return None
+            if not await image_analyzer.ensure_ready():
+                return None  # no image model in this install
+
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._analyze(key, asset.url))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def scan_many(self, assets: Iterable[AssetRef]) -> Optional[Dict[str, Any]]:
+        """First NSFW verdict among ``assets`` (scanned concurrently), or None"""
+        assets = list(assets)
+        for asset, verdict in zip(assets, await asyncio.gather(*(self.scan(a) for a in assets))):
+            if verdict and verdict["is_nsfw"]:
+                return {**verdict, "source": f"{asset.asset_type}:{asset.asset_id}"}
+        return None
+
+    async def _analyze(self, key: Tuple[str, str, str], url: str) -> Optional[Dict[str, Any]]:
+        result = await image_analyzer.analyze_image(url)
+        if result is None or result["label"] == "not_ready":
+            return None
+        verdict = {
+            "is_nsfw": result["is_nsfw"],
+            "score": result["score"],
+            "label": result["label"],
+            "reason": result.get("reason")
+        }
+        if result["label"] == "skipped":
+            self.cache.put(key, verdict, ttl_seconds=config.ASSET_SKIP_TTL_SECONDS)
+            return verdict
+        self.analyzed += 1
+        self.cache.put(key, verdict)
+        await asyncio.to_thread(self._store, key, verdict)
+        return verdict
+
+    def _load(self, key: Tuple[str, str, str]) -> Optional[Dict[str, Any]]:
+        asset_type, asset_id, asset_hash = key
+        try:
+            with get_db_session() as session:
+                row = session.query(AssetVerdict).filter_by(
+                    asset_type=asset_type, asset_id=asset_id, asset_hash=asset_hash, model=self.model
+                ).first()
+                if row is None or row.label == "skipped":
+                    return None  # rows from before skips stopped being stored are retried
+                return {"is_nsfw": row.is_nsfw, "score": row.score, "label": row.label, "reason": row.reason}
+        except Exception as e:
+            logger.error(f"❌ Failed to read asset verdict {key}: {e}")
+            return None
+
+    def _store(self, key: Tuple[str, str, str], verdict: Dict[str, Any]):
+        asset_type, asset_id, asset_hash = key
+        try:
+            with get_db_session() as session:
+                session.merge(AssetVerdict(
+                    asset_type=asset_type,
+                    asset_id=asset_id,
+                    asset_hash=asset_hash,
+                    model=self.model,
+                    is_nsfw=verdict["is_nsfw"],
+                    score=verdict["score"],
+                    label=verdict["label"],
+                    reason=verdict["reason"]
+                ))
+        except Exception as e:
+            logger.error(f"❌ Failed to store asset verdict {key}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "memory": self.cache.stats(),
+            "db_hits": self.db_hits,
+            "analyzed": self.analyzed
+        }
+
+
+# Global scanner instance
+asset_scanner = AssetScanner(cache_size=config.ASSET_VERDICT_CACHE_SIZE, model=NSFW_IMAGE_MODEL)
@@ -0,0 +1,138 @@
+# backend/app/ml/batching.py
+"""
+Micro-batching queue for model inference
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+from app.utils.logger import logger
+
+
+class MicroBatcher:
+    """Collect concurrent inference requests into batches.
+
+    Requests are held for at most ``max_wait_ms`` (or until ``max_batch_size``
+    items are queued), then handed to ``process_batch`` as one list. Results
+    are fanned back out to the awaiting coroutines in submission order.
+    """
+
+    def __init__(
+        self,
+        process_batch: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 10.0,
+        max_concurrent_batches: int = 1,
+        name: str = "batcher"
+    ):
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.max_concurrent_batches = max(1, max_concurrent_batches)
+        self.name = name
+
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer = None
+        self._inflight = 0
+
+        # Counters for /health and benchmarks
+        self.batches_run = 0
+        self.items_processed = 0
+        self.largest_batch = 0
+
+    @property
+    def pending(self) -> int:
+        """Number of requests waiting for a batch slot"""
+        return len(self._pending)
+
+    @property
+    def inflight(self) -> int:
+        """Number of batches currently being processed"""
+        return self._inflight
+
+    async def submit(self, item: Any) -> Any:
+        """Queue a single item and wait for its result"""
+        results = await self.submit_many([item])
+        return results[0]
+
+    async def submit_many(self, items: List[Any]) -> List[Any]:
+        """Queue several items together so they land in the same batch when possible"""
+        if not items:
+            return []
+
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in items]
+        self._pending.extend(zip(items, futures))
+
+        if len(self._pending) >= self.max_batch_size or self.max_wait == 0:
+            self._dispatch()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._on_timer)
+
+        results = await asyncio.gather(*futures, return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return list(results)
+
+    def _on_timer(self):
+        self._timer = None
+        self._dispatch()
+
+    def _dispatch(self):
+        """Start as many batches as the concurrency limit allows"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._pending and self._inflight < self.max_concurrent_batches:
+            batch = self._pending[:self.max_batch_size]
+            del self._pending[:self.max_batch_size]
+
+            # Drop requests whose callers have gone away
+            batch = [(item, future) for item, future in batch if not future.done()]
+            if not batch:
+                continue
+
+            self._inflight += 1
+            asyncio.get_running_loop().create_task(self._run_batch(batch))
+
+    async def _run_batch(self, batch: List[Tuple[Any, asyncio.Future]]):
+        try:
+            items = [item for item, _ in batch]
+            try:
+                results = await self.process_batch(items)
+                if len(results) != len(items):
+                    raise RuntimeError(
+                        f"{self.name}: batch returned {len(results)} results for {len(items)} items"
+                    )
+            except Exception as e:
+                logger.error(f"❌ {self.name} batch of {len(items)} failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+            self.batches_run += 1
+            self.items_processed += len(items)
+            self.largest_batch = max(self.largest_batch, len(items))
+        finally:
+            self._inflight -= 1
+            # Anything that queued up while we were busy goes out immediately
+            if self._pending:
+                self._dispatch()
+
+    def stats(self) -> Dict[str, Any]:
+        """Batching statistics"""
+        return {
+            "pending": self.pending,
+            "inflight_batches": self._inflight,
+            "batches_run": self.batches_run,
+            "items_processed": self.items_processed,
+            "largest_batch": self.largest_batch,
+            "average_batch_size": round(self.items_processed / self.batches_run, 2) if self.batches_run else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0
+        }
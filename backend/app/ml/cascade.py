@@ -0,0 +1,145 @@
+# backend/app/ml/cascade.py
+"""
+Cheap first stage that decides whether a message needs the transformer at all.
+
+The screen combines the analyzer's ``quick_local_scan`` with a small linear
+model over hashed word/bigram features. Messages scoring below a server's
+cascade threshold are treated as clean without running the full model.
+"""
+import json
+import math
+import random
+import re
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from app.utils.logger import logger
+from app.utils.config import config
+from app.ml.lexicon import lexicon
+
+_WORD_RE = re.compile(r"\w+")
+
+HASH_DIMENSIONS = 2 ** 18
+
+
+def _hash_feature(feature: str) -> int:
+    # crc32 rather than hash(): stable across processes, so saved weights stay valid
+    return zlib.crc32(feature.encode("utf-8")) % HASH_DIMENSIONS
+
+
+def extract_features(text: str) -> List[int]:
+    """Hashed indices of the message's unigrams, bigrams, lexicon categories and length bucket"""
+    words = _WORD_RE.findall(text.lower())
+    features = [f"w:{w}" for w in words]
+    features += [f"b:{a}_{b}" for a, b in zip(words, words[1:])]
+    features += [f"c:{hit_category}" for hit_category in _categories(text)]
+    features.append(f"len:{min(len(words) // 5, 10)}")
+    if sum(1 for c in text if c.isupper()) > max(5, len(text) // 2):
+        features.append("shouting")
+    return sorted({_hash_feature(f) for f in features})
+
+
+def _categories(text: str) -> Iterable[str]:
+    return lexicon.scan(text).categories()
+
+
+class HashedLinearScreen:
+    """Logistic regression over hashed features (weights stored sparsely)"""
+
+    def __init__(self, weights: Optional[Dict[int, float]] = None, bias: float = 0.0):
+        self.weights: Dict[int, float] = weights or {}
+        self.bias = bias
+
+    @property
+    def trained(self) -> bool:
+        return bool(self.weights)
+
+    def predict(self, text: str) -> float:
+        """Probability that ``text`` is toxic (0.0 when no weights are loaded)"""
+        if not self.weights:
+            return 0.0
+        z = self.bias + sum(self.weights.get(i, 0.0) for i in extract_features(text))
+        return 1.0 / (1.0 + math.exp(-max(-30.0, min(30.0, z))))
+
+    def train(self, samples: Sequence[Tuple[str, bool]], epochs: int = 5,
+              learning_rate: float = 0.1, l2: float = 1e-5, seed: int = 0):
+        """Fit with plain SGD; fine for the few-thousand-message corpora moderators label"""
+        featurized = [(extract_features(text), 1.0 if label else 0.0) for text, label in samples]
+        rng = random.Random(seed)
+
+        for _ in range(epochs):
+            rng.shuffle(featurized)
+            for indices, target in featurized:
+                z = self.bias + sum(self.weights.get(i, 0.0) for i in indices)
+                error = 1.0 / (1.0 + math.exp(-max(-30.0, min(30.0, z)))) - target
+                self.bias -= learning_rate * error
+                for i in indices:
+                    w = self.weights.get(i, 0.0)
+                    self.weights[i] = w - learning_rate * (error + l2 * w)
+
+    def save(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({
+                "dimensions": HASH_DIMENSIONS,
+                "bias": self.bias,
+                "weights": {str(i): round(w, 6) for i, w in self.weights.items() if abs(w) > 1e-6}
+            }, f)
+
+    @classmethod
+    def load(cls, path: str) -> "HashedLinearScreen":
+        with open(path) as f:
+            data = json.load(f)
+        if data.get("dimensions") != HASH_DIMENSIONS:
+            raise ValueError(f"screen was trained with {data.get('dimensions')} hash dimensions, expected {HASH_DIMENSIONS}")
+        return cls({int(i): w for i, w in data["weights"].items()}, data["bias"])
+
+
+class CascadeScreen:
+    """Stage one of the cascade: max(quick_local_scan, linear model)"""
+
+    def __init__(self, model_path: str = ""):
+        self.model_path = model_path
+        self.linear = HashedLinearScreen()
+        self._stats = {"screened": 0, "skipped": 0, "escalated": 0, "screen_seconds": 0.0}
+
+        if model_path and Path(model_path).exists():
+            try:
+                self.linear = HashedLinearScreen.load(model_path)
+                logger.info(f"✅ Cascade screen loaded from {model_path} ({len(self.linear.weights)} weights)")
+            except Exception as e:
+                logger.error(f"❌ Failed to load cascade screen from {model_path}: {e}")
+        elif model_path:
+            logger.info(f"ℹ️ No cascade screen weights at {model_path} - screening with keywords only")
+
+    async def score(self, text: str, analyzer) -> float:
+        """Risk estimate in [0, 1]; cheap enough to run on every message"""
+        started = time.perf_counter()
+        keyword_score = await analyzer.quick_local_scan(text)
+        score = max(keyword_score, self.linear.predict(text))
+        self._stats["screen_seconds"] += time.perf_counter() - started
+        return score
+
+    async def should_escalate(self, text: str, analyzer, threshold: float) -> Tuple[bool, float]:
+        """Whether the full model must run for ``text`` at this server's cut-off"""
+        score = await self.score(text, analyzer)
+        escalate = threshold <= 0 or score >= threshold
+        self._stats["screened"] += 1
+        self._stats["escalated" if escalate else "skipped"] += 1
+        return escalate, score
+
+    def stats(self) -> Dict[str, Any]:
+        screened = self._stats["screened"]
+        return {
+            "screened": screened,
+            "skipped": self._stats["skipped"],
+            "escalated": self._stats["escalated"],
+            "skip_rate": round(self._stats["skipped"] / screened, 4) if screened else 0.0,
+            "average_screen_ms": round(self._stats["screen_seconds"] / screened * 1000, 3) if screened else 0.0,
+            "linear_model_loaded": self.linear.trained
+        }
+
+
+# Global screen instance
+cascade_screen = CascadeScreen(config.CASCADE_MODEL_PATH)
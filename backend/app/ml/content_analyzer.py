@@ -6,7 +6,17 @@ from app.utils.config import config
 from app.utils.logger import logger
 
 def get_content_analyzer():
-    """Get the appropriate content analyzer based on configuration"""
+    """Get the configured content analyzer, fronted by the verdict cache"""
+    from app.ml.verdict_cache import with_verdict_cache
+    
+    return with_verdict_cache(
+        _select_content_analyzer(),
+        max_entries=config.VERDICT_CACHE_SIZE,
+        ttl_seconds=config.VERDICT_CACHE_TTL_SECONDS
+    )
+
+def _select_content_analyzer():
+    """Get the appropriate content analyzer backend based on configuration"""
     
     analyzer_type = config.CONTENT_ANALYZER.lower()
     logger.info(f"🔧 Initializing content analyzer: {analyzer_type}")
@@ -27,11 +37,26 @@ def get_content_analyzer():
             from app.ml.mock_content_analyzer import mock_content_analyzer
             return mock_content_analyzer
 
+    elif analyzer_type == "onnx":
+        try:
+            from app.ml.onnx_analyzer import onnx_analyzer, ONNX_AVAILABLE
+            if not ONNX_AVAILABLE:
+                raise ImportError("optimum[onnxruntime] is not installed")
+            logger.info("⚡ Using quantized toxic-bert on ONNX Runtime for content analysis")
+            return onnx_analyzer
+        except ImportError as e:
+            logger.error(f"❌ ONNX Runtime backend unavailable: {e}")
+            logger.info("🔄 Falling back to Hugging Face (PyTorch) analyzer")
+            from app.ml.huggingface_analyzer import huggingface_analyzer
+            return huggingface_analyzer
+
     elif analyzer_type == "openai":
         try:
             from openai import OpenAI
             
             class OpenAIAnalyzer:
+                model_version = "openai:text-moderation-latest"
+                
                 def __init__(self):
                     self.client = OpenAI(api_key=config.OPENAI_API_KEY) if config.OPENAI_API_KEY else None
                 
@@ -119,25 +144,10 @@ def get_content_analyzer():
                     if not text or len(text.strip()) < 3:
                         return 0.0
                         
-                    text_lower = text.lower()
-                    
-                    # ENHANCED keyword list for quick scanning
-                    risk_keywords = [
-                        # Sexual violence
-                        'rape', 'raping', 'rapist', 'molest', 'assault',
-                        # Violence/threats  
-                        'kill', 'murder', 'die', 'death', 'shoot', 'stab',
-                        # Hate speech
-                        'nazi', 'hitler', 'jew', 'nigger', 'faggot', 'retard',
-                        # General toxicity
-                        'hate', 'fuck', 'shit', 'bitch', 'asshole', 'cunt',
-                        # NSFW
-                        'sex', 'nude', 'naked', 'porn', 'dick', 'pussy', 'cock',
-                        # Harassment
-                        'stupid', 'idiot', 'moron', 'loser', 'worthless'
-                    ]
+                    from app.ml.lexicon import lexicon
                     
-                    keyword_matches = sum(1 for keyword in risk_keywords if keyword in text_lower)
+                    # ENHANCED keyword list for quick scanning (see lexicon 'risk_extended')
+                    keyword_matches = lexicon.scan(text).count('risk_extended')
                     risk_score = min(keyword_matches * 0.4, 1.0)  # Increased multiplier
                     
                     logger.info(f"⚡ Quick scan: '{text[:30]}...' → {keyword_matches} matches → {risk_score:.3f} risk")
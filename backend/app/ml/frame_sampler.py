@@ -0,0 +1,157 @@
+# backend/app/ml/frame_sampler.py
+"""
+Frame sampling for still images, animated GIF/WebP and short videos.
+
+Work per file is bounded three ways: at most ``scan_limit`` frames are
+decoded, decoding stops after ``max_seconds``, and every kept frame is
+downscaled straight away, so a 200-frame GIF costs about what a 120-frame
+one does and memory holds only ``max_frames`` small thumbnails. Frames are
+picked evenly across the scanned range or, in "scene" mode, whenever the
+picture changes (dHash distance from the last kept frame). Videos need the
+optional PyAV package and only their keyframes are decoded.
+"""
+import importlib.util
+import io
+import time
+from typing import Callable, Iterator, List, NamedTuple, Optional, Tuple
+from PIL import Image
+from app.ml.image_hash_cache import dhash, hamming_distance
+
+# Checked without importing: PyAV (FFmpeg bindings) is only imported for video files
+AV_AVAILABLE = importlib.util.find_spec("av") is not None
+
+EVEN = "even"
+SCENE = "scene"
+
+
+class SampledFrame(NamedTuple):
+    index: int  # position in the file (keyframe number for videos)
+    image: Image.Image
+    hash: int
+
+
+class FrameBudget:
+    """Limits for one file"""
+
+    def __init__(self, max_frames: int = 8, scan_limit: int = 120, max_seconds: float = 2.0,
+                 max_pixels: int = 40_000_000, target: int = 256, mode: str = SCENE,
+                 scene_threshold: int = 10):
+        self.max_frames = max(1, max_frames)
+        self.scan_limit = max(self.max_frames, scan_limit)
+        self.max_seconds = max_seconds
+        self.max_pixels = max_pixels
+        self.target = target
+        self.mode = mode if mode in (EVEN, SCENE) else SCENE
+        self.scene_threshold = scene_threshold
+
+
+def shrink(image: Image.Image, target: int) -> Image.Image:
+    """RGB copy with the long side at most ``target`` pixels"""
+    if image.mode == "P":
+        # Palette images resize with nearest-neighbour; expand first
+        image = image.convert("RGBA")
+    else:
+        image = image.copy()  # thumbnail() works in place; keep the source frame intact
+    image.thumbnail((target, target), reducing_gap=2.0)
+    return image.convert("RGB")
+
+
+def sample_frames(data: bytes, budget: FrameBudget) -> Optional[List[SampledFrame]]:
+    """Decode and pick frames from an image or video file.
+
+    Returns None when the frames are larger than ``budget.max_pixels``
+    (checked from the header, before decoding) and [] when nothing decodable
+    was found.
+    """
+    try:
+        image = Image.open(io.BytesIO(data))  # reads the header only
+    except Image.UnidentifiedImageError:
+        if not AV_AVAILABLE:
+            raise
+        return _sample_video(data, budget)
+
+    if budget.max_pixels and image.width * image.height > budget.max_pixels:
+        return None
+
+    if not getattr(image, "is_animated", False):
+        # Still image: JPEG draft() makes the decoder itself scale down by 1/2 to 1/8
+        image.draft("RGB", (budget.target, budget.target))
+        small = shrink(image, budget.target)
+        return [SampledFrame(0, small, dhash(small))]
+
+    # n_frames only parses frame headers; frames are decoded one by one on seek
+    scanned = min(image.n_frames, budget.scan_limit)
+
+    def frames() -> Iterator[Tuple[int, Optional[float], Callable[[], Image.Image]]]:
+        for index in range(scanned):
+            image.seek(index)
+            yield index, index / max(1, scanned - 1), lambda: image
+
+    return _select(frames(), budget)
+
+
+def _sample_video(data: bytes, budget: FrameBudget) -> Optional[List[SampledFrame]]:
+    import av
+
+    with av.open(io.BytesIO(data)) as container:
+        if not container.streams.video:
+            return []
+        stream = container.streams.video[0]
+        codec = stream.codec_context
+        if budget.max_pixels and codec.width * codec.height > budget.max_pixels:
+            return None
+        codec.skip_frame = "NONKEY"  # keyframes only: cheap, and roughly one per shot
+        codec.thread_count = 1
+
+        # Scale inside libswscale so full-size RGB frames are never built
+        scale = min(1.0, budget.target / max(codec.width, codec.height, 1))
+        width, height = max(1, int(codec.width * scale)), max(1, int(codec.height * scale))
+
+        duration = float(stream.duration * stream.time_base) if stream.duration else None
+
+        def frames() -> Iterator[Tuple[int, Optional[float], Callable[[], Image.Image]]]:
+            for index, frame in enumerate(container.decode(stream)):
+                if index >= budget.scan_limit:
+                    return
+                position = frame.time / duration if duration and frame.time is not None else None
+                yield index, position, lambda: frame.reformat(width=width, height=height, format="rgb24").to_image()
+
+        return _select(frames(), budget)
+
+
+def _probe_hash(frame: Image.Image) -> int:
+    """dHash of a cheap box-reduced copy, for scene-change checks on every scanned frame"""
+    factor = max(1, max(frame.size) // 64)
+    if frame.mode not in ("RGB", "L"):
+        frame = frame.convert("RGB")
+    return dhash(frame.reduce(factor) if factor > 1 else frame)
+
+
+def _select(frames: Iterator[Tuple[int, Optional[float], Callable[[], Image.Image]]],
+            budget: FrameBudget) -> List[SampledFrame]:
+    """Keep up to ``budget.max_frames`` frames, stopping at the time budget.
+
+    ``frames`` yields (index, position in the file from 0 to 1 or None if
+    unknown, thunk returning the decoded frame); the thunk only runs for
+    frames that might be kept.
+    """
+    deadline = time.perf_counter() + budget.max_seconds
+    kept: List[SampledFrame] = []
+    last_probe = None
+
+    for index, position, load in frames:
+        if budget.mode == EVEN:
+            # Next evenly spaced target; with no position, keep the first frames
+            target = len(kept) / max(1, budget.max_frames - 1)
+            keep = position is None or position >= target or budget.max_frames == 1
+        else:
+            probe = _probe_hash(load())
+            keep = last_probe is None or hamming_distance(probe, last_probe) >= budget.scene_threshold
+            if keep:
+                last_probe = probe
+        if keep:
+            small = shrink(load(), budget.target)
+            kept.append(SampledFrame(index, small, dhash(small)))
+        if len(kept) >= budget.max_frames or time.perf_counter() > deadline:
+            break
+    return kept
@@ -2,12 +2,20 @@
 import asyncio
 import os
 import concurrent.futures
-from typing import Dict, Any, Optional
+import functools
+import time
+from typing import Dict, Any, List, Optional, Tuple
 from app.utils.logger import logger
 from app.utils.config import config
+from app.ml.batching import MicroBatcher
+from app.ml.inference_pool import InferenceWorkerPool
+from app.ml.model_loader import SingleFlightLoader
+from app.ml.lexicon import lexicon, LexiconScan
+from app.ml.resource_manager import resource_manager
+from app.ml.model_router import ModelRouter, LatencyTracker, FULL, LIGHT
 
 try:
-    from transformers import pipeline
+    from transformers import AutoTokenizer, pipeline
     import torch
     TRANSFORMERS_AVAILABLE = True
     logger.info("🤗 Transformers library available")
@@ -15,14 +23,100 @@ except ImportError:
     TRANSFORMERS_AVAILABLE = False
     logger.warning("⚠️ Transformers not installed. Install with: pip install transformers torch")
 
+TOXICITY_MODEL = "unitary/toxic-bert"
+
+def load_toxicity_pipeline():
+    """Load the PyTorch toxic-bert pipeline on CPU"""
+    return pipeline(
+        "text-classification",
+        model=TOXICITY_MODEL,
+        device=-1,  # Use CPU
+        top_k=None  # Fixed: use top_k instead of return_all_scores
+    )
+
+def load_light_toxicity_pipeline():
+    """Load the small distilled toxicity model used for short, low-risk texts"""
+    return pipeline(
+        "text-classification",
+        model=config.LIGHT_TOXICITY_MODEL,
+        device=-1,
+        top_k=None
+    )
+
+# Light model labels mapped onto toxic-bert's, so both share one post-processing path
+LIGHT_LABEL_ALIASES = {
+    'toxic': 'toxic', 'toxicity': 'toxic', 'label_1': 'toxic',
+    'severe_toxic': 'severe_toxic', 'severe_toxicity': 'severe_toxic',
+    'obscene': 'obscene', 'sexual_explicit': 'obscene',
+    'threat': 'threat',
+    'insult': 'insult',
+    'identity_hate': 'identity_hate', 'identity_attack': 'identity_hate'
+}
+
+def load_toxicity_tokenizer():
+    """Tokenizer used to split long texts into model-sized windows"""
+    return AutoTokenizer.from_pretrained(TOXICITY_MODEL)
+
 class HuggingFaceAnalyzer:
     """Free content analyzer using Hugging Face models - Fixed version"""
     
+    # Bump the suffix whenever post-processing changes so cached verdicts are invalidated
+    base_model_version = "huggingface:unitary/toxic-bert:multi_category_with_adjustments"
+    provider = "Hugging Face"
+    runtime = "pytorch"
+    # Module-level so worker processes can import it by reference
+    pipeline_loader = staticmethod(load_toxicity_pipeline)
+    
+    @property
+    def model_version(self) -> str:
+        """Verdict cache version; includes the light model when routing is enabled"""
+        if config.LIGHT_TOXICITY_MODEL:
+            return f"{self.base_model_version}+light={config.LIGHT_TOXICITY_MODEL}"
+        return self.base_model_version
+    
+    @property
+    def cache_routes(self) -> Tuple[str, ...]:
+        """Routes a verdict can come from; the verdict cache keys each separately"""
+        return (FULL, LIGHT) if config.LIGHT_TOXICITY_MODEL else (FULL,)
+    
     def __init__(self):
         self.toxicity_classifier = None
+        self.tokenizer = None
+        self.worker_pool: Optional[InferenceWorkerPool] = None
         self.initialized = False
+        # Model loading only; inference runs within the "text" CPU budget
         self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=2)
         
+        # Concurrent analyze_text calls share padded forward passes
+        self.batcher = MicroBatcher(
+            self._classify_batch,
+            max_batch_size=config.INFERENCE_MAX_BATCH_SIZE,
+            max_wait_ms=config.INFERENCE_MAX_WAIT_MS,
+            max_concurrent_batches=resource_manager.budget("text").concurrency,
+            name="toxicity-batcher"
+        )
+        
+        # One shared load for every caller, started by warm_up() or the first message
+        self.model_loader = SingleFlightLoader("Toxicity model", self._load_models)
+        self.warmup_seconds: Optional[float] = None
+        
+        # Optional small model for short/low-risk texts and overload (LIGHT_TOXICITY_MODEL)
+        self.light_classifier = None
+        self.light_batcher = MicroBatcher(
+            self._classify_light_batch,
+            max_batch_size=config.INFERENCE_MAX_BATCH_SIZE,
+            max_wait_ms=config.INFERENCE_MAX_WAIT_MS,
+            max_concurrent_batches=1,
+            name="light-toxicity-batcher"
+        )
+        self.light_loader = SingleFlightLoader("Light toxicity model", self._load_light_model)
+        self.router = ModelRouter(
+            short_text_chars=config.ROUTING_SHORT_TEXT_CHARS,
+            risk_threshold=config.ROUTING_RISK_THRESHOLD,
+            saturation_queue=config.ROUTING_SATURATION_QUEUE
+        )
+        self.latency = {FULL: LatencyTracker(), LIGHT: LatencyTracker()}
+        
         if TRANSFORMERS_AVAILABLE:
             # Don't initialize here - will be initialized when first used
             logger.info("🤗 Hugging Face analyzer ready for initialization")
@@ -32,77 +126,130 @@ class HuggingFaceAnalyzer:
     async def _run_in_thread(self, func, *args, **kwargs):
         """Python 3.8 compatible version of asyncio.to_thread"""
         loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(self.executor, func, *args, **kwargs)
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+    
+    async def _initialize_models(self) -> bool:
+        """Initialize Hugging Face models, sharing one load between all callers"""
+        if not TRANSFORMERS_AVAILABLE:
+            return False
+        return await self.model_loader.ensure_loaded()
     
-    async def _initialize_models(self):
-        """Initialize Hugging Face models asynchronously"""
+    async def _load_models(self):
+        """Load the models (runs once, via model_loader)"""
         try:
             logger.info("🔄 Loading Hugging Face toxicity model...")
+            resource_manager.configure_torch()
             
-            # Load toxicity classifier in thread to avoid blocking
-            def load_model():
-                return pipeline(
-                    "text-classification",
-                    model="unitary/toxic-bert",
-                    device=-1,  # Use CPU
-                    top_k=None  # Fixed: use top_k instead of return_all_scores
+            if config.INFERENCE_WORKERS > 0:
+                # Model lives in worker processes; this process only routes batches
+                pool = InferenceWorkerPool(
+                    self.pipeline_loader,
+                    num_workers=config.INFERENCE_WORKERS,
+                    torch_threads=config.INFERENCE_WORKER_THREADS
+                    or resource_manager.threads_per_worker("text", config.INFERENCE_WORKERS),
+                    name="toxicity"
                 )
-            
-            self.toxicity_classifier = await self._run_in_thread(load_model)
+                await self._run_in_thread(pool.start)
+                self.worker_pool = pool
+                self.batcher.max_concurrent_batches = pool.num_workers
+                self.tokenizer = await self._run_in_thread(load_toxicity_tokenizer)
+            else:
+                # Load toxicity classifier in thread to avoid blocking
+                self.toxicity_classifier = await self._run_in_thread(self.pipeline_loader)
+                self.tokenizer = self.toxicity_classifier.tokenizer
             
             self.initialized = True
             logger.info("✅ Hugging Face models loaded successfully")
             
+            if config.LIGHT_TOXICITY_MODEL:
+                # Routing only starts once this finishes; the full model serves everything until then
+                self.light_loader.start()
+            
         except Exception as e:
             logger.error(f"❌ Error loading Hugging Face models: {e}")
             logger.info("🔄 Falling back to keyword-based analysis")
             self.initialized = False
+            raise
+    
+    async def _load_light_model(self):
+        """Load the light model (runs once, via light_loader)"""
+        logger.info(f"🔄 Loading light toxicity model {config.LIGHT_TOXICITY_MODEL}...")
+        self.light_classifier = await self._run_in_thread(load_light_toxicity_pipeline)
+    
+    async def warm_up(self):
+        """Load the model and push a few dummy batches through it.
+        
+        Called from the FastAPI lifespan so the first real message doesn't pay
+        for the model load or the allocator's cold start.
+        """
+        if not await self._initialize_models():
+            return
+        
+        started = time.perf_counter()
+        try:
+            samples = ["hello there", "gg wp, that was a close match", "warm up " * 60]
+            for batch_size in (1, config.INFERENCE_BUCKET_SIZE, config.INFERENCE_MAX_BATCH_SIZE):
+                await self.batcher.submit_many([samples[i % len(samples)] for i in range(batch_size)])
+        except Exception as e:
+            logger.warning(f"⚠️ Toxicity model warm-up failed: {e}")
+            return
+        
+        self.warmup_seconds = time.perf_counter() - started
+        logger.info(f"🔥 Toxicity model warmed up in {self.warmup_seconds:.2f}s")
+        
+        if config.LIGHT_TOXICITY_MODEL and await self.light_loader.ensure_loaded():
+            try:
+                await self.light_batcher.submit_many(samples)
+            except Exception as e:
+                logger.warning(f"⚠️ Light toxicity model warm-up failed: {e}")
+    
+    def model_status(self) -> Dict[str, Any]:
+        """Readiness of the toxicity model for /health"""
+        status = self.model_loader.status()
+        status["warmup_seconds"] = round(self.warmup_seconds, 2) if self.warmup_seconds is not None else None
+        if not TRANSFORMERS_AVAILABLE:
+            status["state"] = "unavailable"
+        return status
     
     async def analyze_text(self, text: str) -> Dict[str, Any]:
         """Analyze text using Hugging Face models with keyword adjustments"""
         try:
-            # Initialize models on first use if needed
+            # Initialize models on first use if needed (waits on the shared load)
             if not self.initialized and TRANSFORMERS_AVAILABLE:
                 await self._initialize_models()
             
-            # Wait a bit more if still initializing
-            max_wait = 5
-            waited = 0
-            while not self.initialized and TRANSFORMERS_AVAILABLE and waited < max_wait:
-                await asyncio.sleep(0.5)
-                waited += 0.5
-            
             if not self.initialized or not TRANSFORMERS_AVAILABLE:
                 logger.warning("🔄 Using fallback analysis (models not ready)")
                 return self._fallback_analysis(text)
             
-            # Truncate text if too long (BERT has 512 token limit)
-            if len(text) > 400:
-                text = text[:400] + "..."
+            # Long texts are scored as overlapping windows (BERT has a 512 token limit)
+            windows = self._split_windows(text)
+            route, route_reason = await self._choose_route(text)
             
-            # Run toxicity analysis in thread to avoid blocking
-            def run_classifier():
+            # Queue all windows together for the next batched forward pass
+            try:
                 try:
-                    result = self.toxicity_classifier(text)
-                    return result
+                    window_results = await self._submit_windows(route, windows)
                 except Exception as e:
-                    logger.error(f"Error in classifier: {e}")
-                    return None
-            
-            toxicity_results = await self._run_in_thread(run_classifier)
+                    if route != LIGHT:
+                        raise
+                    logger.warning(f"⚠️ Light toxicity model failed, using full model: {e}")
+                    route, route_reason = FULL, "light_model_error"
+                    window_results = await self._submit_windows(route, windows)
+                results_list = self._reduce_window_results(window_results)
+            except Exception as e:
+                logger.error(f"Error in classifier: {e}")
+                results_list = None
             
-            if not toxicity_results:
+            if not results_list:
                 logger.warning("🔄 Classifier failed, using fallback")
                 return self._fallback_analysis(text)
             
-            # Process results - format: [[{'label': 'toxic', 'score': 0.989}, ...]]
+            # Process results - format: [{'label': 'toxic', 'score': 0.989}, ...]
             scores_dict = {}
             
             try:
-                # Extract the nested list
-                if isinstance(toxicity_results, list) and len(toxicity_results) > 0:
-                    results_list = toxicity_results[0]  # Get the inner list
-                    
+                if isinstance(results_list, list):
                     # Convert to dictionary for easy access
                     for item in results_list:
                         if isinstance(item, dict) and 'label' in item and 'score' in item:
@@ -128,10 +275,12 @@ class HuggingFaceAnalyzer:
                 logger.error(f"Error processing HF results: {e}")
                 return self._fallback_analysis(text)
             
-            # Enhanced keyword detection for specific categories
-            nsfw_detected = self._check_nsfw_keywords(text)
-            harassment_detected = self._check_harassment_keywords(text) or is_insulting
-            threat_detected = self._check_threat_keywords(text) or is_threatening
+            # Enhanced keyword detection for specific categories (one shared lexicon pass)
+            scan = lexicon.scan(text)
+            nsfw_detected = self._check_nsfw_keywords(scan)
+            harassment_detected = self._check_harassment_keywords(scan) or is_insulting
+            threat_detected = self._check_threat_keywords(scan) or is_threatening
+            self_harm_detected = self._check_self_harm_keywords(scan)
             
             # Create OpenAI-compatible response using HF scores
             categories = {
@@ -139,9 +288,9 @@ class HuggingFaceAnalyzer:
                 'harassment/threatening': threat_detected or is_threatening,
                 'hate': is_hateful or (is_severe and toxic_score > 0.7),
                 'hate/threatening': (is_hateful or is_severe) and (threat_detected or is_threatening),
-                'self-harm': self._check_self_harm_keywords(text),
+                'self-harm': self_harm_detected,
                 'self-harm/instructions': False,
-                'self-harm/intent': self._check_self_harm_keywords(text),
+                'self-harm/intent': self_harm_detected,
                 'sexual': nsfw_detected or is_obscene,
                 'sexual/minors': False,
                 'violence': threat_detected or is_threatening or (threat_score > 0.5),
@@ -170,7 +319,7 @@ class HuggingFaceAnalyzer:
             original_max_score = max(scores.values())
             
             # ✨ APPLY KEYWORD ADJUSTMENTS - NEW FEATURE
-            adjusted_scores = self._apply_keyword_adjustments(scores, text)
+            adjusted_scores = self._apply_keyword_adjustments(scores, scan)
             
             flagged = any(v > 0.5 for v in adjusted_scores.values())
             
@@ -181,8 +330,11 @@ class HuggingFaceAnalyzer:
                 "max_score": max(adjusted_scores.values()),
                 "violation_type": self._get_primary_violation({k: v > 0.5 for k, v in adjusted_scores.items()}, adjusted_scores),
                 "model_info": {
-                    "provider": "Hugging Face",
-                    "model": "unitary/toxic-bert",
+                    "provider": self.provider,
+                    "model": config.LIGHT_TOXICITY_MODEL if route == LIGHT else TOXICITY_MODEL,
+                    "runtime": "pytorch" if route == LIGHT else self.runtime,
+                    "route": route,
+                    "route_reason": route_reason,
                     "toxic_score": toxic_score,
                     "insult_score": insult_score,
                     "threat_score": threat_score,
@@ -190,6 +342,7 @@ class HuggingFaceAnalyzer:
                     "obscene_score": obscene_score,
                     "severe_toxic_score": severe_toxic_score,
                     "text_length": len(text),
+                    "windows": len(windows),
                     "version": "multi_category_with_adjustments",
                     "original_max_score": original_max_score,
                     "adjustment_applied": original_max_score != max(adjusted_scores.values())
@@ -210,44 +363,123 @@ class HuggingFaceAnalyzer:
             logger.error(f"Full traceback: {traceback.format_exc()}")
             return self._fallback_analysis(text)
     
-    def _check_nsfw_keywords(self, text: str) -> bool:
-        """Enhanced NSFW keyword detection"""
-        nsfw_keywords = [
-            'sex', 'porn', 'nude', 'naked', 'sexy', 'hot', 'adult',
-            'xxx', 'nsfw', 'explicit', 'erotic', 'sexual', 'dick',
-            'pussy', 'cock', 'boobs', 'tits', 'ass', 'horny'
+    def _split_windows(self, text: str) -> List[str]:
+        """Split text into overlapping windows that each fit the model's token limit"""
+        max_tokens = config.TOXICITY_WINDOW_TOKENS - 2  # room for [CLS] and [SEP]
+        offsets = self.tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)["offset_mapping"]
+        
+        if len(offsets) <= max_tokens:
+            return [text]
+        
+        step = max(1, max_tokens - config.TOXICITY_WINDOW_OVERLAP)
+        windows = []
+        for start in range(0, len(offsets), step):
+            chunk = offsets[start:start + max_tokens]
+            windows.append(text[chunk[0][0]:chunk[-1][1]])
+            if start + max_tokens >= len(offsets) or len(windows) >= config.TOXICITY_MAX_WINDOWS:
+                break
+        
+        return windows
+    
+    def _reduce_window_results(self, window_results: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Combine per-window label scores into one result using the configured reducer"""
+        if len(window_results) == 1:
+            return window_results[0]
+        
+        per_label: Dict[str, List[float]] = {}
+        for result in window_results:
+            for item in result or []:
+                per_label.setdefault(item['label'], []).append(item['score'])
+        
+        if config.TOXICITY_WINDOW_REDUCER == "mean":
+            reduce = lambda values: sum(values) / len(values)
+        else:
+            reduce = max
+        
+        return [{'label': label, 'score': reduce(values)} for label, values in per_label.items()]
+    
+    async def _submit_windows(self, route: str, windows: List[str]) -> List[List[Dict[str, Any]]]:
+        batcher = self.light_batcher if route == LIGHT else self.batcher
+        started = time.perf_counter()
+        results = await batcher.submit_many(windows)
+        self.latency[route].record(time.perf_counter() - started)
+        return results
+    
+    async def _choose_route(self, text: str):
+        """Full or light model for this text; the full model until the light one is ready"""
+        if not self.light_loader.ready:
+            return FULL, "light_model_unavailable"
+        risk = await self.quick_local_scan(text)
+        return self.router.choose(len(text), risk, self.batcher.pending)
+    
+    async def _classify_light_batch(self, texts: List[str]) -> List[List[Dict[str, Any]]]:
+        """Light model forward pass with its labels mapped onto toxic-bert's"""
+        results = await self._classify_sorted(
+            texts, functools.partial(resource_manager.run, "text", self.light_classifier)
+        )
+        return [
+            [{'label': LIGHT_LABEL_ALIASES[item['label'].lower()], 'score': item['score']}
+             for item in result if item['label'].lower() in LIGHT_LABEL_ALIASES]
+            for result in results
         ]
-        text_lower = text.lower()
-        return any(keyword in text_lower for keyword in nsfw_keywords)
     
-    def _check_harassment_keywords(self, text: str) -> bool:
+    async def _classify_batch(self, texts: List[str]) -> List[List[Dict[str, Any]]]:
+        """Run one batched forward pass of the full model"""
+        if self.worker_pool:
+            return await self._classify_sorted(texts, self.worker_pool.run)
+        return await self._classify_sorted(
+            texts, functools.partial(resource_manager.run, "text", self.toxicity_classifier)
+        )
+    
+    async def _classify_sorted(self, texts: List[str], run) -> List[List[Dict[str, Any]]]:
+        """Call ``run`` on texts grouped by similar length to limit padding"""
+        # Sort by length so each padded bucket holds similarly sized texts
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        sorted_texts = [texts[i] for i in order]
+        kwargs = {
+            "batch_size": min(max(1, config.INFERENCE_BUCKET_SIZE), len(texts)),
+            "truncation": True
+        }
+        
+        sorted_results = await run(sorted_texts, **kwargs)
+        
+        results = [None] * len(texts)
+        for position, index in enumerate(order):
+            results[index] = sorted_results[position]
+        return results
+    
+    def performance_stats(self) -> Dict[str, Any]:
+        """Batching and worker statistics for /health"""
+        stats = {"toxicity_batcher": self.batcher.stats()}
+        if self.worker_pool:
+            stats["inference_workers"] = self.worker_pool.stats()
+        if config.LIGHT_TOXICITY_MODEL:
+            stats["light_toxicity_batcher"] = self.light_batcher.stats()
+            stats["toxicity_routing"] = {
+                "light_model": self.light_loader.status(),
+                "decisions": self.router.stats()
+            }
+        stats["toxicity_models"] = {
+            TOXICITY_MODEL: self.latency[FULL].stats(),
+            **({config.LIGHT_TOXICITY_MODEL: self.latency[LIGHT].stats()} if config.LIGHT_TOXICITY_MODEL else {})
+        }
+        return stats
+    
+    def _check_nsfw_keywords(self, scan: LexiconScan) -> bool:
+        """Enhanced NSFW keyword detection"""
+        return scan.has('nsfw')
+    
+    def _check_harassment_keywords(self, scan: LexiconScan) -> bool:
         """Enhanced harassment detection"""
-        harassment_keywords = [
-            'stupid', 'idiot', 'moron', 'dumb', 'loser', 'pathetic',
-            'worthless', 'ugly', 'fat', 'disgusting', 'retard',
-            'bitch', 'slut', 'whore', 'asshole'
-        ]
-        text_lower = text.lower()
-        return any(keyword in text_lower for keyword in harassment_keywords)
+        return scan.has('harassment')
     
-    def _check_threat_keywords(self, text: str) -> bool:
+    def _check_threat_keywords(self, scan: LexiconScan) -> bool:
         """Enhanced threat detection"""
-        threat_keywords = [
-            'kill you', 'murder you', 'hurt you', 'destroy you',
-            'beat you up', 'attack you', 'violence', 'kill',
-            'death', 'shoot', 'stab', 'punch', 'fight'
-        ]
-        text_lower = text.lower()
-        return any(keyword in text_lower for keyword in threat_keywords)
+        return scan.has('threat')
     
-    def _check_self_harm_keywords(self, text: str) -> bool:
+    def _check_self_harm_keywords(self, scan: LexiconScan) -> bool:
         """Self-harm detection"""
-        self_harm_keywords = [
-            'suicide', 'kill myself', 'end my life', 'self harm',
-            'cut myself', 'want to die', 'hanging myself'
-        ]
-        text_lower = text.lower()
-        return any(keyword in text_lower for keyword in self_harm_keywords)
+        return scan.has('self_harm')
     
     def _get_primary_violation(self, categories: dict, scores: dict) -> Optional[str]:
         """Determine primary violation type with better logic"""
@@ -282,13 +514,13 @@ class HuggingFaceAnalyzer:
         """Fallback keyword-based analysis with adjustments"""
         logger.info("🔄 Using fallback keyword analysis with adjustments")
         
-        text_lower = text.lower()
+        scan = lexicon.scan(text)
         
         # Enhanced keyword detection
-        has_toxic = self._check_harassment_keywords(text) or any(word in text_lower for word in ['hate', 'fuck', 'shit', 'damn'])
-        has_nsfw = self._check_nsfw_keywords(text)
-        has_threats = self._check_threat_keywords(text)
-        has_self_harm = self._check_self_harm_keywords(text)
+        has_toxic = self._check_harassment_keywords(scan) or scan.has('profanity')
+        has_nsfw = self._check_nsfw_keywords(scan)
+        has_threats = self._check_threat_keywords(scan)
+        has_self_harm = self._check_self_harm_keywords(scan)
         
         flagged = has_toxic or has_nsfw or has_threats or has_self_harm
         
@@ -322,7 +554,7 @@ class HuggingFaceAnalyzer:
         
         # Apply keyword adjustments to fallback scores too
         original_max = max(scores.values()) if flagged else 0.1
-        adjusted_scores = self._apply_keyword_adjustments(scores, text)
+        adjusted_scores = self._apply_keyword_adjustments(scores, scan)
         
         return {
             "flagged": any(v > 0.5 for v in adjusted_scores.values()),
@@ -344,20 +576,12 @@ class HuggingFaceAnalyzer:
         if not text or len(text.strip()) < 3:
             return 0.0
             
-        text_lower = text.lower()
-        
-        # Combined keyword list for quick scanning
-        risk_keywords = [
-            'hate', 'kill', 'sex', 'nude', 'fuck', 'shit', 'porn',
-            'stupid', 'idiot', 'bitch', 'asshole', 'die', 'murder'
-        ]
-        
-        keyword_matches = sum(1 for keyword in risk_keywords if keyword in text_lower)
+        keyword_matches = lexicon.scan(text).count('risk')
         risk_score = min(keyword_matches * 0.25, 1.0)
         
         return risk_score
     
-    def _apply_keyword_adjustments(self, scores: dict, text: str) -> dict:
+    def _apply_keyword_adjustments(self, scores: dict, scan: LexiconScan) -> dict:
         """Apply custom keyword confidence adjustments with context detection - FIXED"""
         
         # MUCH MORE CONSERVATIVE adjustments - only for clearly harmless cases
@@ -368,33 +592,20 @@ class HuggingFaceAnalyzer:
             # REMOVED: idiot, stupid, dumb, moron, fool - these ARE toxic!
         }
         
-        # Context indicators that suggest friendly/joking tone
-        friendly_context = [
-            'lol', 'haha', 'jk', 'just kidding', '😂', '🤣', 
-            'bro', 'dude', 'mate', 'friend', 'buddy', 'just joking'
-        ]
-        
-        text_lower = text.lower()
         adjustment_factor = 1.0
         applied_adjustments = []
         
         # Only apply keyword adjustments for truly mild words
+        mild_words = scan.terms('mild')
         for keyword, reduction in keyword_adjustments.items():
-            if keyword in text_lower:
+            if keyword in mild_words:
                 adjustment_factor = min(adjustment_factor, 1.0 - reduction)
                 applied_adjustments.append(f"{keyword}(-{int(reduction*100)}%)")
         
         # Apply reduction ONLY if clear friendly context AND no toxic words
-        has_friendly_context = any(indicator in text_lower for indicator in friendly_context)
-        
-        # EXPANDED list of words that should NEVER be reduced
-        toxic_words = [
-            'idiot', 'stupid', 'moron', 'dumb', 'fool', 'loser', 'pathetic',
-            'worthless', 'retard', 'bitch', 'asshole', 'fuck', 'shit', 
-            'hate', 'kill', 'die', 'nazi', 'rape', 'faggot', 'nigger'
-        ]
-        
-        has_toxic_words = any(word in text_lower for word in toxic_words)
+        # (context indicators and protected words are lexicon categories)
+        has_friendly_context = scan.has('friendly')
+        has_toxic_words = scan.has('protected_toxic')
         
         # Only apply friendly context reduction if NO toxic words present
         if has_friendly_context and not has_toxic_words:
@@ -418,10 +629,15 @@ class HuggingFaceAnalyzer:
         return adjusted_scores
     
 
+    def shutdown(self):
+        """Stop the loader thread executor and the inference worker processes"""
+        self.executor.shutdown(wait=False)
+        if self.worker_pool:
+            self.worker_pool.shutdown()
+    
     def __del__(self):
-        """Cleanup thread executor"""
         try:
-            self.executor.shutdown(wait=False)
+            self.shutdown()
         except:
             pass
 
@@ -1,9 +1,34 @@
 from PIL import Image
-from transformers import pipeline
-import requests
-import io
-import torch
+import asyncio
+import importlib.util
+import time
+from typing import Any, Dict, List, Optional, Sequence
 from app.utils.logger import logger
+from app.utils.config import config
+from app.utils.http_client import http_client, BlockedAddress, ResponseTooLarge
+from app.utils.image_links import normalize_url
+from app.ml.batching import MicroBatcher
+from app.ml.frame_sampler import AV_AVAILABLE, FrameBudget, SampledFrame, sample_frames
+from app.ml.image_hash_cache import PerceptualHashCache
+from app.ml.model_loader import SingleFlightLoader
+from app.ml.verdict_cache import VerdictCache
+from app.ml.resource_manager import resource_manager
+
+# Checked without importing: transformers/torch are only imported by the background load
+TRANSFORMERS_AVAILABLE = importlib.util.find_spec("transformers") is not None
+
+NSFW_IMAGE_MODEL = "Falconsai/nsfw_image_detection"
+
+def load_nsfw_pipeline():
+    """Import transformers and build the NSFW pipeline (slow; run off the event loop)"""
+    from transformers import pipeline
+    resource_manager.configure_torch()
+    # Use a smaller, faster model optimized for CPU
+    return pipeline(
+        "image-classification",
+        model=NSFW_IMAGE_MODEL,
+        device=-1 # CPU
+    )
 
 class ImageAnalyzer:
     """
@@ -13,53 +38,300 @@ class ImageAnalyzer:
     
     def __init__(self):
         self.pipeline = None
-        self._initialize_model()
+        
+        # Decoded images from every message and guild share batched forward passes
+        self.batcher = MicroBatcher(
+            self._classify_batch,
+            max_batch_size=config.IMAGE_MAX_BATCH_SIZE,
+            max_wait_ms=config.IMAGE_MAX_WAIT_MS,
+            max_concurrent_batches=resource_manager.budget("image").concurrency,
+            name="image-batcher"
+        )
+        
+        # Reposts (even re-encoded or resized) reuse the earlier verdict
+        self.hash_cache = PerceptualHashCache(
+            max_entries=config.IMAGE_HASH_CACHE_SIZE,
+            max_distance=config.IMAGE_HASH_MAX_DISTANCE,
+            path=config.IMAGE_HASH_CACHE_PATH,
+            model=NSFW_IMAGE_MODEL
+        )
+        
+        # Linked images: one fetch per normalized URL, however many channels share it
+        self.link_cache = VerdictCache(
+            max_entries=config.IMAGE_LINK_CACHE_SIZE,
+            ttl_seconds=config.IMAGE_LINK_CACHE_TTL_SECONDS
+        )
+        self._links_in_flight: Dict[str, asyncio.Future] = {}
+        
+        # Animated images and videos: bounded frame decode, downscaled as decoded
+        self.frame_budget = FrameBudget(
+            max_frames=config.FRAME_SAMPLE_MAX_FRAMES,
+            scan_limit=config.FRAME_SCAN_LIMIT,
+            max_seconds=config.FRAME_DECODE_SECONDS,
+            max_pixels=config.IMAGE_MAX_PIXELS,
+            target=config.IMAGE_DECODE_SIZE,
+            mode=config.FRAME_SAMPLE_MODE,
+            scene_threshold=config.FRAME_SCENE_THRESHOLD
+        )
+        
+        # Loaded in the background (startup or first image), never on the event loop
+        self.model_loader = SingleFlightLoader("NSFW image model", self._load_model)
+        self.warmup_seconds: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.pipeline is not None
 
-    def _initialize_model(self):
+    async def _load_model(self):
+        """Load the pipeline in a worker thread (runs once, via model_loader)"""
+        logger.info("🖼️ Loading local NSFW image detection model...")
+        self.pipeline = await asyncio.get_running_loop().run_in_executor(None, load_nsfw_pipeline)
+
+    def start_loading(self):
+        """Kick off the background load (no-op if loaded, loading, or recently failed)"""
+        if TRANSFORMERS_AVAILABLE and not self.ready:
+            self.model_loader.start()
+
+    async def warm_up(self):
+        """Load the model and run one dummy image through it; called from the FastAPI lifespan"""
+        if not TRANSFORMERS_AVAILABLE or not await self.model_loader.ensure_loaded():
+            return
+        started = time.perf_counter()
         try:
-            logger.info("🖼️ Loading local NSFW image detection model...")
-            # Use a smaller, faster model optimized for CPU
-            self.pipeline = pipeline(
-                "image-classification", 
-                model="Falconsai/nsfw_image_detection",
-                device=-1 # CPU
-            )
-            logger.info("✅ NSFW Image model loaded successfully")
+            await self.batcher.submit(Image.new("RGB", (224, 224)))
         except Exception as e:
-            logger.error(f"❌ Failed to load image model: {e}")
+            logger.warning(f"⚠️ NSFW image model warm-up failed: {e}")
+            return
+        self.warmup_seconds = time.perf_counter() - started
+        logger.info(f"🔥 NSFW image model warmed up in {self.warmup_seconds:.2f}s")
 
-    async def analyze_image(self, url: str) -> dict:
-        """Download and analyze an image from a URL"""
-        if not self.pipeline:
-            return None
+    def model_status(self) -> Dict[str, Any]:
+        """Readiness of the image model for /health"""
+        status = self.model_loader.status()
+        status["warmup_seconds"] = round(self.warmup_seconds, 2) if self.warmup_seconds is not None else None
+        if not TRANSFORMERS_AVAILABLE:
+            status["state"] = "unavailable"
+        return status
+
+    @staticmethod
+    def _skipped_result(reason: str) -> dict:
+        """Returned for attachments that are not downloaded or decoded at all"""
+        return {"is_nsfw": False, "score": 0.0, "label": "skipped", "reason": reason}
+
+    def _not_ready_result(self) -> dict:
+        """Returned while the model is loading (or unavailable), instead of blocking"""
+        return {
+            "is_nsfw": False,
+            "score": 0.0,
+            "label": "not_ready",
+            "ready": False,
+            "model_state": self.model_status()["state"]
+        }
+
+    async def ensure_ready(self) -> bool:
+        """Wait for the model (API callers would rather wait than get "not_ready")"""
+        return TRANSFORMERS_AVAILABLE and await self.model_loader.ensure_loaded()
+
+    def _guard(self, size: Optional[int], content_type: Optional[str]):
+        """(skipped result or None, byte cap) from the declared size and type"""
+        media_type = content_type.split(';')[0].strip().lower() if content_type else None
+        is_video = media_type in config.VIDEO_ALLOWED_TYPES
+        if media_type is not None and not (media_type in config.IMAGE_ALLOWED_TYPES or (is_video and AV_AVAILABLE)):
+            return self._skipped_result("unsupported_type"), 0
+        max_bytes = config.VIDEO_MAX_BYTES if is_video else config.IMAGE_MAX_BYTES
+        if size is not None and size > max_bytes:
+            return self._skipped_result("too_large"), max_bytes
+        return None, max_bytes
+
+    async def analyze_image(self, url: str, size: Optional[int] = None, content_type: Optional[str] = None) -> dict:
+        """Download and analyze an image, animated image or short video from a URL.
+        
+        ``size`` and ``content_type`` (e.g. from the Discord attachment) let
+        oversized or unsupported files be skipped before any download.
+        Animated files are judged by their sampled frames; the verdict is
+        that of the worst frame.
+        """
+        skipped, max_bytes = self._guard(size, content_type)
+        if skipped is not None:
+            return skipped
+        
+        if not self.ready:
+            self.start_loading()
+            return self._not_ready_result()
 
         try:
-            # Download image
-            response = requests.get(url, timeout=5)
-            if response.status_code != 200:
+            # Download (pooled, non-blocking, aborted past the byte cap)
+            try:
+                data = await http_client.get_bytes(url, max_bytes=max_bytes)
+            except ResponseTooLarge:
+                return self._skipped_result("too_large")
+            except BlockedAddress as e:
+                logger.warning(f"⚠️ Not fetching image from a non-public address: {e}")
+                return self._skipped_result("blocked_address")
+            if data is None:
                 return None
-            
-            image = Image.open(io.BytesIO(response.content)).convert("RGB")
-            
-            # Run inference
-            results = self.pipeline(image)
-            # Result format: [{'label': 'nsfw', 'score': 0.98}, {'label': 'normal', 'score': 0.02}]
-            
-            nsfw_score = 0.0
-            for res in results:
-                if res['label'] == 'nsfw':
-                    nsfw_score = res['score']
-                    break
-            
-            return {
-                "is_nsfw": nsfw_score > 0.8, # Strict threshold
-                "score": nsfw_score,
-                "label": "nsfw" if nsfw_score > 0.8 else "safe"
-            }
-            
+            return await self._analyze_data(data)
         except Exception as e:
             logger.error(f"Error analyzing image: {e}")
             return None
 
+    async def analyze_image_bytes(self, data: bytes, content_type: Optional[str] = None) -> dict:
+        """Analyze an uploaded file; same guards, cache and batching as ``analyze_image``"""
+        skipped, _ = self._guard(len(data), content_type)
+        if skipped is not None:
+            return skipped
+        
+        if not self.ready:
+            self.start_loading()
+            return self._not_ready_result()
+        
+        try:
+            return await self._analyze_data(data)
+        except Exception as e:
+            logger.error(f"Error analyzing uploaded image: {e}")
+            return None
+
+    async def _analyze_data(self, data: bytes) -> dict:
+        # Decode (at reduced resolution, within the frame budget) and hash off the event loop
+        frames = await asyncio.get_running_loop().run_in_executor(None, sample_frames, data, self.frame_budget)
+        if frames is None:
+            return self._skipped_result("too_many_pixels")
+        if not frames:
+            return self._skipped_result("no_frames")
+        
+        if len(frames) == 1:
+            return await self._classify_frame(frames[0])
+        return await self._classify_frames(frames)
+
+    async def analyze_link(self, url: str) -> dict:
+        """Analyze an image linked in a message, cached by normalized URL.
+
+        Concurrent requests for the same link share one download and one
+        verdict; a caller giving up (early exit, deleted message) does not
+        cancel it for the others.
+        """
+        key = normalize_url(url)
+        cached = self.link_cache.get(key)
+        if cached is not None:
+            return {**cached, "cache_hit": True}
+        
+        if not self.ready:
+            self.start_loading()
+            return self._not_ready_result()
+        
+        task = self._links_in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_link(url, key))
+            self._links_in_flight[key] = task
+            task.add_done_callback(lambda _: self._links_in_flight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _fetch_link(self, url: str, key: str) -> dict:
+        result = await self.analyze_image(url)
+        if result is None:
+            # Timeouts and error responses may be deliberate (serve errors to the scanner, the
+            # image to everyone else), so a failed fetch is only remembered for a few seconds
+            result = self._skipped_result("fetch_failed")
+            self.link_cache.put(key, result, ttl_seconds=config.IMAGE_LINK_FAILURE_TTL_SECONDS)
+        elif result["label"] != "not_ready":
+            # Verdicts and final skips (non-image, too large, blocked address)
+            self.link_cache.put(key, result)
+        return result
+
+    async def analyze_images(self, attachments: List[Dict[str, Any]], links: Sequence[str] = (),
+                             stop_on_nsfw: bool = True) -> List[Optional[dict]]:
+        """Analyze several images concurrently; results are attachments then links, in input order.
+
+        Each attachment holds ``url`` and optionally ``size`` and
+        ``content_type``; ``links`` are image URLs from message text or
+        embeds. Downloads overlap and the decoded images land in the same
+        micro-batch, so the total time tracks the slowest image. With
+        ``stop_on_nsfw`` the first NSFW verdict cancels the rest, whose
+        results stay None.
+        """
+        return await self._gather_until_nsfw([
+            self.analyze_image(item["url"], size=item.get("size"), content_type=item.get("content_type"))
+            for item in attachments
+        ] + [self.analyze_link(url) for url in links], stop_on_nsfw)
+
+    @staticmethod
+    async def _gather_until_nsfw(coros: List[Any], stop_on_nsfw: bool = True) -> List[Optional[dict]]:
+        """Run ``coros`` concurrently; the first NSFW result cancels the rest (left as None)"""
+        tasks = [asyncio.ensure_future(coro) for coro in coros]
+        positions = {task: i for i, task in enumerate(tasks)}
+        results: List[Optional[dict]] = [None] * len(tasks)
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result = task.result()
+                    results[positions[task]] = result
+                    if stop_on_nsfw and result and result["is_nsfw"]:
+                        return results
+            return results
+        finally:
+            # Early exit, or the caller was cancelled (e.g. the message was deleted)
+            for task in pending:
+                task.cancel()
+
+    async def _classify_frame(self, frame: SampledFrame) -> dict:
+        """Verdict for one decoded frame, reusing the hash cache"""
+        cached = self.hash_cache.get(frame.hash)
+        if cached is not None:
+            return {**cached, "cache_hit": True}
+        
+        result = await self.classify_image(frame.image)
+        self.hash_cache.put(frame.hash, result)
+        return result
+
+    async def _classify_frames(self, frames: List[SampledFrame]) -> dict:
+        """Sampled frames share a micro-batch; the first NSFW frame ends the rest"""
+        results = await self._gather_until_nsfw([self._classify_frame(frame) for frame in frames])
+        worst, frame = max(
+            ((result, frame) for result, frame in zip(results, frames) if result is not None),
+            key=lambda pair: pair[0]["score"]
+        )
+        return {
+            "is_nsfw": worst["is_nsfw"],
+            "score": worst["score"],
+            "label": worst["label"],
+            "frames_sampled": len(frames),
+            "frame_index": frame.index
+        }
+
+    async def classify_image(self, image: Image.Image) -> dict:
+        """Score one decoded image; it joins the next micro-batch"""
+        results = await self.batcher.submit(image)
+        # Result format: [{'label': 'nsfw', 'score': 0.98}, {'label': 'normal', 'score': 0.02}]
+        
+        nsfw_score = 0.0
+        for res in results:
+            if res['label'] == 'nsfw':
+                nsfw_score = res['score']
+                break
+        
+        return {
+            "is_nsfw": nsfw_score > 0.8, # Strict threshold
+            "score": nsfw_score,
+            "label": "nsfw" if nsfw_score > 0.8 else "safe"
+        }
+
+    async def _classify_batch(self, images: List[Image.Image]) -> List[List[Dict[str, Any]]]:
+        """One batched forward pass within the "image" CPU budget"""
+        results = await resource_manager.run("image", self.pipeline, images, batch_size=len(images))
+        # A single-image batch may come back unwrapped
+        if images and results and isinstance(results[0], dict):
+            results = [results]
+        return results
+
+    def performance_stats(self) -> Dict[str, Any]:
+        """Image batching statistics for /health"""
+        return {
+            "image_batcher": self.batcher.stats(),
+            "image_hash_cache": self.hash_cache.stats(),
+            "image_link_cache": self.link_cache.stats()
+        }
+
 # Singleton instance
 image_analyzer = ImageAnalyzer()
@@ -0,0 +1,206 @@
+# backend/app/ml/image_hash_cache.py
+"""
+Perceptual-hash verdict cache for reposted images.
+
+Images are reduced to a 64-bit difference hash (dHash), which survives
+re-encoding, resizing and small edits. A verdict is reused when a new image's
+hash is within ``max_distance`` bits of a cached one. Near matches are found
+through a band index: the hash is split into ``max_distance + 1`` bands, and
+by the pigeonhole principle any hash within that distance matches at least
+one band exactly.
+
+Low-detail images (flat colours, gradients, blank frames) hash to nearly all
+0s or all 1s whatever they show, so they are never cached.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from app.utils.logger import logger
+
+HASH_BITS = 64
+# Hashes with fewer set (or unset) bits than this come from images with too little detail to tell apart
+MIN_DETAIL_BITS = 8
+
+
+def dhash(image, hash_size: int = 8) -> int:
+    """Difference hash: one bit per horizontally adjacent pixel pair of a tiny grayscale copy"""
+    from PIL import Image
+
+    small = image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def is_low_detail(value: int) -> bool:
+    ones = bin(value).count("1")
+    return min(ones, HASH_BITS - ones) < MIN_DETAIL_BITS
+
+
+class PerceptualHashCache:
+    """Bounded LRU of image verdicts keyed by perceptual hash, with near-match lookup"""
+
+    def __init__(self, max_entries: int = 50000, max_distance: int = 4, path: str = "",
+                 model: str = "", autosave_every: int = 500):
+        self.max_entries = max_entries
+        self.max_distance = max(0, min(max_distance, HASH_BITS // 2))
+        self.path = path
+        self.model = model
+        self.autosave_every = autosave_every
+
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._bands = self._band_layout(self.max_distance + 1)
+        self._index: List[Dict[int, set]] = [{} for _ in self._bands]
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()  # one writer of the file at a time
+        self._unsaved = 0
+
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.low_detail = 0
+
+        if path and self.enabled:
+            self.load()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @staticmethod
+    def _band_layout(count: int) -> List[Tuple[int, int]]:
+        """(shift, mask) for ``count`` bands covering all 64 bits"""
+        layout = []
+        start = 0
+        for i in range(count):
+            width = HASH_BITS // count + (1 if i < HASH_BITS % count else 0)
+            layout.append((start, (1 << width) - 1))
+            start += width
+        return layout
+
+    def _band_keys(self, value: int):
+        return [(value >> shift) & mask for shift, mask in self._bands]
+
+    def get(self, value: int) -> Optional[Dict[str, Any]]:
+        """Cached verdict for this hash or the nearest one within ``max_distance``"""
+        if not self.enabled:
+            return None
+        if is_low_detail(value):
+            self.low_detail += 1
+            return None
+        with self._lock:
+            verdict = self._entries.get(value)
+            if verdict is not None:
+                self._entries.move_to_end(value)
+                self.exact_hits += 1
+                return verdict
+
+            best, best_distance = None, self.max_distance + 1
+            for band, key in zip(self._index, self._band_keys(value)):
+                for candidate in band.get(key, ()):
+                    distance = hamming_distance(value, candidate)
+                    if distance < best_distance:
+                        best, best_distance = candidate, distance
+
+            if best is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(best)
+            self.near_hits += 1
+            return self._entries[best]
+
+    def put(self, value: int, verdict: Dict[str, Any]):
+        if not self.enabled or is_low_detail(value):
+            return
+        with self._lock:
+            self._insert(value, verdict)
+            self._unsaved += 1
+            autosave = self.path and self.autosave_every and self._unsaved >= self.autosave_every
+            if autosave:
+                self._unsaved = 0
+
+        if autosave:
+            threading.Thread(target=self.save, name="image-hash-cache-save", daemon=True).start()
+
+    def _insert(self, value: int, verdict: Dict[str, Any]):
+        if value not in self._entries:
+            for band, key in zip(self._index, self._band_keys(value)):
+                band.setdefault(key, set()).add(value)
+        self._entries[value] = verdict
+        self._entries.move_to_end(value)
+
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, value: int):
+        del self._entries[value]
+        for band, key in zip(self._index, self._band_keys(value)):
+            members = band.get(key)
+            if members is not None:
+                members.discard(value)
+                if not members:
+                    del band[key]
+
+    def save(self):
+        """Write the cache to ``path`` atomically (temp file + rename)"""
+        if not self.path or not self.enabled:
+            return
+        with self._lock:
+            snapshot = [[format(value, "016x"), verdict] for value, verdict in self._entries.items()]
+        try:
+            target = Path(self.path)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            scratch = target.with_suffix(target.suffix + ".tmp")
+            with self._save_lock:
+                with open(scratch, "w") as f:
+                    json.dump({"model": self.model, "entries": snapshot}, f)
+                os.replace(scratch, target)
+        except Exception as e:
+            logger.error(f"❌ Failed to save image hash cache to {self.path}: {e}")
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.error(f"❌ Failed to load image hash cache from {self.path}: {e}")
+            return
+        if data.get("model") != self.model:
+            logger.info(f"ℹ️ Image hash cache at {self.path} is for another model - starting empty")
+            return
+        with self._lock:
+            for hex_value, verdict in data.get("entries", []):
+                value = int(hex_value, 16)
+                if not is_low_detail(value):
+                    self._insert(value, verdict)
+        logger.info(f"✅ Loaded {len(self._entries)} cached image verdicts from {self.path}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.exact_hits + self.near_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "max_distance": self.max_distance,
+            "exact_hits": self.exact_hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "low_detail": self.low_detail,
+            "hit_rate": round((self.exact_hits + self.near_hits) / lookups, 4) if lookups else 0.0
+        }
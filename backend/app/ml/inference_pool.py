@@ -0,0 +1,260 @@
+# backend/app/ml/inference_pool.py
+"""
+Process pool for model inference, keeping tokenization and forward passes off the GIL
+"""
+import asyncio
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+from app.utils.logger import logger
+
+# Read by app.ml.inference_preload inside the fork server
+PRELOAD_ENV_VAR = "CLARA_INFERENCE_PRELOAD"
+
+
+def _worker_main(worker_index: int, loader: Callable, requests, results, torch_threads: int):
+    """Entry point of an inference worker process"""
+    try:
+        if torch_threads:
+            try:
+                import torch
+                torch.set_num_threads(torch_threads)
+            except ImportError:
+                pass
+
+        # With the fork server the model was loaded once before forking and the
+        # weights are shared copy-on-write; otherwise each worker loads its own
+        from app.ml import inference_preload
+        classifier = inference_preload.get_preloaded(loader) or loader()
+        results.put(("ready", worker_index, os.getpid()))
+    except Exception as e:
+        results.put(("failed", worker_index, repr(e)))
+        return
+
+    while True:
+        message = requests.get()
+        if message is None:
+            break
+
+        request_id, inputs, kwargs = message
+        try:
+            results.put(("result", request_id, classifier(inputs, **kwargs)))
+        except Exception as e:
+            results.put(("error", request_id, repr(e)))
+
+
+class _Worker:
+    """Parent-side handle for one worker process"""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.process = None
+        self.requests = None
+        self.pid = None
+        self.inflight: Dict[int, int] = {}  # request_id -> number of inputs
+        self.restarts = 0
+        self.crash_streak = 0  # crashes since the worker was last ready
+        self.restart_at = 0.0  # set while a dead worker waits to be restarted
+        self.load_error: Optional[str] = None
+        self.completed = 0
+        self.ready = threading.Event()
+
+
+class InferenceWorkerPool:
+    """N worker processes, each holding one copy of a model pipeline.
+
+    ``loader`` must be a module-level function (it is pickled by reference)
+    that returns a callable pipeline. Requests are routed to the worker with
+    the fewest in-flight inputs, and workers that die are restarted.
+    """
+
+    def __init__(self, loader: Callable, num_workers: int, torch_threads: int = 1, name: str = "inference"):
+        self.loader = loader
+        self.num_workers = max(1, num_workers)
+        self.torch_threads = torch_threads
+        self.name = name
+
+        # The fork server is a clean, single-threaded process: it loads the model
+        # once and every worker forked from it shares those weight pages.
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            self._ctx = multiprocessing.get_context("forkserver")
+            os.environ[PRELOAD_ENV_VAR] = f"{loader.__module__}:{loader.__qualname__}"
+            self._ctx.set_forkserver_preload(["app.ml.inference_preload"])
+        else:
+            self._ctx = multiprocessing.get_context("spawn")
+
+        self._results = None
+        self._workers: List[_Worker] = [_Worker(i) for i in range(self.num_workers)]
+        self._pending: Dict[int, tuple] = {}  # request_id -> (loop, future, worker)
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._running = False
+        self._threads: List[threading.Thread] = []
+
+    def start(self, timeout: float = 600.0):
+        """Start workers and block until they have loaded the model"""
+        self._results = self._ctx.Queue()
+        self._running = True
+
+        for worker in self._workers:
+            self._spawn(worker)
+
+        for target in (self._read_results, self._monitor_workers):
+            thread = threading.Thread(target=target, name=f"{self.name}-{target.__name__}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        deadline = time.monotonic() + timeout
+        for worker in self._workers:
+            while not worker.ready.wait(0.5):
+                if worker.load_error or time.monotonic() > deadline:
+                    self.shutdown()
+                    raise RuntimeError(f"{self.name} worker {worker.index} did not become ready: "
+                                       f"{worker.load_error or 'timed out'}")
+
+        logger.info(f"✅ {self.name} pool ready: {self.num_workers} worker processes "
+                    f"({self._ctx.get_start_method()})")
+
+    def _spawn(self, worker: _Worker):
+        worker.ready.clear()
+        worker.requests = self._ctx.Queue()
+        worker.process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker.index, self.loader, worker.requests, self._results, self.torch_threads),
+            name=f"{self.name}-worker-{worker.index}",
+            daemon=True
+        )
+        worker.process.start()
+
+    async def run(self, inputs: List[Any], **kwargs) -> Any:
+        """Send one batch to the least loaded worker and await its output"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        with self._lock:
+            if not self._running:
+                raise RuntimeError(f"{self.name} pool is not running")
+            request_id = next(self._ids)
+            worker = min(
+                (w for w in self._workers if w.ready.is_set()),
+                key=lambda w: sum(w.inflight.values()),
+                default=None
+            )
+            if worker is None:
+                raise RuntimeError(f"{self.name} pool has no live workers")
+            worker.inflight[request_id] = len(inputs)
+            self._pending[request_id] = (loop, future, worker)
+
+        worker.requests.put((request_id, inputs, kwargs))
+        return await future
+
+    def _resolve(self, request_id: int, result: Any = None, error: Optional[Exception] = None):
+        with self._lock:
+            entry = self._pending.pop(request_id, None)
+            if entry is None:
+                return
+            loop, future, worker = entry
+            worker.inflight.pop(request_id, None)
+            if error is None:
+                worker.completed += 1
+
+        def settle():
+            if future.done():
+                return
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+        loop.call_soon_threadsafe(settle)
+
+    def _read_results(self):
+        while self._running:
+            try:
+                kind, key, payload = self._results.get()
+            except (EOFError, OSError):
+                break
+
+            if kind == "result":
+                self._resolve(key, result=payload)
+            elif kind == "error":
+                self._resolve(key, error=RuntimeError(f"{self.name} worker error: {payload}"))
+            elif kind == "ready":
+                worker = self._workers[key]
+                worker.pid = payload
+                worker.crash_streak = 0
+                worker.load_error = None
+                worker.ready.set()
+            elif kind == "failed":
+                self._workers[key].load_error = payload
+                logger.error(f"❌ {self.name} worker {key} failed to load model: {payload}")
+            elif kind == "stop":
+                break
+
+    def _monitor_workers(self):
+        """Restart any worker process that died, failing its in-flight requests"""
+        while self._running:
+            time.sleep(1.0)
+            for worker in self._workers:
+                if not self._running or worker.process is None or worker.process.is_alive():
+                    continue
+
+                if not worker.restart_at:
+                    # Newly detected death; back off when a worker keeps crashing (e.g. out of memory)
+                    worker.ready.clear()
+                    worker.crash_streak += 1
+                    worker.restart_at = time.monotonic() + min(30.0, 2.0 ** (worker.crash_streak - 1))
+                    logger.error(f"💥 {self.name} worker {worker.index} (pid {worker.pid}) exited with "
+                                 f"code {worker.process.exitcode} - restarting")
+
+                    with self._lock:
+                        lost = list(worker.inflight)
+                    for request_id in lost:
+                        self._resolve(request_id, error=RuntimeError(f"{self.name} worker {worker.index} crashed"))
+
+                if time.monotonic() >= worker.restart_at:
+                    worker.restart_at = 0.0
+                    worker.restarts += 1
+                    self._spawn(worker)
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-worker queue depth and health"""
+        with self._lock:
+            return {
+                "workers": [
+                    {
+                        "index": w.index,
+                        "pid": w.pid,
+                        "alive": bool(w.process and w.process.is_alive()),
+                        "ready": w.ready.is_set(),
+                        "queued_batches": len(w.inflight),
+                        "queued_inputs": sum(w.inflight.values()),
+                        "completed_batches": w.completed,
+                        "restarts": w.restarts
+                    }
+                    for w in self._workers
+                ],
+                "start_method": self._ctx.get_start_method()
+            }
+
+    def shutdown(self):
+        if not self._running:
+            return
+        self._running = False
+        for worker in self._workers:
+            try:
+                worker.requests.put(None)
+            except Exception:
+                pass
+        try:
+            self._results.put(("stop", None, None))
+        except Exception:
+            pass
+        for worker in self._workers:
+            if worker.process is not None:
+                worker.process.join(timeout=5)
+                if worker.process.is_alive():
+                    worker.process.terminate()
@@ -0,0 +1,41 @@
+# backend/app/ml/inference_preload.py
+"""
+Imported by the multiprocessing fork server before any worker is forked.
+
+Loading the pipeline here means the weights live in the fork server's memory
+and every worker forked from it shares them copy-on-write, instead of each
+worker holding its own copy.
+"""
+import importlib
+import os
+from app.utils.logger import logger
+
+PRELOADED_LOADER = None
+PRELOADED_PIPELINE = None
+
+
+def _preload():
+    global PRELOADED_LOADER, PRELOADED_PIPELINE
+
+    spec = os.environ.get("CLARA_INFERENCE_PRELOAD")
+    if not spec:
+        return
+
+    try:
+        module_name, _, function_name = spec.partition(":")
+        PRELOADED_LOADER = spec
+        PRELOADED_PIPELINE = getattr(importlib.import_module(module_name), function_name)()
+    except Exception as e:
+        # Workers will load the model themselves
+        logger.warning(f"⚠️ Inference preload of {spec} failed: {e}")
+        PRELOADED_PIPELINE = None
+
+
+def get_preloaded(loader):
+    """The preloaded pipeline, if it was built by the same loader"""
+    if PRELOADED_PIPELINE is not None and PRELOADED_LOADER == f"{loader.__module__}:{loader.__qualname__}":
+        return PRELOADED_PIPELINE
+    return None
+
+
+_preload()
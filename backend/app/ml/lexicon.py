@@ -0,0 +1,292 @@
+# backend/app/ml/lexicon.py
+"""
+Shared keyword lexicon compiled into a single matcher.
+
+Every category list used by the analyzers lives here. They are compiled once
+(at import) into a trie over word tokens, so one pass over a message finds
+every hit with its categories and token positions. Matching is on word
+boundaries: "kill" matches "kill" but not "skill". A trailing "*" makes a
+term a prefix ("fuck*" also matches "fucking"), still anchored at the start
+of a word. Symbols and emoji are tokens of their own, so "😂" matches in
+"lol😂".
+"""
+import re
+from itertools import chain
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+# Words, or single non-space symbols (punctuation, emoji)
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+# Memoized whitespace chunks and starting tokens; each table is cleared when it fills up
+_CHUNK_CACHE_SIZE = 50000
+_START_CACHE_SIZE = 50000
+
+CATEGORY_TERMS: Dict[str, List[str]] = {
+    # Hugging Face analyzer categories
+    'nsfw': [
+        'sex', 'porn*', 'nude*', 'naked', 'sexy', 'hot', 'adult',
+        'xxx', 'nsfw', 'explicit', 'erotic', 'sexual', 'dick',
+        'pussy', 'cock', 'boobs', 'tits', 'ass', 'horny'
+    ],
+    'harassment': [
+        'stupid', 'idiot*', 'moron*', 'dumb', 'loser*', 'pathetic',
+        'worthless', 'ugly', 'fat', 'disgusting', 'retard*',
+        'bitch*', 'slut*', 'whore*', 'asshole*'
+    ],
+    'threat': [
+        'kill you', 'murder you', 'hurt you', 'destroy you',
+        'beat you up', 'attack you', 'violence', 'kill*',
+        'death', 'shoot', 'stab', 'punch', 'fight'
+    ],
+    'self_harm': [
+        'suicide', 'kill myself', 'end my life', 'self harm',
+        'cut myself', 'want to die', 'hanging myself'
+    ],
+    # Extra words the keyword fallback treats as toxic
+    'profanity': ['hate', 'fuck*', 'shit*', 'damn'],
+
+    # quick_local_scan risk lists
+    'risk': [
+        'hate', 'kill*', 'sex', 'nude*', 'fuck*', 'shit*', 'porn*',
+        'stupid', 'idiot*', 'bitch*', 'asshole*', 'die', 'murder*'
+    ],
+    'risk_extended': [
+        # Sexual violence
+        'rape', 'raping', 'rapist', 'molest*', 'assault',
+        # Violence/threats
+        'kill*', 'murder*', 'die', 'death', 'shoot', 'stab',
+        # Hate speech
+        'nazi*', 'hitler', 'jew', 'nigger*', 'faggot*', 'retard*',
+        # General toxicity
+        'hate', 'fuck*', 'shit*', 'bitch*', 'asshole*', 'cunt*',
+        # NSFW
+        'sex', 'nude*', 'naked', 'porn*', 'dick', 'pussy', 'cock',
+        # Harassment
+        'stupid', 'idiot*', 'moron*', 'loser*', 'worthless'
+    ],
+
+    # Score adjustment context
+    'mild': ['annoying', 'lame', 'weird'],
+    'friendly': [
+        'lol', 'haha*', 'jk', 'just kidding', '😂', '🤣',
+        'bro', 'dude', 'mate', 'friend', 'buddy', 'just joking'
+    ],
+    # Words whose presence must never reduce a score
+    'protected_toxic': [
+        'idiot*', 'stupid', 'moron*', 'dumb', 'fool*', 'loser*', 'pathetic',
+        'worthless', 'retard*', 'bitch*', 'asshole*', 'fuck*', 'shit*',
+        'hate', 'kill*', 'die', 'nazi*', 'rape', 'faggot*', 'nigger*'
+    ],
+
+    # Mock analyzer categories
+    'mock_toxic': ['hate', 'kill*', 'stupid', 'idiot*', 'fuck*', 'shit*', 'damn', 'asshole*', 'bitch*'],
+    'mock_nsfw': ['sex', 'nude*', 'naked', 'porn*', 'sexy', 'hot'],
+    'mock_harassment': ['loser*', 'ugly', 'worthless', 'pathetic'],
+    'mock_threat': ['kill you', 'hurt you', 'destroy', 'attack'],
+    'mock_self_harm': ['suicide', 'kill myself', 'end my life', 'want to die'],
+}
+
+
+class LexiconHit(NamedTuple):
+    """One matched term: the term as written in the lexicon, its categories and token positions"""
+    term: str
+    categories: FrozenSet[str]
+    start: int  # index of the first token
+    end: int  # index past the last token
+
+
+class _ChunkTable(dict):
+    def __missing__(self, chunk: str) -> List[str]:
+        if len(self) >= _CHUNK_CACHE_SIZE:
+            self.clear()
+        tokens = self[chunk] = _TOKEN_RE.findall(chunk)
+        return tokens
+
+
+_chunks = _ChunkTable()
+
+
+def tokenize(text: str) -> List[str]:
+    """Word and symbol tokens of ``text``.
+
+    Splitting on whitespace is done in C and chat reuses the same few chunks
+    ("lol", "you!"), so each distinct chunk goes through the regex only once.
+    """
+    return list(chain.from_iterable(map(_chunks.__getitem__, text.split())))
+
+
+class LexiconScan:
+    """Result of scanning one text; immutable so it can be shared between analyzers"""
+
+    __slots__ = ('_tokens', '_lexicon', '_hits', '_terms_by_category')
+
+    def __init__(self, matched: Dict[str, FrozenSet[str]], tokens: Sequence[str] = (), lexicon: 'Lexicon' = None):
+        self._tokens = tokens
+        self._lexicon = lexicon
+        self._hits: Optional[Tuple[LexiconHit, ...]] = None
+        terms_by_category: Dict[str, Set[str]] = {}
+        for term, categories in matched.items():
+            for category in categories:
+                terms_by_category.setdefault(category, set()).add(term)
+        self._terms_by_category = {k: frozenset(v) for k, v in terms_by_category.items()}
+
+    @property
+    def hits(self) -> Tuple[LexiconHit, ...]:
+        """Every occurrence with its token positions (located on first access)"""
+        if self._hits is None:
+            self._hits = self._lexicon.locate(self._tokens) if self._lexicon else ()
+        return self._hits
+
+    def categories(self) -> FrozenSet[str]:
+        return frozenset(self._terms_by_category)
+
+    def has(self, category: str) -> bool:
+        return category in self._terms_by_category
+
+    def has_any(self, *categories: str) -> bool:
+        return any(category in self._terms_by_category for category in categories)
+
+    def terms(self, category: str) -> FrozenSet[str]:
+        """Distinct lexicon terms matched for a category"""
+        return self._terms_by_category.get(category, frozenset())
+
+    def count(self, category: str) -> int:
+        """Number of distinct terms matched for a category"""
+        return len(self.terms(category))
+
+
+class Lexicon:
+    """Category term lists compiled into one trie over word tokens"""
+
+    def __init__(self, category_terms: Dict[str, Iterable[str]]):
+        # node: {"next": {token: node}, "exact": {term: categories}, "prefix": {term: categories}}
+        self._root = self._new_node()
+        # Prefix terms are only allowed on the last token of a term
+        self._prefix_lengths: Set[int] = set()
+
+        for category, terms in category_terms.items():
+            for term in terms:
+                self._add(term, category)
+
+        self._freeze(self._root)
+        # token -> (terms it matches alone, node to continue from), memoized across messages
+        self._starts: Dict[str, Tuple[list, Optional[dict]]] = {}
+
+    @staticmethod
+    def _new_node() -> dict:
+        return {"next": {}, "exact": {}, "prefix": {}}
+
+    def _add(self, term: str, category: str):
+        is_prefix = term.endswith('*')
+        tokens = tokenize(term.rstrip('*').lower())
+        if not tokens:
+            return
+
+        node = self._root
+        for token in tokens[:-1]:
+            node = node["next"].setdefault(token, self._new_node())
+
+        last = tokens[-1]
+        if is_prefix:
+            self._prefix_lengths.add(len(last))
+            node["prefix"].setdefault(last, {}).setdefault(term, set()).add(category)
+        else:
+            node = node["next"].setdefault(last, self._new_node())
+            node["exact"].setdefault(term, set()).add(category)
+
+    def _freeze(self, node: dict):
+        for table in (node["exact"], node["prefix"]):
+            for stem, value in table.items():
+                if isinstance(value, dict):
+                    table[stem] = {term: frozenset(cats) for term, cats in value.items()}
+                else:
+                    table[stem] = frozenset(value)
+        node["exact"] = tuple(node["exact"].items())
+        for child in node["next"].values():
+            self._freeze(child)
+
+    def _start(self, token: str) -> Tuple[list, Optional[dict]]:
+        """Terms matched by ``token`` alone and the trie node to continue from (memoized)"""
+        start = self._starts.get(token)
+        if start is None:
+            root = self._root
+            matched = list(self._prefix_hits(root, token))
+            node = root["next"].get(token)
+            if node is not None:
+                matched.extend(node["exact"])
+                if not node["next"] and not node["prefix"]:
+                    node = None
+            start = (matched, node)
+            if len(self._starts) >= _START_CACHE_SIZE:
+                self._starts.clear()
+            self._starts[token] = start
+        return start
+
+    def _prefix_hits(self, node: dict, token: str):
+        prefixes = node["prefix"]
+        if not prefixes:
+            return
+        for length in self._prefix_lengths:
+            if length <= len(token):
+                terms = prefixes.get(token[:length])
+                if terms:
+                    yield from terms.items()
+
+    def scan(self, text: str) -> LexiconScan:
+        """Find every lexicon term in ``text`` in a single pass over its tokens.
+
+        Not memoized by text: message content must not outlive processing.
+        """
+        if not text:
+            return LexiconScan({})
+
+        tokens = tokenize(text.lower())
+        matched: Dict[str, FrozenSet[str]] = {}
+        # Only distinct tokens are looked up; the token list is walked only from
+        # tokens that begin a multi-word or prefix term, found by list.index in C
+        for first in set(tokens):
+            direct, child = self._start(first)
+            matched.update(direct)
+            if child is not None:
+                for i in self._occurrences(tokens, first):
+                    for term, categories, _ in self._walk(tokens, child, i + 1):
+                        matched[term] = categories
+        return LexiconScan(matched, tokens, self)
+
+    def locate(self, tokens: List[str]) -> Tuple[LexiconHit, ...]:
+        """Every term occurrence in ``tokens``, ordered by position"""
+        hits: List[LexiconHit] = []
+        for first in set(tokens):
+            direct, child = self._start(first)
+            if not direct and child is None:
+                continue
+            for i in self._occurrences(tokens, first):
+                hits.extend(LexiconHit(term, categories, i, i + 1) for term, categories in direct)
+                if child is not None:
+                    hits.extend(LexiconHit(term, categories, i, end) for term, categories, end in self._walk(tokens, child, i + 1))
+        hits.sort(key=lambda hit: hit.start)
+        return tuple(hits)
+
+    @staticmethod
+    def _occurrences(tokens: List[str], token: str):
+        i = -1
+        try:
+            while True:
+                i = tokens.index(token, i + 1)
+                yield i
+        except ValueError:
+            return
+
+    def _walk(self, tokens: List[str], node: dict, position: int):
+        """Terms continuing from ``node`` over the tokens at ``position`` onwards, with their end"""
+        for j in range(position, len(tokens)):
+            token = tokens[j]
+            for term, categories in self._prefix_hits(node, token):
+                yield term, categories, j + 1
+            node = node["next"].get(token)
+            if node is None:
+                return
+            for term, categories in node["exact"]:
+                yield term, categories, j + 1
+
+# Compiled once at startup and shared by all analyzers
+lexicon = Lexicon(CATEGORY_TERMS)
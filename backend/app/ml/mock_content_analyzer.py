@@ -3,32 +3,30 @@ import asyncio
 from typing import Dict, Any, Optional
 import random
 from app.utils.logger import logger
+from app.ml.lexicon import lexicon
 
 class MockContentAnalyzer:
     """Mock content analyzer for testing and fallback"""
     
-    def __init__(self):
-        # Keywords for different violation types
-        self.toxic_keywords = ['hate', 'kill', 'stupid', 'idiot', 'fuck', 'shit', 'damn', 'asshole', 'bitch']
-        self.nsfw_keywords = ['sex', 'nude', 'naked', 'porn', 'sexy', 'hot']
-        self.harassment_keywords = ['loser', 'ugly', 'worthless', 'pathetic']
-        self.threat_keywords = ['kill you', 'hurt you', 'destroy', 'attack']
-        self.self_harm_keywords = ['suicide', 'kill myself', 'end my life', 'want to die']
-        
+    model_version = "mock:keyword_based"
+    
+    # Lexicon categories for different violation types
+    KEYWORD_CATEGORIES = ('mock_toxic', 'mock_nsfw', 'mock_harassment', 'mock_threat', 'mock_self_harm')
+    
     async def analyze_text(self, text: str) -> Dict[str, Any]:
         """Mock analyze text content"""
         try:
             # Simulate API delay
             await asyncio.sleep(0.1)
             
-            text_lower = text.lower()
+            scan = lexicon.scan(text)
             
             # Check for different violation types
-            has_toxic = any(keyword in text_lower for keyword in self.toxic_keywords)
-            has_nsfw = any(keyword in text_lower for keyword in self.nsfw_keywords)
-            has_harassment = any(keyword in text_lower for keyword in self.harassment_keywords)
-            has_threats = any(keyword in text_lower for keyword in self.threat_keywords)
-            has_self_harm = any(keyword in text_lower for keyword in self.self_harm_keywords)
+            has_toxic = scan.has('mock_toxic')
+            has_nsfw = scan.has('mock_nsfw')
+            has_harassment = scan.has('mock_harassment')
+            has_threats = scan.has('mock_threat')
+            has_self_harm = scan.has('mock_self_harm')
             
             # Determine if flagged
             flagged = has_toxic or has_nsfw or has_harassment or has_threats or has_self_harm
@@ -105,12 +103,8 @@ class MockContentAnalyzer:
     
     async def quick_local_scan(self, text: str) -> float:
         """Mock quick local scan"""
-        text_lower = text.lower()
-        all_keywords = (self.toxic_keywords + self.nsfw_keywords + 
-                       self.harassment_keywords + self.threat_keywords + 
-                       self.self_harm_keywords)
-        
-        keyword_matches = sum(1 for keyword in all_keywords if keyword in text_lower)
+        scan = lexicon.scan(text)
+        keyword_matches = sum(scan.count(category) for category in self.KEYWORD_CATEGORIES)
         risk_score = min(keyword_matches * 0.3, 1.0)
         
         return risk_score
@@ -0,0 +1,74 @@
+# backend/app/ml/model_loader.py
+"""
+Single-flight model loading shared by every caller
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+from app.utils.logger import logger
+
+
+class SingleFlightLoader:
+    """Runs an async load function at most once at a time.
+
+    Every caller awaits the same task, so concurrent first requests don't
+    each start their own load. After a failure the load may be retried once
+    ``retry_after`` seconds have passed.
+    """
+
+    def __init__(self, name: str, load: Callable[[], Awaitable[Any]], retry_after: float = 60.0):
+        self.name = name
+        self._load = load
+        self.retry_after = retry_after
+
+        self.state = "not_loaded"  # not_loaded | loading | ready | failed
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._failed_at = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def start(self) -> Optional[asyncio.Task]:
+        """Begin loading in the background (no-op if loaded or already loading)"""
+        if self.state == "ready":
+            return self._task
+        if self.state == "failed" and time.monotonic() - self._failed_at < self.retry_after:
+            return self._task
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return self._task
+
+    async def ensure_loaded(self) -> bool:
+        """Wait for the shared load; returns True when the model is ready"""
+        task = self.start()
+        if task is not None and not task.done():
+            # Shielded so a cancelled caller doesn't abort the load for everyone
+            await asyncio.shield(task)
+        return self.ready
+
+    async def _run(self):
+        self.state = "loading"
+        self.error = None
+        started = time.perf_counter()
+        try:
+            await self._load()
+        except Exception as e:
+            self.state = "failed"
+            self.error = str(e)
+            self._failed_at = time.monotonic()
+            logger.error(f"❌ {self.name} failed to load after {time.perf_counter() - started:.1f}s: {e}")
+            return
+
+        self.load_seconds = time.perf_counter() - started
+        self.state = "ready"
+        logger.info(f"✅ {self.name} loaded in {self.load_seconds:.1f}s")
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "load_seconds": round(self.load_seconds, 2) if self.load_seconds is not None else None,
+            "error": self.error
+        }
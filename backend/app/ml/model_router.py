@@ -0,0 +1,68 @@
+# backend/app/ml/model_router.py
+"""
+Routing between the full toxicity model and a small distilled one
+"""
+import collections
+import threading
+from typing import Any, Dict, Tuple
+
+FULL = "full"
+LIGHT = "light"
+
+
+class ModelRouter:
+    """Picks the model for one text from its length, keyword risk and current load.
+
+    While the full model's queue is saturated everything goes to the light
+    model. Otherwise, high-risk and long texts use the full model and short,
+    low-risk texts use the light one.
+    """
+
+    def __init__(self, short_text_chars: int, risk_threshold: float, saturation_queue: int):
+        self.short_text_chars = short_text_chars
+        self.risk_threshold = risk_threshold
+        self.saturation_queue = saturation_queue
+        self.decisions = collections.Counter()
+
+    def choose(self, text_length: int, risk: float, queue_depth: int) -> Tuple[str, str]:
+        """Returns (route, reason)"""
+        if self.saturation_queue > 0 and queue_depth >= self.saturation_queue:
+            decision = (LIGHT, "saturated")
+        elif risk >= self.risk_threshold:
+            decision = (FULL, "high_risk")
+        elif text_length <= self.short_text_chars:
+            decision = (LIGHT, "short")
+        else:
+            decision = (FULL, "long")
+
+        self.decisions[decision] += 1
+        return decision
+
+    def stats(self) -> Dict[str, int]:
+        return {f"{route}:{reason}": count for (route, reason), count in self.decisions.items()}
+
+
+class LatencyTracker:
+    """Recent latencies for one model (bounded, so percentiles track current behaviour)"""
+
+    def __init__(self, max_samples: int = 1000):
+        self._samples = collections.deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return {"requests": self.count, "mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0}
+        return {
+            "requests": self.count,
+            "mean_ms": round(sum(samples) / len(samples) * 1000, 2),
+            "p50_ms": round(samples[len(samples) // 2] * 1000, 2),
+            "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 2)
+        }
@@ -0,0 +1,95 @@
+# backend/app/ml/onnx_analyzer.py
+"""
+ONNX Runtime backend for the toxicity model (int8 dynamic quantization, CPU)
+"""
+import shutil
+import tempfile
+from pathlib import Path
+from app.utils.logger import logger
+from app.utils.config import config
+from app.ml.huggingface_analyzer import HuggingFaceAnalyzer, TOXICITY_MODEL
+
+try:
+    from transformers import AutoTokenizer, pipeline
+    from optimum.onnxruntime import ORTModelForSequenceClassification
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    ONNX_AVAILABLE = True
+except ImportError:
+    ONNX_AVAILABLE = False
+    logger.warning("⚠️ ONNX Runtime not installed. Install with: pip install -r requirements-optional.txt")
+
+QUANTIZED_FILE_NAME = "model_quantized.onnx"
+
+
+def onnx_model_dir(model_name: str = TOXICITY_MODEL) -> Path:
+    """Where the exported/quantized model for ``model_name`` is cached"""
+    return Path(config.HUGGINGFACE_CACHE_DIR) / "onnx" / model_name.replace("/", "--")
+
+
+def export_quantized_model(model_name: str = TOXICITY_MODEL) -> Path:
+    """Export the model to ONNX and quantize its weights to int8, once.
+
+    The export is written to a scratch directory and moved into place at the
+    end, so an interrupted export never leaves a half-written cache behind.
+    """
+    target = onnx_model_dir(model_name)
+    if (target / QUANTIZED_FILE_NAME).exists():
+        return target
+
+    logger.info(f"🔄 Exporting {model_name} to ONNX (first run only)...")
+    target.parent.mkdir(parents=True, exist_ok=True)
+    scratch = Path(tempfile.mkdtemp(prefix="onnx-export-", dir=target.parent))
+    try:
+        model = ORTModelForSequenceClassification.from_pretrained(model_name, export=True)
+        model.save_pretrained(scratch)
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(scratch)
+
+        quantize_dynamic(
+            model_input=str(scratch / "model.onnx"),
+            model_output=str(scratch / QUANTIZED_FILE_NAME),
+            weight_type=QuantType.QInt8
+        )
+        (scratch / "model.onnx").unlink()
+
+        if target.exists():
+            shutil.rmtree(target)
+        scratch.rename(target)
+    finally:
+        if scratch.exists():
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    logger.info(f"✅ Quantized ONNX model cached at {target}")
+    return target
+
+
+def load_onnx_toxicity_pipeline():
+    """Load the quantized toxic-bert through ONNX Runtime behind a regular pipeline"""
+    model_dir = export_quantized_model(TOXICITY_MODEL)
+    model = ORTModelForSequenceClassification.from_pretrained(
+        model_dir,
+        file_name=QUANTIZED_FILE_NAME,
+        provider="CPUExecutionProvider"
+    )
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    return pipeline(
+        "text-classification",
+        model=model,
+        tokenizer=tokenizer,
+        top_k=None
+    )
+
+
+class OnnxAnalyzer(HuggingFaceAnalyzer):
+    """toxic-bert served by ONNX Runtime with int8 weights.
+
+    Post-processing is inherited unchanged, so results keep the same schema
+    as ``HuggingFaceAnalyzer``; only ``model_info.runtime`` differs.
+    """
+
+    base_model_version = "onnx-int8:unitary/toxic-bert:multi_category_with_adjustments"
+    runtime = "onnxruntime-int8"
+    pipeline_loader = staticmethod(load_onnx_toxicity_pipeline)
+
+
+# Global analyzer instance
+onnx_analyzer = OnnxAnalyzer()
@@ -0,0 +1,193 @@
+# backend/app/ml/resource_manager.py
+"""
+CPU budgets for the models that share this process.
+
+Each model gets a core budget and a concurrency limit, and its inference runs
+on a dedicated executor sized to that limit. The manager is the only place
+that touches torch's thread settings.
+
+torch's intra-op thread pool is process-wide, not per thread. Budgets are
+therefore enforced as ``concurrency x threads per call <= cores``, with one
+threads-per-call value shared by all models. For a hard partition, run text
+inference in worker processes (INFERENCE_WORKERS); each worker then gets its
+own share of the text budget.
+"""
+import asyncio
+import collections
+import concurrent.futures
+import itertools
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+from app.utils.logger import logger
+from app.utils.config import config
+
+try:
+    import torch
+    TORCH_AVAILABLE = True
+except ImportError:
+    TORCH_AVAILABLE = False
+
+# Utilization is reported over this trailing window
+UTILIZATION_WINDOW_SECONDS = 60.0
+
+
+def available_cores() -> int:
+    """CPUs this process may run on (respects taskset/cgroup affinity)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+class ModelBudget:
+    """Core budget, concurrency limit and usage counters for one model"""
+
+    def __init__(self, name: str, cores: int, concurrency: int):
+        self.name = name
+        self.cores = max(1, cores)
+        self.concurrency = max(1, min(concurrency, self.cores))
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.concurrency,
+            thread_name_prefix=f"{name}-inference"
+        )
+
+        self.queued = 0
+        self.active: Dict[int, float] = {}  # call id -> start time
+        self.completed = 0
+        self.busy_seconds = 0.0
+        self.wait_seconds = 0.0
+        self._recent = collections.deque()  # (finished_at, started_at) of calls within the window
+        self._lock = threading.Lock()
+
+    def _record(self, call_id: int, started: float):
+        finished = time.monotonic()
+        with self._lock:
+            self.active.pop(call_id, None)
+            self.completed += 1
+            self.busy_seconds += finished - started
+            self._recent.append((finished, started))
+
+    def utilization(self, now: float) -> float:
+        """Busy slot-seconds over the window divided by the slot-seconds available"""
+        window_start = now - UTILIZATION_WINDOW_SECONDS
+        with self._lock:
+            while self._recent and self._recent[0][0] < window_start:
+                self._recent.popleft()
+            busy = sum(finished - max(started, window_start) for finished, started in self._recent)
+            busy += sum(now - max(started, window_start) for started in self.active.values())
+        return min(1.0, busy / (UTILIZATION_WINDOW_SECONDS * self.concurrency))
+
+
+class CpuResourceManager:
+    """Partitions the CPU between models and runs their inference calls"""
+
+    def __init__(self, budgets: Dict[str, tuple], interop_threads: int = 1, total_cores: Optional[int] = None):
+        self.total_cores = total_cores or available_cores()
+        self.budgets: Dict[str, ModelBudget] = {
+            name: ModelBudget(name, cores, concurrency) for name, (cores, concurrency) in budgets.items()
+        }
+        # Largest value that keeps every model within its cores at full concurrency
+        self.threads_per_call = max(1, min(b.cores // b.concurrency for b in self.budgets.values()))
+        self.interop_threads = max(1, interop_threads)
+        self._call_ids = itertools.count()
+        self._configured = False
+
+        # Every model needs at least one core, so tiny machines are oversubscribed regardless
+        assigned = sum(b.cores for b in self.budgets.values())
+        if assigned > max(self.total_cores, len(self.budgets)):
+            logger.warning(f"⚠️ CPU budgets assign {assigned} cores but only {self.total_cores} are available")
+
+    def configure_torch(self):
+        """Apply thread settings once, before any model runs"""
+        if self._configured or not TORCH_AVAILABLE:
+            return
+        self._configured = True
+
+        torch.set_num_threads(self.threads_per_call)
+        try:
+            torch.set_num_interop_threads(self.interop_threads)
+        except RuntimeError as e:
+            # Only allowed before the first inter-op parallel work in the process
+            logger.warning(f"⚠️ Could not set torch inter-op threads: {e}")
+
+        logger.info(
+            f"🧮 CPU budgets ({self.total_cores} cores): "
+            + ", ".join(f"{b.name}={b.cores} cores x{b.concurrency}" for b in self.budgets.values())
+            + f"; {self.threads_per_call} torch threads per call, {self.interop_threads} inter-op"
+        )
+
+    def budget(self, model: str) -> ModelBudget:
+        return self.budgets[model]
+
+    def threads_per_worker(self, model: str, num_workers: int) -> int:
+        """Torch threads for each of ``num_workers`` processes sharing ``model``'s budget"""
+        return max(1, self.budgets[model].cores // max(1, num_workers))
+
+    async def run(self, model: str, func: Callable, *args, **kwargs) -> Any:
+        """Run one inference call on ``model``'s executor, within its concurrency limit"""
+        self.configure_torch()
+        budget = self.budgets[model]
+        call_id = next(self._call_ids)
+        submitted = time.monotonic()
+
+        def call():
+            started = time.monotonic()
+            with budget._lock:
+                budget.queued -= 1
+                budget.wait_seconds += started - submitted
+                budget.active[call_id] = started
+            try:
+                return func(*args, **kwargs)
+            finally:
+                budget._record(call_id, started)
+
+        with budget._lock:
+            budget.queued += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(budget.executor, call)
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-model budget and current utilization for /health"""
+        now = time.monotonic()
+        models = {}
+        for name, b in self.budgets.items():
+            models[name] = {
+                "cores": b.cores,
+                "concurrency": b.concurrency,
+                "active": len(b.active),
+                "queued": b.queued,
+                "completed": b.completed,
+                "utilization": round(b.utilization(now), 4),
+                "average_ms": round(b.busy_seconds / b.completed * 1000, 2) if b.completed else 0.0,
+                "average_wait_ms": round(b.wait_seconds / b.completed * 1000, 2) if b.completed else 0.0
+            }
+        return {
+            "total_cores": self.total_cores,
+            "torch_threads_per_call": self.threads_per_call,
+            "torch_interop_threads": self.interop_threads,
+            "models": models
+        }
+
+    def shutdown(self):
+        """Stop every model's executor; calls already running finish in the background"""
+        for b in self.budgets.values():
+            b.executor.shutdown(wait=False)
+
+
+def _default_budgets(total_cores: int) -> Dict[str, tuple]:
+    """Budgets from config; unset core counts split the machine 2:1 between text and image"""
+    text_cores = config.TEXT_INFERENCE_CORES or max(1, total_cores * 2 // 3)
+    image_cores = config.IMAGE_INFERENCE_CORES or max(1, total_cores - text_cores)
+    return {
+        "text": (text_cores, config.TEXT_INFERENCE_CONCURRENCY),
+        "image": (image_cores, config.IMAGE_INFERENCE_CONCURRENCY)
+    }
+
+
+# Global resource manager
+resource_manager = CpuResourceManager(
+    _default_budgets(available_cores()),
+    interop_threads=config.TORCH_INTEROP_THREADS
+)
@@ -0,0 +1,191 @@
+# backend/app/ml/verdict_cache.py
+"""
+Bounded LRU + TTL cache for analyzer verdicts
+"""
+import asyncio
+import hashlib
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+from app.utils.logger import logger
+
+
+class VerdictCache:
+    """LRU cache with per-entry expiry and hit/miss/eviction counters"""
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 300.0):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None on a miss/expired entry"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():  # inf for entries without a TTL
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None):
+        """Store a value, evicting the least recently used entry when full.
+
+        ``ttl_seconds`` overrides the cache-wide TTL for this entry.
+        """
+        ttl_seconds = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        expires_at = time.monotonic() + ttl_seconds if ttl_seconds else float("inf")
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text so trivially different copies share a cache entry"""
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+def text_cache_key(text: str, version: str) -> str:
+    """Content-addressed key: analyzer/model version plus normalized text hash"""
+    digest = hashlib.blake2b(normalize_text(text).encode("utf-8"), digest_size=16).hexdigest()
+    return f"{version}:{digest}"
+
+
+def _copy_verdict(verdict: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy the top level and nested dicts so callers can't corrupt the cached entry"""
+    return {k: (dict(v) if isinstance(v, dict) else v) for k, v in verdict.items()}
+
+
+class CachedContentAnalyzer:
+    """Wraps any content analyzer with a content-addressed verdict cache.
+
+    Everything except ``analyze_text`` is delegated to the wrapped analyzer,
+    so callers can keep using ``quick_local_scan``, ``initialized`` etc.
+    """
+
+    def __init__(self, analyzer, cache: VerdictCache):
+        self.analyzer = analyzer
+        self.cache = cache
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    @property
+    def version(self) -> str:
+        return getattr(self.analyzer, "model_version", type(self.analyzer).__name__)
+
+    @property
+    def routes(self) -> List[str]:
+        """Models a verdict may come from; each gets its own keys, full model first"""
+        return list(getattr(self.analyzer, "cache_routes", ())) or [""]
+
+    def _route_key(self, text: str, route: str) -> str:
+        return text_cache_key(text, f"{self.version}:{route}" if route else self.version)
+
+    async def analyze_text(self, text: str) -> Dict[str, Any]:
+        key = text_cache_key(text, self.version)
+
+        for route in self.routes:
+            cached = self.cache.get(self._route_key(text, route))
+            if cached is not None:
+                verdict = _copy_verdict(cached)
+                verdict.setdefault("model_info", {})["cache_hit"] = True
+                return verdict
+
+        # Identical messages arriving together (raids) share one analysis
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            await asyncio.wait({inflight})
+            if not inflight.cancelled() and inflight.exception() is None:
+                return _copy_verdict(inflight.result())
+            # The first caller failed or was cancelled - analyze it ourselves
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            verdict = await self.analyzer.analyze_text(text)
+            future.set_result(verdict)
+        except Exception as e:
+            future.set_exception(e)
+            # Nobody else may be waiting; mark the exception as retrieved
+            future.exception()
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+        if self._is_cacheable(verdict):
+            route = verdict.get("model_info", {}).get("route", "")
+            self.cache.put(self._route_key(text, route), _copy_verdict(verdict))
+
+        return verdict
+
+    def _is_cacheable(self, verdict: Dict[str, Any]) -> bool:
+        """Only verdicts the versioned model produced: no errors, keyword/mock fallbacks or loading-time results"""
+        if not verdict or verdict.get("error"):
+            return False
+        if getattr(self.analyzer, "initialized", True) is False:
+            return False
+        model_info = verdict.get("model_info") or {}
+        if model_info.get("fallback"):
+            return False
+        if model_info.get("route", "") not in self.routes:
+            return False
+        # The main model's runtime must be the one the cache version names (a light model has its own)
+        expected_runtime = getattr(self.analyzer, "runtime", None)
+        if expected_runtime and model_info.get("route", "") == self.routes[0] and model_info.get("runtime") != expected_runtime:
+            return False
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {"version": self.version, **self.cache.stats()}
+
+    def __getattr__(self, name):
+        # Only called for attributes not found on the wrapper itself
+        return getattr(self.analyzer, name)
+
+
+def with_verdict_cache(analyzer, max_entries: int, ttl_seconds: float):
+    """Wrap an analyzer in a verdict cache (or return it untouched when disabled)"""
+    if max_entries <= 0:
+        return analyzer
+
+    logger.info(f"🗃️ Verdict cache enabled: {max_entries} entries, TTL {ttl_seconds:.0f}s")
+    return CachedContentAnalyzer(analyzer, VerdictCache(max_entries, ttl_seconds))
@@ -47,6 +47,97 @@ class Config:
     CONTENT_ANALYZER: str = os.getenv("CONTENT_ANALYZER", "huggingface")
     HUGGINGFACE_CACHE_DIR: str = os.getenv("HUGGINGFACE_CACHE_DIR", "./models/huggingface")
 
+    # Inference batching (toxicity model)
+    INFERENCE_MAX_BATCH_SIZE: int = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", 32))
+    INFERENCE_MAX_WAIT_MS: float = float(os.getenv("INFERENCE_MAX_WAIT_MS", 10))
+    INFERENCE_BUCKET_SIZE: int = int(os.getenv("INFERENCE_BUCKET_SIZE", 8))
+    # Long texts are scored as overlapping token windows and reduced per category ("max" or "mean")
+    TOXICITY_WINDOW_TOKENS: int = int(os.getenv("TOXICITY_WINDOW_TOKENS", 512))
+    TOXICITY_WINDOW_OVERLAP: int = int(os.getenv("TOXICITY_WINDOW_OVERLAP", 64))
+    TOXICITY_MAX_WINDOWS: int = int(os.getenv("TOXICITY_MAX_WINDOWS", 16))
+    TOXICITY_WINDOW_REDUCER: str = os.getenv("TOXICITY_WINDOW_REDUCER", "max").lower()
+
+    # Optional distilled toxicity model for short/low-risk texts and overload ("" disables routing)
+    LIGHT_TOXICITY_MODEL: str = os.getenv("LIGHT_TOXICITY_MODEL", "")
+    ROUTING_SHORT_TEXT_CHARS: int = int(os.getenv("ROUTING_SHORT_TEXT_CHARS", 64))
+    ROUTING_RISK_THRESHOLD: float = float(os.getenv("ROUTING_RISK_THRESHOLD", 0.25))
+    ROUTING_SATURATION_QUEUE: int = int(os.getenv("ROUTING_SATURATION_QUEUE", 64))
+
+    # Worker processes for toxicity inference (0 = run in-process on threads)
+    INFERENCE_WORKERS: int = int(os.getenv("INFERENCE_WORKERS", 0))
+    # 0 = split the text CPU budget evenly between workers
+    INFERENCE_WORKER_THREADS: int = int(os.getenv("INFERENCE_WORKER_THREADS", 0))
+
+    # CPU budgets per model (0 cores = text gets 2/3 of the machine, image the rest)
+    TEXT_INFERENCE_CORES: int = int(os.getenv("TEXT_INFERENCE_CORES", 0))
+    TEXT_INFERENCE_CONCURRENCY: int = int(os.getenv("TEXT_INFERENCE_CONCURRENCY", 2))
+    IMAGE_INFERENCE_CORES: int = int(os.getenv("IMAGE_INFERENCE_CORES", 0))
+    IMAGE_INFERENCE_CONCURRENCY: int = int(os.getenv("IMAGE_INFERENCE_CONCURRENCY", 1))
+    TORCH_INTEROP_THREADS: int = int(os.getenv("TORCH_INTEROP_THREADS", 1))
+
+    # Verdict cache in front of the content analyzer (0 disables it)
+    VERDICT_CACHE_SIZE: int = int(os.getenv("VERDICT_CACHE_SIZE", 10000))
+    VERDICT_CACHE_TTL_SECONDS: float = float(os.getenv("VERDICT_CACHE_TTL_SECONDS", 300))
+
+    # Cascade screen weights (trained with evaluate_cascade.py); the cut-off is per server
+    CASCADE_MODEL_PATH: str = os.getenv("CASCADE_MODEL_PATH", "./models/cascade_screen.json")
+
+    # Image inference batching (NSFW model)
+    IMAGE_MAX_BATCH_SIZE: int = int(os.getenv("IMAGE_MAX_BATCH_SIZE", 8))
+    IMAGE_MAX_WAIT_MS: float = float(os.getenv("IMAGE_MAX_WAIT_MS", 20))
+
+    # Attachment guards: byte cap (checked before and while downloading), types, pixel cap, decode size
+    IMAGE_MAX_BYTES: int = int(os.getenv("IMAGE_MAX_BYTES", 10 * 1024 * 1024))
+    IMAGE_ALLOWED_TYPES = [
+        t.strip().lower() for t in os.getenv("IMAGE_ALLOWED_TYPES", "image/png,image/jpeg,image/webp,image/gif").split(",") if t.strip()
+    ]
+    IMAGE_MAX_PIXELS: int = int(os.getenv("IMAGE_MAX_PIXELS", 40_000_000))
+    IMAGE_DECODE_SIZE: int = int(os.getenv("IMAGE_DECODE_SIZE", 256))
+
+    # Animated GIF/WebP and video: frames classified, frames decoded and decode time per file
+    VIDEO_ALLOWED_TYPES = [
+        t.strip().lower() for t in os.getenv("VIDEO_ALLOWED_TYPES", "video/mp4,video/webm,video/quicktime").split(",") if t.strip()
+    ]
+    VIDEO_MAX_BYTES: int = int(os.getenv("VIDEO_MAX_BYTES", 25 * 1024 * 1024))
+    FRAME_SAMPLE_MAX_FRAMES: int = int(os.getenv("FRAME_SAMPLE_MAX_FRAMES", 8))
+    FRAME_SAMPLE_MODE: str = os.getenv("FRAME_SAMPLE_MODE", "scene")  # "scene" or "even"
+    FRAME_SCAN_LIMIT: int = int(os.getenv("FRAME_SCAN_LIMIT", 120))
+    FRAME_DECODE_SECONDS: float = float(os.getenv("FRAME_DECODE_SECONDS", 2.0))
+    FRAME_SCENE_THRESHOLD: int = int(os.getenv("FRAME_SCENE_THRESHOLD", 10))
+
+    # Image links in message text and embeds: per message, and verdicts cached per normalized URL
+    IMAGE_LINKS_PER_MESSAGE: int = int(os.getenv("IMAGE_LINKS_PER_MESSAGE", 5))
+    IMAGE_LINK_CACHE_SIZE: int = int(os.getenv("IMAGE_LINK_CACHE_SIZE", 20000))
+    IMAGE_LINK_CACHE_TTL_SECONDS: float = float(os.getenv("IMAGE_LINK_CACHE_TTL_SECONDS", 3600))
+    IMAGE_LINK_FAILURE_TTL_SECONDS: float = float(os.getenv("IMAGE_LINK_FAILURE_TTL_SECONDS", 10))
+
+    # Stickers, custom emoji and avatars: verdicts kept forever in asset_verdicts; this is the in-memory front
+    ASSET_VERDICT_CACHE_SIZE: int = int(os.getenv("ASSET_VERDICT_CACHE_SIZE", 50000))
+    ASSET_SKIP_TTL_SECONDS: float = float(os.getenv("ASSET_SKIP_TTL_SECONDS", 600))
+    ASSETS_PER_MESSAGE: int = int(os.getenv("ASSETS_PER_MESSAGE", 10))
+
+    # Raid detection: same message from many users per guild (fan-out is per server, raid_fanout)
+    RAID_WINDOW_SECONDS: float = float(os.getenv("RAID_WINDOW_SECONDS", 60))
+    RAID_INDEX_SIZE: int = int(os.getenv("RAID_INDEX_SIZE", 10000))  # fingerprints per guild
+    RAID_MAX_USERS: int = int(os.getenv("RAID_MAX_USERS", 100))  # authors listed per fingerprint
+    RAID_MIN_CHARS: int = int(os.getenv("RAID_MIN_CHARS", 12))
+    # SimHash similarity at which two messages count as the same for repeats and raids (1.0 = exact only)
+    NEAR_DUPLICATE_SIMILARITY: float = float(os.getenv("NEAR_DUPLICATE_SIMILARITY", 0.875))
+
+    # POST /analyze/images and /analyze/images/urls
+    ANALYZE_BATCH_MAX_ITEMS: int = int(os.getenv("ANALYZE_BATCH_MAX_ITEMS", 100))
+
+    # Perceptual-hash verdict cache for reposted images (0 entries disables it)
+    IMAGE_HASH_CACHE_SIZE: int = int(os.getenv("IMAGE_HASH_CACHE_SIZE", 50000))
+    IMAGE_HASH_MAX_DISTANCE: int = int(os.getenv("IMAGE_HASH_MAX_DISTANCE", 4))
+    IMAGE_HASH_CACHE_PATH: str = os.getenv("IMAGE_HASH_CACHE_PATH", "./models/image_hash_cache.json")
+
+    # Shared HTTP client (attachment downloads)
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", 100))
+    HTTP_MAX_KEEPALIVE: int = int(os.getenv("HTTP_MAX_KEEPALIVE", 20))
+    HTTP_PER_HOST_CONCURRENCY: int = int(os.getenv("HTTP_PER_HOST_CONCURRENCY", 16))
+    HTTP_TIMEOUT_SECONDS: float = float(os.getenv("HTTP_TIMEOUT_SECONDS", 10))
+
     @classmethod
     def validate(cls) -> bool:
         """Validate required configuration"""
@@ -0,0 +1,172 @@
+# backend/app/utils/http_client.py
+"""
+Shared async HTTP client for fetching attachments and other remote content
+"""
+import asyncio
+import contextlib
+import ipaddress
+import socket
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+import httpx
+from app.utils.logger import logger
+from app.utils.config import config
+from app.utils.image_links import is_public_http_url
+
+# Redirects are followed by hand so every hop is checked
+MAX_REDIRECTS = 5
+
+
+class ResponseTooLarge(Exception):
+    """Raised when a streamed body exceeds the caller's byte limit"""
+
+
+class BlockedAddress(Exception):
+    """Raised when a URL or one of its redirects points at a non-public address"""
+
+
+class _HostLimit:
+    """Semaphore for one host plus the number of requests holding or waiting on it"""
+
+    __slots__ = ("semaphore", "users")
+
+    def __init__(self, per_host: int):
+        self.semaphore = asyncio.Semaphore(per_host)
+        self.users = 0
+
+
+class SharedHttpClient:
+    """One pooled ``httpx.AsyncClient`` for the whole process.
+
+    Connections (and TLS sessions) to the Discord CDN are kept alive and
+    reused. URLs may come from users, so only public addresses are fetched:
+    every redirect hop is re-checked, every address the host resolves to must
+    be public, and the connection goes to the address that was checked (with
+    the original Host header and TLS name), not to a second DNS answer.
+
+    A per-host semaphore stops one busy host from taking every
+    connection; it only exists while that host has requests in flight, so
+    links to many different hosts do not pile up. The client is created
+    lazily inside the running event loop.
+    """
+
+    def __init__(self, max_connections: int, max_keepalive: int, per_host: int, timeout: float):
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive)
+        self.timeout = httpx.Timeout(timeout)
+        self.per_host = max(1, per_host)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_limits: Dict[str, _HostLimit] = {}
+
+        # Counters for /health
+        self.requests = 0
+        self.failures = 0
+        self.blocked = 0
+        self.bytes_read = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                limits=self.limits,
+                timeout=self.timeout,
+                follow_redirects=False,
+                headers={"User-Agent": "CommunityClara/1.0"}
+            )
+        return self._client
+
+    @contextlib.asynccontextmanager
+    async def _host_slot(self, url: str):
+        host = urlsplit(url).netloc.lower()
+        limit = self._host_limits.get(host)
+        if limit is None:
+            limit = self._host_limits[host] = _HostLimit(self.per_host)
+        limit.users += 1
+        try:
+            async with limit.semaphore:
+                yield
+        finally:
+            limit.users -= 1
+            if limit.users == 0:
+                del self._host_limits[host]
+
+    async def _pin(self, url: str) -> Tuple[httpx.URL, Dict[str, str], Dict[str, str]]:
+        """``url`` with its host replaced by a checked public address, plus the Host header and TLS name"""
+        if not is_public_http_url(url):
+            raise BlockedAddress(url)
+        target = httpx.URL(url)
+        host = target.host
+        try:
+            addresses = [str(ipaddress.ip_address(host))]
+        except ValueError:
+            port = target.port or (443 if target.scheme == "https" else 80)
+            infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+            addresses = [info[4][0].split("%")[0] for info in infos]
+        if not addresses or not all(ipaddress.ip_address(address).is_global for address in addresses):
+            raise BlockedAddress(f"{url} resolves to a non-public address")
+
+        headers = {"Host": target.netloc.decode("ascii")}
+        extensions = {"sni_hostname": host} if target.scheme == "https" else {}
+        return target.copy_with(host=addresses[0]), headers, extensions
+
+    async def get_bytes(self, url: str, max_bytes: Optional[int] = None) -> Optional[bytes]:
+        """Stream ``url`` into memory; None on a non-200 response.
+
+        Raises ``ResponseTooLarge`` once more than ``max_bytes`` arrive, so
+        oversized bodies are never read in full, and ``BlockedAddress`` when
+        the URL or a redirect leads to a private address. Cancelling the
+        caller aborts the transfer and returns the connection to the pool.
+        """
+        for _ in range(MAX_REDIRECTS + 1):
+            async with self._host_slot(url):
+                self.requests += 1
+                try:
+                    pinned, headers, extensions = await self._pin(url)
+                    async with self.client.stream("GET", pinned, headers=headers, extensions=extensions) as response:
+                        if response.is_redirect:
+                            url = str(httpx.URL(url).join(response.headers["location"]))
+                            continue
+                        if response.status_code != 200:
+                            return None
+
+                        chunks = []
+                        received = 0
+                        async for chunk in response.aiter_bytes():
+                            received += len(chunk)
+                            if max_bytes is not None and received > max_bytes:
+                                raise ResponseTooLarge(f"{url} is larger than {max_bytes} bytes")
+                            chunks.append(chunk)
+
+                        self.bytes_read += received
+                        return b"".join(chunks)
+                except BlockedAddress:
+                    self.blocked += 1
+                    raise
+                except (httpx.HTTPError, OSError, ResponseTooLarge):
+                    self.failures += 1
+                    raise
+
+        self.failures += 1
+        return None  # too many redirects
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "blocked": self.blocked,
+            "bytes_read": self.bytes_read,
+            "hosts": len(self._host_limits)
+        }
+
+    async def aclose(self):
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+            logger.info("🌐 HTTP client closed")
+
+
+# Global client instance
+http_client = SharedHttpClient(
+    max_connections=config.HTTP_MAX_CONNECTIONS,
+    max_keepalive=config.HTTP_MAX_KEEPALIVE,
+    per_host=config.HTTP_PER_HOST_CONCURRENCY,
+    timeout=config.HTTP_TIMEOUT_SECONDS
+)
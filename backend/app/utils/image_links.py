@@ -0,0 +1,92 @@
+# backend/app/utils/image_links.py
+"""
+Image links in message text and link-preview embeds
+"""
+import ipaddress
+import re
+from typing import Iterable, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+URL_PATTERN = re.compile(r"https?://[^\s<>|\"'`]+", re.IGNORECASE)
+TRAILING_PUNCTUATION = ".,;:!?)]}*_~"
+
+MEDIA_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".webp", ".mp4", ".webm", ".mov")
+
+# Discord signs CDN links per share (ex/is/hm); the media proxy serves the same files
+DISCORD_CDN_HOSTS = {"cdn.discordapp.com", "media.discordapp.net"}
+DISCORD_SIGNATURE_PARAMS = {"ex", "is", "hm"}
+DISCORD_PROXY_PARAMS = {"width", "height", "format", "quality"}
+
+
+def normalize_url(url: str) -> str:
+    """Cache key for a link: the same hosted file shared anywhere maps to one key"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    port = parts.port
+    if port and not (scheme == "http" and port == 80) and not (scheme == "https" and port == 443):
+        host = f"{host}:{port}"
+
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    query = [(k, v) for k, v in query if not k.lower().startswith("utm_")]
+    if host in DISCORD_CDN_HOSTS:
+        host = "cdn.discordapp.com"
+        query = [(k, v) for k, v in query if k not in DISCORD_SIGNATURE_PARAMS | DISCORD_PROXY_PARAMS]
+
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(sorted(query)), ""))
+
+
+def is_public_http_url(url: str) -> bool:
+    """http(s) to a hostname or public IP, so user links cannot reach internal services"""
+    try:
+        parts = urlsplit(url)
+        host = parts.hostname
+    except ValueError:
+        return False
+    if parts.scheme.lower() not in ("http", "https") or not host:
+        return False
+    if host == "localhost" or host.endswith((".localhost", ".local", ".internal")):
+        return False
+    try:
+        return ipaddress.ip_address(host).is_global
+    except ValueError:
+        return True  # a hostname
+
+
+def _is_media_link(url: str) -> bool:
+    return urlsplit(url).path.lower().endswith(MEDIA_EXTENSIONS)
+
+
+def extract_image_links(content: str, embeds: Iterable = (), limit: int = 5,
+                        exclude: Iterable[str] = ()) -> List[str]:
+    """Media links pasted in ``content`` plus embed images/thumbnails, de-duplicated.
+
+    Pasted links only count when the path looks like an image or video file;
+    embed images are taken as-is, but fetched through Discord's media proxy
+    (``proxy_url``) rather than from their origin. ``exclude`` holds URLs
+    already being scanned (e.g. the message's own attachments).
+    """
+    seen = {normalize_url(url) for url in exclude}
+    links: List[str] = []
+
+    def add(url: Optional[str], fetch_url: Optional[str] = None):
+        fetch_url = fetch_url or url
+        if not url or len(links) >= limit or not is_public_http_url(fetch_url):
+            return
+        key = normalize_url(url)
+        if key not in seen:
+            seen.add(key)
+            links.append(fetch_url)
+
+    for match in URL_PATTERN.finditer(content or ""):
+        url = match.group(0).rstrip(TRAILING_PUNCTUATION)
+        if _is_media_link(url):
+            add(url)
+
+    for embed in embeds:
+        for media in (getattr(embed, "image", None), getattr(embed, "thumbnail", None)):
+            proxy_url = getattr(media, "proxy_url", None)
+            if proxy_url:
+                add(getattr(media, "url", None), proxy_url)
+
+    return links
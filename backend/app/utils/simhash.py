@@ -0,0 +1,79 @@
+# backend/app/utils/simhash.py
+"""
+64-bit SimHash of text over character trigrams, for near-duplicate matching.
+
+Messages that differ by a few characters (an appended emoji, a random suffix)
+get fingerprints that differ in a few bits, so "near duplicate" is just a
+Hamming distance check between two ints: ``popcount(a ^ b)``.
+
+Each trigram's hash is spread into 64 16-bit lanes of one big integer
+(cached per trigram), so summing them counts every bit position at once and
+a message costs one dict lookup and one addition per character.
+"""
+from typing import List
+
+BITS = 64
+MASK = (1 << BITS) - 1
+SHINGLE = 3
+# Longer messages are fingerprinted on their first MAX_CHARS characters (cost is per character,
+# and spam variants change the end or a few characters, not the whole opening)
+MAX_CHARS = 256
+# Cached spread trigrams (~200 bytes each); the cache is cleared when it fills up
+SHINGLE_CACHE_SIZE = 20000
+
+_LANE = 16  # bits per counter; counts stay below 2**15 because of MAX_CHARS
+_ONES = sum(1 << (_LANE * i) for i in range(BITS))
+_HIGH = _ONES << (_LANE - 1)
+_BYTE_SPREAD = [sum(1 << (_LANE * i) for i in range(8) if byte >> i & 1) for byte in range(256)]
+_FLAGS_TO_DIGITS = bytes.maketrans(b"\x00\x80", b"01")
+
+
+def _spread(value: int) -> int:
+    """Bit i of ``value`` -> the lowest bit of lane i"""
+    value &= MASK
+    spread = 0
+    for j in range(8):
+        spread |= _BYTE_SPREAD[(value >> (8 * j)) & 0xFF] << (_LANE * 8 * j)
+    return spread
+
+
+class _ShingleTable(dict):
+    def __missing__(self, shingle: str) -> int:
+        if len(self) >= SHINGLE_CACHE_SIZE:
+            self.clear()
+        spread = self[shingle] = _spread(hash(shingle))
+        return spread
+
+
+_shingles = _ShingleTable()
+
+
+def simhash(text: str) -> int:
+    """Unsigned 64-bit SimHash of ``text`` (normalize case/whitespace first)"""
+    text = text[:MAX_CHARS]
+    count = len(text) - SHINGLE + 1
+    if count < 1:
+        total, count = _shingles[text], 1
+    else:
+        total = sum(map(_shingles.__getitem__, [text[i:i + SHINGLE] for i in range(count)]))
+
+    # Bit i is set when more than half the trigrams have it: add a bias to every
+    # lane so exactly those lanes carry into their top bit, then read the top bits
+    bias = (1 << (_LANE - 1)) - (count // 2 + 1)
+    flags = ((total + bias * _ONES) & _HIGH).to_bytes(BITS * _LANE // 8, "little")[_LANE // 8 - 1::_LANE // 8]
+    return int(flags.translate(_FLAGS_TO_DIGITS)[::-1], 2)
+
+
+def _bit_count(value: int) -> int:
+    return bin(value).count("1")
+
+
+# Set bits; popcount(a ^ b) is the Hamming distance (int.bit_count is 3.10+)
+popcount = getattr(int, "bit_count", _bit_count)
+
+
+def bands(fingerprint: int, count: int = 4) -> List[int]:
+    """LSH keys: the fingerprint cut into ``count`` bands, tagged with the band number"""
+    width = BITS // count
+    band_mask = (1 << width) - 1
+    return [(band << width) | ((fingerprint >> (band * width)) & band_mask) for band in range(count)]
@@ -0,0 +1,400 @@
+# backend/benchmark_image_analysis.py
+"""
+Image pipeline benchmarks against a local stand-in for the Discord CDN.
+
+    python benchmark_image_analysis.py            # all benchmarks
+    python benchmark_image_analysis.py download   # just one
+"""
+import asyncio
+import io
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PARALLEL_UPLOADS = 50
+IMAGE_BYTES = 256 * 1024
+CDN_LATENCY_SECONDS = 0.05
+
+
+def _make_image_bytes() -> bytes:
+    """A real PNG when Pillow is installed (so analysis benchmarks can decode it)"""
+    try:
+        from PIL import Image
+        buffer = io.BytesIO()
+        Image.frombytes("RGB", (512, 512), os.urandom(512 * 512 * 3)).save(buffer, format="PNG")
+        return buffer.getvalue()
+    except ImportError:
+        return os.urandom(IMAGE_BYTES)
+
+
+class _CdnHandler(BaseHTTPRequestHandler):
+    body = b""
+
+    def do_GET(self):
+        time.sleep(CDN_LATENCY_SECONDS)
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_cdn():
+    """Local HTTP server standing in for cdn.discordapp.com; returns (server, base url)"""
+    _CdnHandler.body = _make_image_bytes()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _CdnHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+class LoopLagMonitor:
+    """Measures how late a 10 ms periodic timer fires, i.e. how long the loop was blocked"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.lags = []
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, loop.time() - expected))
+
+    def __enter__(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    def __exit__(self, *exc):
+        self._task.cancel()
+
+    def summary(self) -> str:
+        if not self.lags:
+            return "no samples (loop blocked for the whole run)"
+        lags = sorted(self.lags)
+        return (f"loop lag p50 {statistics.median(lags) * 1000:.1f} ms, "
+                f"p99 {lags[int(len(lags) * 0.99)] * 1000:.1f} ms, max {lags[-1] * 1000:.1f} ms")
+
+
+async def _timed(label: str, make_calls):
+    with LoopLagMonitor() as monitor:
+        await asyncio.sleep(0.05)  # let the monitor take a baseline sample
+        start = time.perf_counter()
+        results = await asyncio.gather(*make_calls(), return_exceptions=True)
+        elapsed = time.perf_counter() - start
+    errors = [r for r in results if isinstance(r, BaseException)]
+    print(f"   {label:<28} {elapsed:6.2f}s total, {monitor.summary()}"
+          + (f", {len(errors)} errors ({errors[0]!r})" if errors else ""))
+
+
+async def benchmark_download():
+    """Event-loop lag while 50 image uploads download in parallel"""
+    import requests
+    from app.utils.http_client import SharedHttpClient
+
+    print("=" * 60)
+    print(f"🌐 {PARALLEL_UPLOADS} parallel attachment downloads")
+    print("=" * 60)
+
+    server, base_url = start_cdn()
+    urls = [f"{base_url}/attachments/{i}.png" for i in range(PARALLEL_UPLOADS)]
+
+    async def blocking_get(url):
+        # What ImageAnalyzer used to do: a synchronous download inside a coroutine
+        return requests.get(url, timeout=5).content
+
+    client = SharedHttpClient(max_connections=100, max_keepalive=20, per_host=16, timeout=10)
+    try:
+        await _timed("requests.get (blocking)", lambda: [blocking_get(u) for u in urls])
+        await _timed("shared httpx client", lambda: [client.get_bytes(u) for u in urls])
+        await _timed("shared httpx client (warm)", lambda: [client.get_bytes(u) for u in urls])
+    finally:
+        await client.aclose()
+        server.shutdown()
+    print()
+
+
+async def benchmark_analyze():
+    """Full ImageAnalyzer.analyze_image (download + decode + NSFW model) under parallel load"""
+    print("=" * 60)
+    print(f"🖼️ {PARALLEL_UPLOADS} parallel analyze_image calls")
+    print("=" * 60)
+
+    try:
+        from app.ml.image_analyzer import image_analyzer
+    except ImportError as e:
+        print(f"   ❌ Image analyzer unavailable: {e}")
+        return
+    await image_analyzer.warm_up()
+    if not image_analyzer.ready:
+        print("   ❌ NSFW model failed to load")
+        return
+
+    server, base_url = start_cdn()
+    urls = [f"{base_url}/attachments/{i}.png" for i in range(PARALLEL_UPLOADS)]
+    try:
+        await _timed("analyze_image", lambda: [image_analyzer.analyze_image(u) for u in urls])
+    finally:
+        server.shutdown()
+    print()
+
+
+async def benchmark_per_message(images_per_message: int = 10, messages: int = 5):
+    """Latency of one multi-image message: attachments one by one vs analyze_images"""
+    print("=" * 60)
+    print(f"🗂️ Per-message latency ({images_per_message} images per message)")
+    print("=" * 60)
+
+    try:
+        from app.ml.image_analyzer import image_analyzer
+    except ImportError as e:
+        print(f"   ❌ Image analyzer unavailable: {e}")
+        return
+    await image_analyzer.warm_up()
+    if not image_analyzer.ready:
+        print("   ❌ NSFW model failed to load")
+        return
+    image_analyzer.hash_cache.max_entries = 0  # identical test images would all be cache hits
+
+    server, base_url = start_cdn()
+    try:
+        for label in ("sequential", "concurrent"):
+            latencies = []
+            for m in range(messages):
+                urls = [f"{base_url}/{label}/{m}/{i}.png" for i in range(images_per_message)]
+                start = time.perf_counter()
+                if label == "sequential":
+                    # What on_message used to do
+                    for url in urls:
+                        await image_analyzer.analyze_image(url)
+                else:
+                    await image_analyzer.analyze_images([{"url": url} for url in urls])
+                latencies.append(time.perf_counter() - start)
+            print(f"   {label:<12} median {statistics.median(latencies) * 1000:7.1f} ms/message, "
+                  f"max {max(latencies) * 1000:7.1f} ms")
+    finally:
+        server.shutdown()
+    print()
+
+
+async def benchmark_batching(total: int = 128):
+    """Images/second through the NSFW model at batch sizes 1, 8 and 32"""
+    print("=" * 60)
+    print("📦 Image micro-batching throughput (NSFW ViT, CPU)")
+    print("=" * 60)
+
+    try:
+        from PIL import Image
+        from app.ml.image_analyzer import image_analyzer
+    except ImportError as e:
+        print(f"   ❌ Image analyzer unavailable: {e}")
+        return
+    await image_analyzer.warm_up()
+    if not image_analyzer.ready:
+        print("   ❌ NSFW model failed to load")
+        return
+
+    images = [Image.frombytes("RGB", (512, 512), os.urandom(512 * 512 * 3)) for _ in range(16)]
+    batch = [images[i % len(images)] for i in range(total)]
+
+    for batch_size in (1, 8, 32):
+        image_analyzer.batcher.max_batch_size = batch_size
+        await asyncio.gather(*(image_analyzer.classify_image(img) for img in batch[:batch_size]))  # warm-up
+
+        start = time.perf_counter()
+        await asyncio.gather(*(image_analyzer.classify_image(img) for img in batch))
+        elapsed = time.perf_counter() - start
+        print(f"   max_batch_size={batch_size:>3}: {total / elapsed:7.1f} img/s ({elapsed * 1000 / total:.1f} ms/img)")
+
+    print(f"   Batcher stats: {image_analyzer.batcher.stats()}")
+    print()
+
+
+def benchmark_hash_cache(entries: int = 50000, lookups: int = 20000):
+    """Perceptual-hash cache lookup cost with a full cache (exact, near and miss)"""
+    import random
+    from app.ml.image_hash_cache import PerceptualHashCache
+
+    print("=" * 60)
+    print(f"#️⃣ Perceptual-hash cache lookups ({entries} entries)")
+    print("=" * 60)
+
+    rng = random.Random(0)
+    cache = PerceptualHashCache(max_entries=entries, max_distance=4)
+    hashes = [rng.getrandbits(64) for _ in range(entries)]
+    for value in hashes:
+        cache.put(value, {"score": 0.0})
+
+    def flip(value, bits):
+        for bit in rng.sample(range(64), bits):
+            value ^= 1 << bit
+        return value
+
+    cases = {
+        "exact": [rng.choice(hashes) for _ in range(lookups)],
+        "near (3 bits off)": [flip(rng.choice(hashes), 3) for _ in range(lookups)],
+        "miss": [rng.getrandbits(64) for _ in range(lookups)],
+    }
+    for label, queries in cases.items():
+        start = time.perf_counter()
+        found = sum(cache.get(q) is not None for q in queries)
+        elapsed = time.perf_counter() - start
+        print(f"   {label:<18} {elapsed / lookups * 1e6:6.1f} µs/lookup, {found / lookups:.1%} found")
+    print(f"   Cache stats: {cache.stats()}")
+    print()
+
+
+def _peak_rss_mb():
+    try:
+        # VmHWM resets on exec; ru_maxrss can carry over the parent's peak
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+    except ImportError:
+        return float("nan")  # Not available on Windows
+
+
+def _measure_decode(method: str, path: str):
+    """Runs in a child process so each decode method gets its own peak RSS"""
+    from PIL import Image
+    from app.ml.frame_sampler import FrameBudget, sample_frames
+
+    with open(path, "rb") as f:
+        data = f.read()
+    baseline = _peak_rss_mb()
+
+    start = time.perf_counter()
+    if method == "full":
+        # What ImageAnalyzer used to do
+        image = Image.open(io.BytesIO(data)).convert("RGB")
+    else:
+        image = sample_frames(data, FrameBudget(max_pixels=0, target=256))[0].image
+    elapsed = time.perf_counter() - start
+
+    print(json.dumps({
+        "decode_ms": elapsed * 1000,
+        "size": image.size,
+        "rss_increase_mb": _peak_rss_mb() - baseline
+    }))
+
+
+def benchmark_decode():
+    """Decode time and peak RSS: full-resolution convert vs draft/thumbnail to 256px"""
+    import subprocess
+    import tempfile
+
+    print("=" * 60)
+    print("🧩 Attachment decode: full resolution vs reduced")
+    print("=" * 60)
+
+    try:
+        from PIL import Image
+    except ImportError:
+        print("   ❌ Pillow not installed")
+        return
+
+    with tempfile.TemporaryDirectory() as scratch:
+        # Large photo-like images: smooth gradient plus noise
+        base = Image.radial_gradient("L").resize((4000, 3000)).convert("RGB")
+        noise = Image.frombytes("RGB", (4000, 3000), os.urandom(4000 * 3000 * 3))
+        photo = Image.blend(base, noise, 0.15)
+        files = {
+            "JPEG 4000x3000": os.path.join(scratch, "photo.jpg"),
+            "PNG 4000x3000": os.path.join(scratch, "photo.png"),
+        }
+        photo.save(files["JPEG 4000x3000"], quality=90)
+        photo.save(files["PNG 4000x3000"])
+
+        for label, path in files.items():
+            print(f"   {label} ({os.path.getsize(path) / 1e6:.1f} MB):")
+            for method in ("full", "reduced"):
+                output = subprocess.run(
+                    [sys.executable, __file__, "_decode", method, path],
+                    capture_output=True, text=True, check=True
+                ).stdout.strip().splitlines()[-1]
+                result = json.loads(output)
+                print(f"      {method:<8} {result['decode_ms']:7.1f} ms, +{result['rss_increase_mb']:6.1f} MB RSS, "
+                      f"-> {result['size'][0]}x{result['size'][1]}")
+    print()
+
+
+def benchmark_frames(frame_count: int = 200):
+    """Frame sampling cost for a long animated GIF, per mode and frame budget"""
+    from app.ml.frame_sampler import EVEN, SCENE, FrameBudget, sample_frames
+
+    print("=" * 60)
+    print(f"🎞️ Frame sampling ({frame_count}-frame 480x480 GIF)")
+    print("=" * 60)
+
+    try:
+        from PIL import Image
+    except ImportError:
+        print("   ❌ Pillow not installed")
+        return
+
+    # Ten "scenes" of 20 near-identical frames each (one pixel differs, or the GIF encoder merges them)
+    scenes = [Image.frombytes("RGB", (48, 48), os.urandom(48 * 48 * 3)).resize((480, 480)) for _ in range(10)]
+    frames = []
+    for i in range(frame_count):
+        frame = scenes[i * len(scenes) // frame_count].copy()
+        frame.putpixel((i % 480, 0), (255, 255, 255))
+        frames.append(frame)
+    buffer = io.BytesIO()
+    frames[0].save(buffer, format="GIF", save_all=True, append_images=frames[1:], duration=40)
+    data = buffer.getvalue()
+    print(f"   GIF size {len(data) / 1e6:.1f} MB")
+
+    cases = [
+        ("first frame only", FrameBudget(max_frames=1, scan_limit=1)),
+        ("even, 8 of all 200", FrameBudget(max_frames=8, scan_limit=frame_count, mode=EVEN)),
+        ("even, 8 of first 120", FrameBudget(max_frames=8, scan_limit=120, mode=EVEN)),
+        ("scene, 8 of first 120", FrameBudget(max_frames=8, scan_limit=120, mode=SCENE)),
+        ("scene, 0.1s time budget", FrameBudget(max_frames=8, scan_limit=frame_count, max_seconds=0.1, mode=SCENE)),
+    ]
+    for label, budget in cases:
+        start = time.perf_counter()
+        sampled = sample_frames(data, budget)
+        elapsed = time.perf_counter() - start
+        print(f"   {label:<24} {elapsed * 1000:7.1f} ms, frames {[f.index for f in sampled]}")
+    print()
+
+
+BENCHMARKS = {
+    "download": benchmark_download,
+    "analyze": benchmark_analyze,
+    "per_message": benchmark_per_message,
+    "batching": benchmark_batching,
+    "hash_cache": benchmark_hash_cache,
+    "decode": benchmark_decode,
+    "frames": benchmark_frames,
+}
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["_decode"]:
+        _measure_decode(sys.argv[2], sys.argv[3])
+        sys.exit(0)
+
+    selected = sys.argv[1:] or list(BENCHMARKS)
+    for name in selected:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark '{name}'. Available: {', '.join(BENCHMARKS)}")
+            sys.exit(1)
+        result = BENCHMARKS[name]()
+        if asyncio.iscoroutine(result):
+            asyncio.run(result)
@@ -0,0 +1,226 @@
+# backend/benchmark_text_analysis.py
+"""
+Throughput/latency benchmarks for the text analysis pipeline
+Run from the backend folder: python benchmark_text_analysis.py [batching] [onnx] [windowing]
+"""
+
+import asyncio
+import json
+import subprocess
+import sys
+import time
+
+SAMPLE_MESSAGES = [
+    "gg",
+    "lol",
+    "anyone up for a match tonight?",
+    "You're such an idiot, nobody wants you here",
+    "that boss fight was insane, took me like 30 tries",
+    "shut up you pathetic loser",
+    "check out my new build in #showcase",
+    "I will find you and hurt you",
+]
+
+
+def _messages(count: int):
+    return [SAMPLE_MESSAGES[i % len(SAMPLE_MESSAGES)] + f" #{i}" for i in range(count)]
+
+
+async def benchmark_batching(total: int = 512):
+    """Compare classified messages/second with and without micro-batching"""
+    from app.ml.huggingface_analyzer import HuggingFaceAnalyzer
+
+    print("=" * 60)
+    print("📦 Micro-batching throughput (toxic-bert, CPU)")
+    print("=" * 60)
+
+    analyzer = HuggingFaceAnalyzer()
+    await analyzer.warm_up()
+    if not analyzer.initialized:
+        print("   ❌ Model failed to load - is transformers installed?")
+        return
+
+    messages = _messages(total)
+    for batch_size in (1, 8, 32):
+        analyzer.batcher.max_batch_size = batch_size
+        # Warm up so the first configuration doesn't pay the allocator cost
+        await asyncio.gather(*(analyzer.analyze_text(m) for m in messages[:batch_size]))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(analyzer.analyze_text(m) for m in messages))
+        elapsed = time.perf_counter() - start
+        print(f"   max_batch_size={batch_size:>3}: {total / elapsed:8.1f} msg/s ({elapsed * 1000 / total:.2f} ms/msg)")
+
+    print(f"   Batcher stats: {analyzer.batcher.stats()}")
+    print()
+
+
+# Max allowed |onnx - pytorch| per raw model score
+ONNX_PARITY_TOLERANCE = 0.05
+
+PARITY_MESSAGES = SAMPLE_MESSAGES + [
+    "I hope you die in a fire",
+    "what a beautiful sunset today",
+    "you people are disgusting and should be banned from existing",
+    "send nudes",
+]
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+    except ImportError:
+        return float("nan")  # Not available on Windows
+
+
+def _measure_backend(backend: str):
+    """Runs in a child process so RSS isn't shared between the two runtimes"""
+    if backend == "onnx":
+        from app.ml.onnx_analyzer import load_onnx_toxicity_pipeline as load
+    else:
+        from app.ml.huggingface_analyzer import load_toxicity_pipeline as load
+
+    start = time.perf_counter()
+    classifier = load()
+    load_seconds = time.perf_counter() - start
+
+    raw_scores = [
+        {item['label']: item['score'] for item in result}
+        for result in classifier(PARITY_MESSAGES)
+    ]
+
+    latencies = []
+    for _ in range(5):
+        for message in PARITY_MESSAGES:
+            start = time.perf_counter()
+            classifier(message)
+            latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+
+    print(json.dumps({
+        "load_seconds": load_seconds,
+        "p50_ms": latencies[len(latencies) // 2],
+        "p95_ms": latencies[int(len(latencies) * 0.95)],
+        "peak_rss_mb": _peak_rss_mb(),
+        "scores": raw_scores
+    }))
+
+
+async def benchmark_onnx():
+    """Parity check and latency/RSS comparison: PyTorch vs int8 ONNX Runtime"""
+    print("=" * 60)
+    print("⚡ ONNX Runtime (int8) vs PyTorch toxic-bert")
+    print("=" * 60)
+
+    results = {}
+    for backend in ("pytorch", "onnx"):
+        child = subprocess.run(
+            [sys.executable, __file__, "_measure", backend],
+            capture_output=True, text=True
+        )
+        if child.returncode != 0:
+            print(f"   ❌ {backend} run failed:\n{child.stderr[-2000:]}")
+            return
+        results[backend] = json.loads(child.stdout.strip().splitlines()[-1])
+
+    for backend, r in results.items():
+        print(f"   {backend:>8}: load {r['load_seconds']:.1f}s, p50 {r['p50_ms']:.1f} ms, "
+              f"p95 {r['p95_ms']:.1f} ms, peak RSS {r['peak_rss_mb']:.0f} MB")
+
+    worst = 0.0
+    for message, torch_scores, onnx_scores in zip(PARITY_MESSAGES, results["pytorch"]["scores"], results["onnx"]["scores"]):
+        for label, torch_score in torch_scores.items():
+            diff = abs(torch_score - onnx_scores.get(label, 0.0))
+            worst = max(worst, diff)
+            if diff > ONNX_PARITY_TOLERANCE:
+                print(f"   ❌ '{message[:30]}' {label}: pytorch={torch_score:.3f} onnx={onnx_scores.get(label, 0.0):.3f}")
+
+    if worst > ONNX_PARITY_TOLERANCE:
+        print(f"   ❌ Parity FAILED: max score difference {worst:.4f} > {ONNX_PARITY_TOLERANCE}")
+        sys.exit(1)
+    print(f"   ✅ Parity OK: max score difference {worst:.4f} <= {ONNX_PARITY_TOLERANCE}")
+    print()
+
+
+async def benchmark_windowing(runs: int = 10):
+    """analyze_text latency for short, medium and Nitro-length messages"""
+    from app.ml.huggingface_analyzer import HuggingFaceAnalyzer
+
+    print("=" * 60)
+    print("🪟 Token-window analysis latency")
+    print("=" * 60)
+
+    analyzer = HuggingFaceAnalyzer()
+    await analyzer.warm_up()
+    if not analyzer.initialized:
+        print("   ❌ Model failed to load - is transformers installed?")
+        return
+
+    filler = " ".join(SAMPLE_MESSAGES) + " "
+    for length in (100, 1000, 4000):
+        text = (filler * (length // len(filler) + 1))[:length]
+        await analyzer.analyze_text(text)  # warm-up
+
+        latencies = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            result = await analyzer.analyze_text(text)
+            latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+        print(f"   {length:>5} chars: {result['model_info'].get('windows', 1)} window(s), "
+              f"p50 {latencies[len(latencies) // 2]:.1f} ms, max {latencies[-1]:.1f} ms")
+    print()
+
+
+def benchmark_lexicon(runs: int = 2000):
+    """Per-message keyword scanning: one trie pass vs the old per-list substring loops"""
+    from app.ml.lexicon import CATEGORY_TERMS, Lexicon
+
+    print("=" * 60)
+    print("🔤 Keyword lexicon scan")
+    print("=" * 60)
+
+    # The old approach: every analyzer lowercased the text and looped over each list
+    term_lists = [[t.rstrip('*') for t in terms] for terms in CATEGORY_TERMS.values()]
+
+    def substring_scan(text):
+        text_lower = text.lower()
+        return [[t for t in terms if t in text_lower] for terms in term_lists]
+
+    lexicon = Lexicon(CATEGORY_TERMS)
+    filler = " ".join(SAMPLE_MESSAGES) + " "
+    for length in (50, 500, 4000):
+        text = (filler * (length // len(filler) + 1))[:length]
+        timings = {}
+        for label, scan in (("substring", substring_scan), ("lexicon", lexicon.scan)):
+            start = time.perf_counter()
+            for _ in range(runs):
+                scan(text)
+            timings[label] = (time.perf_counter() - start) / runs * 1e6
+        print(f"   {length:>5} chars: substring {timings['substring']:.1f} µs, "
+              f"lexicon {timings['lexicon']:.1f} µs")
+    print()
+
+
+BENCHMARKS = {
+    "batching": benchmark_batching,
+    "onnx": benchmark_onnx,
+    "windowing": benchmark_windowing,
+    "lexicon": benchmark_lexicon,
+}
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["_measure"]:
+        _measure_backend(sys.argv[2])
+        sys.exit(0)
+
+    selected = sys.argv[1:] or list(BENCHMARKS)
+    for name in selected:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark '{name}'. Available: {', '.join(BENCHMARKS)}")
+            sys.exit(1)
+        result = BENCHMARKS[name]()
+        if asyncio.iscoroutine(result):
+            asyncio.run(result)
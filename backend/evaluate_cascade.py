@@ -0,0 +1,118 @@
+# backend/evaluate_cascade.py
+"""
+Tune the cascade screen on a labeled corpus.
+
+For a range of cascade cut-offs this reports how many messages would skip the
+toxicity model, the CPU time that saves, and how much recall is lost compared
+with always running the full model.
+
+Corpus: JSONL ({"text": ..., "label": 0/1}) or CSV with text,label columns.
+
+    python evaluate_cascade.py corpus.jsonl
+    python evaluate_cascade.py corpus.jsonl --train 0.7 --save   # fit and store the linear screen
+"""
+import argparse
+import asyncio
+import csv
+import json
+import random
+import sys
+import time
+
+DEFAULT_CUTOFFS = [0.05, 0.1, 0.15, 0.2, 0.25, 0.3, 0.4, 0.5]
+
+
+def load_corpus(path: str):
+    samples = []
+    if path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                samples.append((row["text"], str(row["label"]).strip().lower() in ("1", "true", "toxic", "yes")))
+    else:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    samples.append((row["text"], bool(row["label"])))
+    return samples
+
+
+async def evaluate(args):
+    from app.utils.config import config
+    from app.ml.cascade import CascadeScreen, HashedLinearScreen
+    from app.ml.content_analyzer import _select_content_analyzer
+
+    samples = load_corpus(args.corpus)
+    random.Random(0).shuffle(samples)
+    print(f"📚 Loaded {len(samples)} messages ({sum(label for _, label in samples)} toxic)")
+
+    screen = CascadeScreen(config.CASCADE_MODEL_PATH if not args.train else "")
+    if args.train:
+        split = int(len(samples) * args.train)
+        train, samples = samples[:split], samples[split:]
+        screen.linear = HashedLinearScreen()
+        screen.linear.train(train, epochs=args.epochs)
+        print(f"🏋️ Trained linear screen on {len(train)} messages, evaluating on {len(samples)}")
+        if args.save:
+            screen.linear.save(config.CASCADE_MODEL_PATH)
+            print(f"💾 Saved weights to {config.CASCADE_MODEL_PATH}")
+
+    # The uncached analyzer, so every message pays the real model cost
+    analyzer = _select_content_analyzer()
+    if hasattr(analyzer, "warm_up"):
+        await analyzer.warm_up()
+
+    rows = []
+    for text, label in samples:
+        cpu_start = time.process_time()
+        result = await analyzer.analyze_text(text)
+        full_cpu = time.process_time() - cpu_start
+
+        cpu_start = time.process_time()
+        screen_score = await screen.score(text, analyzer)
+        screen_cpu = time.process_time() - cpu_start
+
+        flagged = result.get("max_score", 0) >= args.toxicity_threshold
+        rows.append((label, flagged, screen_score, full_cpu, screen_cpu))
+
+    total_cpu = sum(r[3] for r in rows)
+    toxic = sum(1 for r in rows if r[0]) or 1
+    full_caught = sum(1 for r in rows if r[0] and r[1])
+    full_flagged = sum(1 for r in rows if r[1]) or 1
+
+    print()
+    print(f"Full model alone: recall {full_caught / toxic:.1%}, "
+          f"{total_cpu / len(rows) * 1000:.1f} ms CPU per message")
+    print()
+    print(f"{'cut-off':>8} {'skipped':>8} {'cpu saved':>10} {'recall':>7} {'recall lost':>12} {'flags lost':>11}")
+    for cutoff in args.cutoffs:
+        skipped = [r for r in rows if r[2] < cutoff]
+        saved = sum(r[3] for r in skipped) - sum(r[4] for r in rows)
+        caught = full_caught - sum(1 for r in skipped if r[0] and r[1])
+        flags_lost = sum(1 for r in skipped if r[1])
+        print(f"{cutoff:>8.2f} {len(skipped) / len(rows):>8.1%} {saved / (total_cpu or 1):>10.1%} "
+              f"{caught / toxic:>7.1%} {(full_caught - caught) / toxic:>12.1%} {flags_lost / full_flagged:>11.1%}")
+    print()
+    print("recall lost: labeled-toxic messages the full model catches but the cascade skips")
+    print("flags lost:  share of the full model's flags that the cascade skips")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus")
+    parser.add_argument("--train", type=float, default=0.0,
+                        help="fraction of the corpus used to fit the linear screen (rest is evaluated)")
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--save", action="store_true", help="write trained weights to CASCADE_MODEL_PATH")
+    parser.add_argument("--toxicity-threshold", type=float, default=0.7)
+    parser.add_argument("--cutoffs", type=float, nargs="+", default=DEFAULT_CUTOFFS)
+    args = parser.parse_args()
+
+    if not 0.0 <= args.train < 1.0:
+        print("--train must be in [0, 1)")
+        sys.exit(1)
+    asyncio.run(evaluate(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,7 @@ Run this to identify what's working and what's not
 
 import asyncio
 import sys
-from datetime import datetime
+from datetime import datetime, timedelta
 
 print("=" * 60)
 print("🔍 CommunityClara Bot Diagnostic Test")
@@ -161,6 +161,35 @@ try:
         print(f"   Spam Score: {result.get('spam_score', 0)}/100")
     else:
         print("   ⚠️  Spam not detected")
+    
+    # Near-duplicates: an appended emoji is the same message, a different short reply is not
+    from app.bot.spam_tracker import SpamTracker
+    tracker = SpamTracker()
+    tracker.add_message("emoji_user", "ok sure", datetime.utcnow())
+    emoji_repeat = tracker.add_message("emoji_user", "ok sure 😀", datetime.utcnow())
+    tracker.add_message("reply_user", "i agree with you", datetime.utcnow())
+    other_reply = tracker.add_message("reply_user", "i agree with him", datetime.utcnow())
+    
+    if emoji_repeat['repeat_count'] == 2:
+        print("   ✅ \"ok sure\" / \"ok sure 😀\" counted as a repeat")
+    else:
+        print(f"   ❌ \"ok sure 😀\" not matched to \"ok sure\" (repeat count {emoji_repeat['repeat_count']})")
+    if other_reply['repeat_count'] == 1:
+        print("   ✅ \"i agree with you\" / \"i agree with him\" kept apart")
+    else:
+        print("   ❌ \"i agree with him\" counted as a repeat of \"i agree with you\"")
+    
+    # Copy-paste spam alone is flagged at the stored default threshold (Server.spam_threshold = 0.7)
+    from app.bot.spam_tracker import DEFAULT_SPAM_THRESHOLD
+    tracker.configure_guild("default_guild", DEFAULT_SPAM_THRESHOLD)
+    sent_at = datetime.utcnow()
+    for i in range(3):
+        repeated = tracker.add_message("promo_user", "check out my new server, link in bio!",
+                                       sent_at + timedelta(seconds=15 * i), guild_id="default_guild")
+    if repeated['is_spam']:
+        print(f"   ✅ Same message x3 is spam at the default threshold (score {repeated['spam_score']})")
+    else:
+        print(f"   ❌ Same message x3 not spam at the default threshold (score {repeated['spam_score']})")
         
 except Exception as e:
     print(f"   ❌ Spam tracker error: {e}")